@@ -0,0 +1,194 @@
+import codecs
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+class PayloadRejected(Exception):
+    """Raised while reading a request body that breaks a limit or isn't valid."""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def check_content_length(request, max_bytes):
+    """Reject from the declared length alone, before reading any of the body."""
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        raise PayloadRejected("Invalid Content-Length")
+    if length > max_bytes:
+        raise PayloadRejected(
+            f"Request body is {length} bytes; the limit is {max_bytes}",
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+
+
+def read_body(stream, max_bytes, chunk_size=64 * 1024):
+    """The whole body of ``stream``, stopping once it passes ``max_bytes``."""
+    chunks = []
+    received = 0
+    while stream is not None:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        received += len(chunk)
+        if received > max_bytes:
+            raise PayloadRejected(
+                f"Request body exceeds {max_bytes} bytes",
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def iter_json_array(stream, max_bytes, max_items, chunk_size=64 * 1024):
+    """
+    Yield the elements of a top-level JSON array read from ``stream``.
+
+    The body is read in chunks and each element is decoded as soon as it is
+    complete, so only one element (plus a partial chunk) is held as text at a
+    time. Reading stops with ``PayloadRejected`` as soon as the body passes
+    ``max_bytes`` or the array passes ``max_items``, without reading the rest.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    received = 0
+    finished = False
+
+    def fill():
+        nonlocal buffer, position, received, finished
+        chunk = stream.read(chunk_size) if stream is not None else b""
+        if not chunk:
+            finished = True
+            buffer = buffer[position:] + utf8.decode(b"", final=True)
+            position = 0
+            return False
+        received += len(chunk)
+        if received > max_bytes:
+            raise PayloadRejected(
+                f"Request body exceeds {max_bytes} bytes",
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        try:
+            buffer = buffer[position:] + utf8.decode(chunk)
+        except UnicodeDecodeError:
+            raise PayloadRejected("Request body is not valid UTF-8")
+        position = 0
+        return True
+
+    def next_char():
+        # Skip whitespace, reading more as needed; None at end of body
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if finished or not fill():
+                return None
+
+    if next_char() != "[":
+        raise PayloadRejected("Expected a JSON array")
+    position += 1
+
+    count = 0
+    expect_value = True
+    while True:
+        char = next_char()
+        if char is None:
+            raise PayloadRejected("Invalid JSON format: unterminated array")
+        if char == "]" and (count == 0 or not expect_value):
+            position += 1
+            break
+        if not expect_value:
+            if char != ",":
+                raise PayloadRejected(f"Invalid JSON format: expected ',' at element {count}")
+            position += 1
+            expect_value = True
+            continue
+
+        # Decode one element. Unless a delimiter follows it, it may be cut
+        # short by the chunk boundary (e.g. "2" of "2.5"), so read more and retry
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if finished or not fill():
+                    raise PayloadRejected(f"Invalid JSON format: {e.msg} at element {count}")
+                continue
+            if (end == len(buffer) or buffer[end] not in _DELIMITERS) and not finished and fill():
+                continue
+            break
+
+        position = end
+        count += 1
+        if count > max_items:
+            raise PayloadRejected(
+                f"At most {max_items} items per request",
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        expect_value = False
+        yield value
+
+    if next_char() is not None:
+        raise PayloadRejected("Invalid JSON format: extra data after the array")
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight requests to heavy endpoints, overall and per user.
+
+    Limits are per worker process; a request that can't get a slot straight
+    away is turned away rather than queued, so a burst can't pile up workers.
+    """
+
+    def __init__(self, limit, per_user_limit):
+        self.limit = limit
+        self.per_user_limit = per_user_limit
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.per_user = defaultdict(int)
+
+    def try_acquire(self, user_id=None):
+        with self.lock:
+            if self.in_flight >= self.limit:
+                return False
+            if user_id is not None and self.per_user[user_id] >= self.per_user_limit:
+                return False
+            self.in_flight += 1
+            if user_id is not None:
+                self.per_user[user_id] += 1
+            return True
+
+    def release(self, user_id=None):
+        with self.lock:
+            self.in_flight -= 1
+            if user_id is not None:
+                self.per_user[user_id] -= 1
+                if not self.per_user[user_id]:
+                    del self.per_user[user_id]
+
+
+heavy_requests = ConcurrencyLimiter(
+    settings.HEAVY_MAX_CONCURRENT, settings.HEAVY_MAX_CONCURRENT_PER_USER
+)
+
+
+def too_busy():
+    response = Response(
+        {"error": "Too many bulk requests in progress, retry shortly"},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response["Retry-After"] = str(settings.HEAVY_RETRY_AFTER_SECONDS)
+    return response
@@ -0,0 +1,320 @@
+"""
+Cold tier for driver_logs and stops.
+
+Whole months older than ``ARCHIVE_AFTER_MONTHS`` are moved out of the
+database into one compressed columnar file per table and month::
+
+    <ARCHIVE_DIR>/<db_table>/<YYYY-MM>.npz
+
+Rows archived from another shard go under ``<ARCHIVE_DIR>/<alias>/`` instead,
+as their ids are only unique within their database.
+
+Every model field is stored as a NumPy column (integers, scaled decimals,
+epoch microseconds, days, or a UTF-8 blob plus offsets for text) with a null
+mask where needed, so files load without pickle and a read only decodes the
+rows it selects.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, models, transaction
+
+from .cache import bump_user_version
+from .models import DriverLog, Stop
+
+# Field whose month decides which file a row goes to
+MONTH_FIELDS = {
+    DriverLog: "log_date",
+    Stop: "stop_time",
+}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_DAY_US = 86_400_000_000
+_MONTH_CACHE_SIZE = 24
+
+_month_cache = OrderedDict()
+_month_cache_lock = threading.Lock()
+
+
+def archive_dir(model, using="default"):
+    root = str(settings.ARCHIVE_DIR)
+    if using != "default":
+        root = os.path.join(root, using)
+    return os.path.join(root, model._meta.db_table)
+
+
+def month_path(model, month, using="default"):
+    return os.path.join(archive_dir(model, using), f"{month:%Y-%m}.npz")
+
+
+def archived_months(model, using="default"):
+    """First days of the months with an archive file, oldest first."""
+    try:
+        names = os.listdir(archive_dir(model, using))
+    except FileNotFoundError:
+        return []
+    months = []
+    for name in names:
+        if name.endswith(".npz"):
+            try:
+                months.append(datetime.strptime(name[:-4], "%Y-%m").date())
+            except ValueError:
+                continue
+    return sorted(months)
+
+
+def next_month(month):
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1, day=1)
+
+
+def month_filter(model, month, before=False):
+    """Filter kwargs selecting ``month`` (or everything before it) of ``model``."""
+    field = MONTH_FIELDS[model]
+    start, end = month, next_month(month)
+    if isinstance(model._meta.get_field(field), models.DateTimeField):
+        start = datetime.combine(start, datetime.min.time(), dt_timezone.utc)
+        end = datetime.combine(end, datetime.min.time(), dt_timezone.utc)
+    if before:
+        return {f"{field}__lt": start}
+    return {f"{field}__gte": start, f"{field}__lt": end}
+
+
+def _fields(model):
+    return list(model._meta.concrete_fields)
+
+
+def _encode(field, values):
+    """Columns (name -> array) for one field's values."""
+    name = field.attname
+    nulls = np.array([value is None for value in values], dtype=bool)
+    columns = {}
+
+    if isinstance(field, (models.CharField, models.TextField)):
+        encoded = [(value or "").encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        columns[name] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        columns[f"{name}__offsets"] = offsets
+    elif isinstance(field, models.DateTimeField):
+        columns[name] = np.array(
+            [0 if value is None else (value - _EPOCH) // _MICROSECOND for value in values],
+            dtype=np.int64,
+        )
+    elif isinstance(field, models.DateField):
+        columns[name] = np.array(
+            [0 if value is None else value.toordinal() for value in values],
+            dtype=np.int32,
+        )
+    elif isinstance(field, models.DecimalField):
+        scale = 10 ** field.decimal_places
+        columns[name] = np.array(
+            [0 if value is None else int(value * scale) for value in values],
+            dtype=np.int64,
+        )
+    else:
+        columns[name] = np.array(
+            [0 if value is None else value for value in values], dtype=np.int64
+        )
+
+    if field.null:
+        columns[f"{name}__null"] = nulls
+    return columns
+
+
+def _decode(field, columns, index):
+    """Python values of ``field`` for the rows at ``index``."""
+    name = field.attname
+    if name not in columns:
+        # Field added after this month was archived
+        return [field.get_default()] * len(index)
+    raw = columns[name]
+
+    if isinstance(field, (models.CharField, models.TextField)):
+        offsets = columns[f"{name}__offsets"]
+        blob = raw.tobytes()
+        values = [
+            blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in index.tolist()
+        ]
+    elif isinstance(field, models.DateTimeField):
+        values = [_EPOCH + value * _MICROSECOND for value in raw[index].tolist()]
+    elif isinstance(field, models.DateField):
+        # Nulls are stored as 0, which is not a valid ordinal
+        values = [date.fromordinal(value) if value else None for value in raw[index].tolist()]
+    elif isinstance(field, models.DecimalField):
+        exponent = Decimal(1).scaleb(-field.decimal_places)
+        values = [Decimal(value) * exponent for value in raw[index].tolist()]
+    else:
+        values = raw[index].tolist()
+
+    nulls = columns.get(f"{name}__null")
+    if nulls is not None:
+        values = [None if null else value for value, null in zip(values, nulls[index].tolist())]
+    return values
+
+
+def write_month(model, month, rows, using="default"):
+    """
+    Write ``rows`` (dicts keyed by field attname) as the archive for ``month``,
+    merged with anything already archived for it.
+
+    The file is written next to its final name and renamed into place, so
+    readers never see a partial archive.
+    """
+    existing = load_month(model, month, using)
+    fields = _fields(model)
+    pk = model._meta.pk.attname
+
+    if existing is not None:
+        archived = {row[pk] for row in rows}
+        old_index = np.flatnonzero(~np.isin(existing[pk], list(archived)))
+        old_rows = [
+            dict(zip([field.attname for field in fields], values))
+            for values in zip(*[_decode(field, existing, old_index) for field in fields])
+        ]
+        rows = old_rows + list(rows)
+
+    rows = sorted(rows, key=lambda row: row[pk])
+    columns = {}
+    for field in fields:
+        columns.update(_encode(field, [row[field.attname] for row in rows]))
+
+    path = month_path(model, month, using)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.partial"
+    with open(partial, "wb") as handle:
+        np.savez_compressed(handle, **columns)
+    os.replace(partial, path)
+    _forget(path)
+    return len(rows)
+
+
+def load_month(model, month, using="default"):
+    """Columns of the archive for ``month``, or None when there is none."""
+    path = month_path(model, month, using)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _month_cache_lock:
+        cached = _month_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            _month_cache.move_to_end(path)
+            return cached[1]
+
+    with np.load(path) as archive:
+        columns = {name: archive[name] for name in archive.files}
+
+    with _month_cache_lock:
+        _month_cache[path] = (mtime, columns)
+        while len(_month_cache) > _MONTH_CACHE_SIZE:
+            _month_cache.popitem(last=False)
+    return columns
+
+
+def _forget(path):
+    with _month_cache_lock:
+        _month_cache.pop(path, None)
+
+
+def read_archived(model, user_id, start, end):
+    """
+    Unsaved ``model`` instances for ``user_id`` whose month field falls
+    between the dates ``start`` and ``end`` (inclusive), from the archive.
+    Every shard's archive is searched, since a driver may have moved shards.
+    """
+    month_field = model._meta.get_field(MONTH_FIELDS[model])
+    fields = _fields(model)
+    instances = []
+
+    months = [
+        (alias, month)
+        for alias in settings.SHARDS
+        for month in archived_months(model, alias)
+        if start.replace(day=1) <= month <= end
+    ]
+    for alias, month in months:
+        columns = load_month(model, month, alias)
+        if columns is None:
+            continue
+
+        when = columns[month_field.attname]
+        if isinstance(month_field, models.DateTimeField):
+            low = (date.toordinal(start) - _EPOCH.toordinal()) * _DAY_US
+            high = (date.toordinal(end) - _EPOCH.toordinal() + 1) * _DAY_US
+            in_range = (when >= low) & (when < high)
+        else:
+            in_range = (when >= start.toordinal()) & (when <= end.toordinal())
+        index = np.flatnonzero((columns["user_id"] == user_id) & in_range)
+        if not len(index):
+            continue
+
+        values = [_decode(field, columns, index) for field in fields]
+        for row in zip(*values):
+            instances.append(model(**dict(zip([field.attname for field in fields], row))))
+    return instances
+
+
+def archive_month(model, month, batch_size=1000, using="default"):
+    """
+    Move every row of ``model`` in ``month`` from the database to its archive
+    file and return how many rows moved.
+
+    The file is complete before any row is deleted, and re-running a month
+    merges into the existing file, so an interrupted run is safe to repeat.
+    """
+    fields = [field.attname for field in _fields(model)]
+    pk = model._meta.pk.attname
+
+    rows = list(
+        model.objects.using(using)
+        .filter(**month_filter(model, month))
+        .order_by(pk)
+        .values(*fields)
+        .iterator(chunk_size=batch_size)
+    )
+    if not rows:
+        return 0
+
+    write_month(model, month, rows, using)
+
+    # Plain DELETEs: nothing references these rows, and going through the ORM
+    # would load every instance just to send delete signals
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    ids = [row[pk] for row in rows]
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            with transaction.atomic(using=using):
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(chunk))})",
+                    chunk,
+                )
+
+    for user_id in {row["user_id"] for row in rows}:
+        bump_user_version(user_id)
+    return len(rows)
+
+
+def with_archived_logs(logs, user_id, start, end):
+    """
+    Hot ``logs`` plus the user's archived logs dated ``start`` to ``end``,
+    newest first by ``created_at`` like the hot query.
+    """
+    logs = list(logs)
+    if start is None or not any(archived_months(DriverLog, alias) for alias in settings.SHARDS):
+        return logs
+    archived = read_archived(DriverLog, user_id, start, end)
+    if archived:
+        logs.extend(archived)
+        logs.sort(key=lambda log: log.created_at, reverse=True)
+    return logs
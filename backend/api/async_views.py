@@ -0,0 +1,120 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.views import APIView
+
+from . import queries
+from .archive import with_archived_logs
+from .cache import acache_user_response
+from .models import spotter_users
+from .serializers import TripSerializer, DriverLogSerializer, DailyHOSSummarySerializer
+
+# Async counterparts of the dashboard read endpoints. Under an ASGI server
+# (e.g. ``uvicorn spotter.asgi:application``) a request waiting on the
+# database parks on the event loop instead of holding a worker thread.
+
+
+def _json_response(data, status_code=status.HTTP_200_OK):
+    response = JsonResponse(data, status=status_code, safe=False)
+    # Keep the payload around like DRF's Response so it can be cached
+    response.data = data
+    return response
+
+
+def _error(message, status_code=status.HTTP_400_BAD_REQUEST):
+    return _json_response({"error": message}, status_code)
+
+
+def _check_access(request):
+    """
+    Run DRF's authentication and permission checks (DEFAULT_AUTHENTICATION_CLASSES,
+    i.e. CachedJWTAuthentication, and DEFAULT_PERMISSION_CLASSES) as the sync
+    views do. Returns the error response, or None to go on.
+    """
+    view = APIView()
+    view.headers = {}
+    drf_request = view.initialize_request(request)
+    view.request = drf_request
+    try:
+        view.perform_authentication(drf_request)
+        view.check_permissions(drf_request)
+    except APIException as exc:
+        data = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+        response = _json_response(data, exc.status_code)
+        authenticate_header = view.get_authenticate_header(drf_request)
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED and authenticate_header:
+            response["WWW-Authenticate"] = authenticate_header
+        return response
+    request.user = drf_request.user
+    return None
+
+
+def authenticated(view):
+    # Outside the response cache, so a cached response is never served to a
+    # request the sync view would turn away
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        denied = await sync_to_async(_check_access)(request)
+        if denied is not None:
+            return denied
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def _user_exists(user_id):
+    try:
+        await spotter_users.objects.only("user_id").aget(user_id=user_id)
+    except spotter_users.DoesNotExist:
+        return False
+    return True
+
+
+@authenticated
+@acache_user_response("TripListCreateView")
+async def user_trips(request, user_id):
+    if not await _user_exists(user_id):
+        return _error("User not found", status.HTTP_404_NOT_FOUND)
+    try:
+        trips = queries.user_trips(user_id, request.GET)
+    except queries.InvalidQuery as e:
+        return _error(str(e))
+
+    data = TripSerializer([trip async for trip in trips], many=True).data
+    return _json_response(data)
+
+
+@authenticated
+@acache_user_response("UserLogsView")
+async def user_logs(request, user_id):
+    if not await _user_exists(user_id):
+        return _error("User not found", status.HTTP_404_NOT_FOUND)
+    try:
+        logs, archive_range = queries.user_logs(user_id, request.GET)
+    except queries.InvalidQuery as e:
+        return _error(str(e))
+
+    logs = [log async for log in logs]
+    if archive_range[0] is not None:
+        logs = await sync_to_async(with_archived_logs)(logs, user_id, *archive_range)
+    data = DriverLogSerializer(logs, many=True).data
+    return _json_response(data)
+
+
+@authenticated
+@acache_user_response("UserHOSSummaryView")
+async def user_hos(request, user_id):
+    if not await _user_exists(user_id):
+        return _error("User not found", status.HTTP_404_NOT_FOUND)
+    try:
+        summaries = queries.user_hos_summaries(user_id, request.GET)
+    except queries.InvalidQuery as e:
+        return _error(str(e))
+
+    data = DailyHOSSummarySerializer(
+        [summary async for summary in summaries], many=True
+    ).data
+    return _json_response(data)
@@ -0,0 +1,134 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import spotter_users
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_SIZE = 10000
+
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+def get_cached_user(user_id):
+    """
+    ``spotter_users`` row for ``user_id``, from a per-process cache that keeps
+    each user for ``AUTH_USER_CACHE_SECONDS``. Saves and deletes evict the
+    entry in this process (see signals); other processes see changes within
+    the TTL.
+    """
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+        if entry is not None and entry[0] > now:
+            _user_cache.move_to_end(user_id)
+            return entry[1]
+
+    user = spotter_users.objects.filter(user_id=user_id).first()
+    if user is not None:
+        with _user_cache_lock:
+            _user_cache[user_id] = (now + settings.AUTH_USER_CACHE_SECONDS, user)
+            while len(_user_cache) > USER_CACHE_SIZE:
+                _user_cache.popitem(last=False)
+    return user
+
+
+def evict_cached_user(user_id):
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that resolves ``spotter_users`` through the user cache."""
+
+    def get_user(self, validated_token):
+        try:
+            # The claim is a string; the cache (and its eviction) is keyed by
+            # the integer id
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        return user
+
+
+class LastSeenRecorder:
+    """
+    Buffers "user logged in at" timestamps and writes them in one batched
+    UPDATE at most every ``interval`` seconds, so a login storm doesn't turn
+    into a row write per login. The flush piggybacks on the next recorded
+    login once the interval has passed, and runs again at exit.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.pending = {}
+        self.database = None
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        atexit.register(self.flush_at_exit)
+
+    def _current_database(self):
+        return connections[DEFAULT_DB_ALIAS].settings_dict["NAME"]
+
+    def record(self, user_id, when=None):
+        with self.lock:
+            self.pending[user_id] = when or timezone.now()
+            self.database = self._current_database()
+            due = time.monotonic() - self.last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def flush_at_exit(self):
+        # Logins recorded against a database that is gone by now (a test
+        # database) must not be written to whichever one replaced it
+        if self.pending and self.database == self._current_database():
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            spotter_users.objects.bulk_update(
+                [
+                    spotter_users(user_id=user_id, updated_at=when)
+                    for user_id, when in pending.items()
+                ],
+                ["updated_at"],
+            )
+        except DatabaseError:
+            logger.exception("Failed to flush last-seen times for %d users", len(pending))
+            # Keep the timestamps for the next flush unless newer ones arrived
+            with self.lock:
+                for user_id, when in pending.items():
+                    self.pending.setdefault(user_id, when)
+
+
+last_seen = LastSeenRecorder(settings.LAST_SEEN_FLUSH_SECONDS)
+
+
+# Password hashing is deliberately slow; capping how many run at once keeps a
+# login storm from starving every other request of CPU. Logins beyond the cap
+# wait up to LOGIN_HASH_WAIT_SECONDS for a slot.
+password_check_slots = threading.BoundedSemaphore(
+    settings.LOGIN_MAX_CONCURRENT_HASHES or os.cpu_count() or 1
+)
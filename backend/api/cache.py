@@ -0,0 +1,169 @@
+import functools
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from .routers import pin_to_primary
+
+# (user_id, trip_id) pairs written inside batched_user_changes()
+_pending_changes = ContextVar("pending_user_changes", default=None)
+
+
+def _version_key(user_id):
+    return f"user-version:{user_id}"
+
+
+def _initial_version():
+    # A counter that was evicted restarts here rather than at 1, so it can't
+    # land back on a version whose responses are still cached
+    return time.time_ns() // 1000
+
+
+def get_user_version(user_id):
+    return cache.get_or_set(_version_key(user_id), _initial_version, timeout=None)
+
+
+async def aget_user_version(user_id):
+    return await cache.aget_or_set(_version_key(user_id), _initial_version, timeout=None)
+
+
+def bump_user_version(user_id):
+    """
+    Invalidate every cached read response for a user.
+
+    Cached responses embed the version in their key, so bumping it is a
+    single counter increment; the stale entries simply age out. With the
+    default local-memory cache both the counter and the responses are per
+    process, so this only invalidates what this process cached.
+    """
+    key = _version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter was never read or has been evicted
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.incr(key)
+
+
+def user_data_changed(user_id, trip_id=None):
+    """
+    Rows of ``user_id`` (and ``trip_id``) were written: invalidate their
+    cached reads and keep their reads on the primary for a while. Inside
+    ``batched_user_changes`` this is deferred and done once per user.
+    """
+    pending = _pending_changes.get()
+    if pending is not None:
+        pending.add((user_id, trip_id))
+        return
+    bump_user_version(user_id)
+    pin_to_primary(user_id=user_id, trip_id=trip_id)
+
+
+@contextmanager
+def batched_user_changes():
+    """
+    Collect the ``user_data_changed`` calls of a bulk write and apply them
+    once the transaction commits, so saving N rows for one driver costs one
+    version bump and one pin rather than N of each.
+    """
+    if _pending_changes.get() is not None:
+        # The outermost block applies them
+        yield
+        return
+    pending = set()
+    token = _pending_changes.set(pending)
+    try:
+        yield
+    finally:
+        _pending_changes.reset(token)
+        if pending:
+            transaction.on_commit(functools.partial(_apply_changes, pending))
+
+
+def _apply_changes(changes):
+    trips = {}
+    for user_id, trip_id in changes:
+        trips.setdefault(user_id, set()).add(trip_id)
+    for user_id, trip_ids in trips.items():
+        bump_user_version(user_id)
+        trip_ids.discard(None)
+        for trip_id in trip_ids or [None]:
+            pin_to_primary(user_id=user_id, trip_id=trip_id)
+
+
+def _query_digest(query_params):
+    params = "&".join(
+        f"{name}={value}"
+        for name in sorted(query_params)
+        for value in query_params.getlist(name)
+    )
+    return hashlib.md5(params.encode("utf-8")).hexdigest()
+
+
+def response_cache_key(view_name, user_id, query_params):
+    version = get_user_version(user_id)
+    return f"resp:{view_name}:{user_id}:{version}:{_query_digest(query_params)}"
+
+
+async def aresponse_cache_key(view_name, user_id, query_params):
+    version = await aget_user_version(user_id)
+    return f"resp:{view_name}:{user_id}:{version}:{_query_digest(query_params)}"
+
+
+def cache_user_response(view_method):
+    """
+    Cache successful responses of a per-user ``get`` handler.
+
+    Entries are keyed by view, user, query string and the user's version
+    counter, so any write for that user makes them unreachable at once.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, user_id, *args, **kwargs):
+        key = response_cache_key(type(self).__name__, user_id, request.query_params)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK)
+
+        response = view_method(self, request, user_id, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.API_RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
+
+
+def acache_user_response(view_name):
+    """
+    ``cache_user_response`` for async function views returning JSON.
+
+    ``view_name`` is the matching sync view, so both read paths share
+    entries for the same user and query string.
+    """
+
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        async def wrapper(request, user_id, *args, **kwargs):
+            key = await aresponse_cache_key(view_name, user_id, request.GET)
+            data = await cache.aget(key)
+            if data is not None:
+                return JsonResponse(data, safe=False)
+
+            response = await view_func(request, user_id, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                await cache.aset(
+                    key, response.data, settings.API_RESPONSE_CACHE_TIMEOUT
+                )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,245 @@
+"""
+Compact binary wire format for driver logs.
+
+A list of logs travels as one MessagePack map of columns instead of an array
+of JSON objects::
+
+    {"v": 1, "n": <rows>, "columns": {<field>: <column>, ...}}
+
+Each column is an array ``[kind, param, dtype, data]`` plus, when the column
+has nulls, a fifth element with the null mask (``numpy.packbits`` order).
+``data`` is a little-endian integer array (``dtype`` is one of i1, i2, i4,
+i8, the narrowest that fits) read as:
+
+- ``"delta"``: ``param`` plus the running sum of ``data``. Ids, times (epoch
+  milliseconds) and dates (days since 1970-01-01) use it.
+- ``"fixed"``: ``data`` scaled by ``10 ** -param``; coordinates and mileage.
+- ``"dict"``: indexes into ``param``, the list of distinct strings; statuses
+  and the repetitive descriptions.
+
+Clients opt in with ``Accept:`` / ``Content-Type: application/vnd.spotter.logs+msgpack``.
+Requires the ``msgpack`` package; without it only JSON is offered.
+"""
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from rest_framework import status
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+from .admission import PayloadRejected
+
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+
+MEDIA_TYPE = "application/vnd.spotter.logs+msgpack"
+FORMAT_VERSION = 1
+
+# Wire layout of each DriverLog field, in column order
+LOG_COLUMNS = {
+    "log_id": ("delta", None),
+    "trip": ("delta", None),
+    "user": ("delta", None),
+    "log_time": ("time", None),
+    "log_date": ("date", None),
+    "status": ("dict", None),
+    "description": ("dict", None),
+    "latitude": ("fixed", 7),
+    "longitude": ("fixed", 7),
+    "miles_remaining": ("fixed", 2),
+    "geohash": ("dict", None),
+    "created_at": ("time", None),
+}
+# Columns a client may upload; the view fills in trip and user
+UPLOAD_COLUMNS = ("log_time", "status", "description", "latitude", "longitude", "miles_remaining")
+
+_DTYPES = {name: np.dtype(name).newbyteorder("<") for name in ("i1", "i2", "i4", "i8")}
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def available():
+    return msgpack is not None
+
+
+def _narrowest(values):
+    array = np.asarray(values, dtype=np.int64)
+    low, high = (int(array.min()), int(array.max())) if len(array) else (0, 0)
+    for name, dtype in _DTYPES.items():
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return name, array.astype(dtype).tobytes()
+    raise ValueError("value out of range")
+
+
+def _millis(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return (value - _EPOCH) // _MILLISECOND
+
+
+def _days(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - _EPOCH_DAY
+
+
+def _scaled(value, places):
+    return int(Decimal(value).scaleb(places).to_integral_value())
+
+
+def encode_column(kind, param, values):
+    nulls = [value is None for value in values]
+    present = [value for value in values if value is not None]
+
+    if kind == "dict":
+        index = {}
+        codes = [index.setdefault(value, len(index)) for value in present]
+        param = list(index)
+    elif kind == "fixed":
+        codes = [_scaled(value, param) for value in present]
+    else:
+        if kind == "time":
+            numbers = [_millis(value) for value in present]
+        elif kind == "date":
+            numbers = [_days(value) for value in present]
+        else:
+            numbers = [int(value) for value in present]
+        param = numbers[0] if numbers else 0
+        codes = np.diff(np.asarray(numbers, dtype=np.int64), prepend=param)
+
+    if any(nulls):
+        # Null slots hold a zero code (a repeat of the previous value for deltas)
+        full = np.zeros(len(values), dtype=np.int64)
+        full[~np.array(nulls)] = codes
+        codes = full
+    dtype, data = _narrowest(codes)
+    column = [kind if kind in ("dict", "fixed") else "delta", param, dtype, data]
+    if any(nulls):
+        column.append(np.packbits(nulls).tobytes())
+    return column
+
+
+def encode_rows(rows, columns=LOG_COLUMNS):
+    """The table for ``rows`` (dicts; serialized or model values) as a map."""
+    present = [name for name in columns if rows and name in rows[0]]
+    return {
+        "v": FORMAT_VERSION,
+        "n": len(rows),
+        "columns": {
+            name: encode_column(*columns[name], [row[name] for row in rows])
+            for name in present
+        },
+    }
+
+
+def _decode_column(name, kind, column, n):
+    if not isinstance(column, list) or len(column) not in (4, 5):
+        raise PayloadRejected(f"Invalid log table: malformed column {name}")
+    wire_kind, param, dtype, data = column[:4]
+    if dtype not in _DTYPES or not isinstance(data, bytes) or len(data) != n * _DTYPES[dtype].itemsize:
+        raise PayloadRejected(f"Invalid log table: column {name} does not hold {n} values")
+    codes = np.frombuffer(data, dtype=_DTYPES[dtype])
+
+    if kind == "dict":
+        if wire_kind != "dict" or not isinstance(param, list):
+            raise PayloadRejected(f"Invalid log table: {name} must be a dict column")
+        if len(codes) and (codes.min() < 0 or codes.max() >= len(param)):
+            raise PayloadRejected(f"Invalid log table: {name} index out of range")
+        values = [param[code] for code in codes.tolist()]
+    elif kind == "fixed":
+        if wire_kind != "fixed" or not isinstance(param, int) or not 0 <= param <= 18:
+            raise PayloadRejected(f"Invalid log table: {name} must be a fixed column")
+        exponent = Decimal(1).scaleb(-param)
+        values = [Decimal(code) * exponent for code in codes.tolist()]
+    else:
+        if wire_kind != "delta" or not isinstance(param, int):
+            raise PayloadRejected(f"Invalid log table: {name} must be a delta column")
+        try:
+            numbers = (param + np.cumsum(codes, dtype=np.int64)).tolist()
+            if kind == "time":
+                values = [_EPOCH + number * _MILLISECOND for number in numbers]
+            elif kind == "date":
+                values = [date.fromordinal(number + _EPOCH_DAY) for number in numbers]
+            else:
+                values = numbers
+        except (OverflowError, ValueError):
+            raise PayloadRejected(f"Invalid log table: {name} out of range")
+
+    if len(column) == 5:
+        mask = column[4]
+        if not isinstance(mask, bytes) or len(mask) != (n + 7) // 8:
+            raise PayloadRejected(f"Invalid log table: bad null mask for {name}")
+        nulls = np.unpackbits(np.frombuffer(mask, dtype=np.uint8), count=n).astype(bool)
+        values = [None if null else value for value, null in zip(values, nulls.tolist())]
+    return values
+
+
+def decode_rows(body, max_items, columns=LOG_COLUMNS, accepted=UPLOAD_COLUMNS):
+    """
+    Row dicts (Python values) from an uploaded table, with only the
+    ``accepted`` columns. Raises ``PayloadRejected`` for a malformed table or
+    one with more than ``max_items`` rows, before decoding any column.
+    """
+    try:
+        table = msgpack.unpackb(body, raw=False, strict_map_key=False)
+    except (ValueError, msgpack.UnpackException):
+        raise PayloadRejected("Invalid MessagePack body")
+    if not isinstance(table, dict) or table.get("v") != FORMAT_VERSION:
+        raise PayloadRejected(f"Expected a version {FORMAT_VERSION} log table")
+    n = table.get("n")
+    if not isinstance(n, int) or n < 0:
+        raise PayloadRejected("Invalid log table: n must be the row count")
+    if n > max_items:
+        raise PayloadRejected(
+            f"At most {max_items} items per request",
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+    sent = table.get("columns")
+    if not isinstance(sent, dict):
+        raise PayloadRejected("Invalid log table: missing columns")
+
+    decoded = {
+        name: _decode_column(name, columns[name][0], sent[name], n)
+        for name in accepted
+        if name in sent
+    }
+    if not decoded:
+        return [{} for _ in range(n)]
+    return [dict(zip(decoded, values)) for values in zip(*decoded.values())]
+
+
+def _pack(data):
+    # Lists of logs become tables; errors and the like stay plain values
+    if isinstance(data, list):
+        return encode_rows(data)
+    if isinstance(data, dict) and isinstance(data.get("created"), list):
+        return {**data, "created": encode_rows(data["created"])}
+    return data
+
+
+class ColumnarLogsRenderer(BaseRenderer):
+    media_type = MEDIA_TYPE
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(_pack(data), use_bin_type=True)
+
+
+def log_renderers():
+    """The default renderers, plus the columnar one when msgpack is installed."""
+    renderers = list(api_settings.DEFAULT_RENDERER_CLASSES)
+    if available():
+        renderers.append(ColumnarLogsRenderer)
+    return renderers
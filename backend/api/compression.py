@@ -0,0 +1,135 @@
+import gzip
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_user_version
+from .columnar import MEDIA_TYPE as COLUMNAR_MEDIA_TYPE
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Columnar log tables still shrink several times more: their dictionaries
+# and small deltas repeat
+COMPRESSIBLE_TYPES = ("application/json", "text/", COLUMNAR_MEDIA_TYPE)
+
+
+def available_encodings():
+    """Supported codings, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Best coding the client accepts per its ``Accept-Encoding`` header, or
+    None for identity. Higher q-values win; ties go to our preference order.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in available_encodings():
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(body, coding, level=None):
+    if coding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY if level is None else level)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL if level is None else level, mtime=0)
+
+
+def _set_encoding(response, coding):
+    response["Content-Encoding"] = coding
+    response["Content-Length"] = str(len(response.content))
+    # A strong ETag names the uncompressed bytes
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = "W/" + etag
+
+
+class CompressionMiddleware:
+    """
+    gzip or brotli compresses API responses of ``COMPRESS_MIN_BYTES`` or
+    more, negotiated from ``Accept-Encoding``. Responses that already carry
+    a Content-Encoding (see ``precompressed_response``) pass through.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES)
+            or len(response.content) < settings.COMPRESS_MIN_BYTES
+        ):
+            return response
+
+        coding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if coding is None:
+            return response
+
+        compressed = compress(response.content, coding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        _set_encoding(response, coding)
+        return response
+
+
+def precompressed_response(request, key, build):
+    """
+    JSON response for an immutable payload, serialized and compressed once.
+
+    ``build()`` returns the payload data; it is only called on a miss. The
+    rendered JSON and each supported compressed form are cached together
+    under ``key``, which must change whenever the payload could.
+    """
+    variants = cache.get(key)
+    if variants is None:
+        body = JSONRenderer().render(build())
+        variants = {None: body}
+        for coding in available_encodings():
+            variants[coding] = compress(body, coding, level=settings.PRECOMPRESS_LEVELS[coding])
+        cache.set(key, variants, settings.PRECOMPRESSED_RESPONSE_TIMEOUT)
+
+    coding = None
+    if len(variants[None]) >= settings.COMPRESS_MIN_BYTES:
+        coding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if coding not in variants:
+            # Cached by a process without brotli
+            coding = None
+    response = HttpResponse(variants[coding], content_type="application/json")
+    if coding:
+        _set_encoding(response, coding)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def trip_payload_key(trip):
+    """Cache key for a trip's detail payload; any write for the driver changes it."""
+    return f"trip-detail:{trip.trip_id}:{get_user_version(trip.user_id)}"
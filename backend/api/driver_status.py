@@ -0,0 +1,103 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .geo import encode_geohash
+from .models import DailyHOSSummary, DriverStatus, spotter_users, terminal_date
+
+REGION_PRECISION = 4  # ~39 x 20 km cells; filter with any shorter prefix
+CYCLE_HOURS = Decimal(70)
+CYCLE_DAYS = 8
+
+
+def _upsert(user_id, newer_than_field, timestamp, values, create=True):
+    """
+    Apply ``values`` unless the stored row already reflects something newer.
+
+    One conditional UPDATE in the common case; the row is created on the
+    driver's first event.
+    """
+    updated = (
+        DriverStatus.objects.filter(user_id=user_id)
+        .filter(
+            Q(**{f"{newer_than_field}__isnull": True})
+            | Q(**{f"{newer_than_field}__lte": timestamp})
+        )
+        .update(updated_at=timezone.now(), **values)
+    )
+    if not updated and create:
+        DriverStatus.objects.get_or_create(user_id=user_id, defaults=values)
+
+
+def record_logs(user_id, logs):
+    """Update status (and position, if known) from newly ingested DriverLogs."""
+    logs = list(logs)
+    if not logs:
+        return
+
+    latest = max(logs, key=lambda log: log.log_time)
+    _upsert(
+        user_id,
+        "status_since",
+        latest.log_time,
+        {
+            "current_status": latest.status,
+            "status_since": latest.log_time,
+            "trip_id": latest.trip_id,
+        },
+    )
+
+    positioned = [log for log in logs if log.latitude is not None and log.longitude is not None]
+    if positioned:
+        latest = max(positioned, key=lambda log: log.log_time)
+        record_position(user_id, latest.trip_id, latest.latitude, latest.longitude, latest.log_time)
+
+
+def record_position(user_id, trip_id, latitude, longitude, at):
+    _upsert(
+        user_id,
+        "position_at",
+        at,
+        {
+            "trip_id": trip_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "position_at": at,
+            "region": encode_geohash(latitude, longitude, REGION_PRECISION),
+        },
+    )
+
+
+def refresh_hos(user_id, today=None, create=True):
+    """Recompute today's hours and the 70-hour cycle from DailyHOSSummary."""
+    if today is None:
+        zone_name = (
+            spotter_users.objects.filter(user_id=user_id)
+            .values_list("terminal_timezone", flat=True)
+            .first()
+        )
+        today = terminal_date(timezone.now(), zone_name)
+    summaries = DailyHOSSummary.objects.filter(user_id=user_id)
+
+    current = summaries.filter(log_date=today).values_list(
+        "total_drive_time", "total_duty_time"
+    ).first()
+    cycle_used = summaries.filter(
+        log_date__gt=today - timedelta(days=CYCLE_DAYS), log_date__lte=today
+    ).aggregate(total=Sum("total_duty_time"))["total"] or Decimal(0)
+
+    drive, duty = current or (Decimal(0), Decimal(0))
+    _upsert(
+        user_id,
+        "hos_date",
+        today,
+        {
+            "hos_date": today,
+            "drive_hours_today": drive,
+            "duty_hours_today": duty,
+            "cycle_remaining": max(Decimal(0), CYCLE_HOURS - cycle_used),
+        },
+        create=create,
+    )
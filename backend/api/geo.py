@@ -0,0 +1,129 @@
+import math
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(latitude, longitude, precision=6):
+    """Standard base32 geohash of a point."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude = float(latitude)
+    longitude = float(longitude)
+
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+# Degrees of latitude per mile, and the most cells a proximity query may
+# OR together before falling back to coarser cells
+MILES_PER_DEGREE = 69.05
+MAX_COVER_CELLS = 64
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell at ``precision``."""
+    bits = 5 * precision
+    lng_bits = (bits + 1) // 2
+    return 180.0 / (1 << (bits - lng_bits)), 360.0 / (1 << lng_bits)
+
+
+def radius_bounds(latitude, longitude, radius_miles):
+    """(min_lat, min_lng, max_lat, max_lng) enclosing a circle."""
+    latitude = float(latitude)
+    longitude = float(longitude)
+    dlat = radius_miles / MILES_PER_DEGREE
+    min_lat, max_lat = latitude - dlat, latitude + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        # The circle takes in a pole, so every longitude
+        return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+    # Widest at the edge nearest a pole
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    dlng = min(180.0, radius_miles / (MILES_PER_DEGREE * cos_lat))
+    return min_lat, longitude - dlng, max_lat, longitude + dlng
+
+
+def covering_cells(min_lat, min_lng, max_lat, max_lng, max_precision, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash cells that together cover a bounding box, at the finest precision
+    (up to ``max_precision``) that needs no more than ``max_cells`` of them.
+    Longitudes past +/-180 wrap around.
+    """
+    min_lat = max(-90.0, min(90.0, float(min_lat)))
+    max_lat = max(-90.0, min(90.0, float(max_lat)))
+    min_lng = float(min_lng)
+    max_lng = float(max_lng)
+    if max_lng - min_lng >= 360:
+        min_lng, max_lng = -180.0, 180.0
+
+    cells = [""]
+    for precision in range(1, max_precision + 1):
+        height, width = cell_size(precision)
+        rows = range(
+            int((min_lat + 90) // height),
+            min(int((max_lat + 90) // height), int(180 / height) - 1) + 1,
+        )
+        columns = range(int((min_lng + 180) // width), int((max_lng + 180) // width) + 1)
+        if len(rows) * len(columns) > max_cells:
+            break
+        column_count = int(360 / width)
+        cells = sorted({
+            encode_geohash(
+                (row + 0.5) * height - 90,
+                (column % column_count + 0.5) * width - 180,
+                precision,
+            )
+            for row in rows
+            for column in columns
+        })
+    return cells
+
+
+def cell_ranges(cells):
+    """
+    Merge sorted same-length cells into [low, high) string ranges. Cells next
+    to each other in geohash order share one range, so each is a single index
+    range scan; "~" sorts after every geohash character.
+    """
+    ranges = []
+    previous = None
+    for cell in cells:
+        value = _geohash_value(cell)
+        if ranges and previous is not None and value == previous + 1:
+            ranges[-1][1] = cell + "~"
+        else:
+            ranges.append([cell, cell + "~"])
+        previous = value
+    return [tuple(bounds) for bounds in ranges]
+
+
+def _geohash_value(cell):
+    value = 0
+    for char in cell:
+        value = value * 32 + _BASE32.index(char)
+    return value
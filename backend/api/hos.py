@@ -0,0 +1,206 @@
+import re
+from decimal import Decimal
+
+from django.db import connections
+
+from .cache import batched_user_changes, bump_user_version
+from .driver_status import refresh_hos
+from .models import DailyHOSSummary, DriverLog
+from .routers import use_shard
+from .sharding import shard_for_user
+
+MAX_DRIVE_HOURS = 11
+MAX_DUTY_HOURS = 14
+PICKUP_DROPOFF_HOURS = 1
+BREAK_HOURS = 0.5
+OFF_DUTY_HOURS = {"10-hour": 10, "34-hour": 34}
+
+_DRIVING_MINUTES = re.compile(r"Driving for (\d+) minutes")
+_HUNDREDTH = Decimal("0.01")
+
+# Columns day_totals() expects, in order
+LOG_COLUMNS = ("user_id", "log_date", "status", "description")
+
+
+def day_totals(rows):
+    """
+    Drive, duty and rest hours per (user_id, log_date) from DriverLog rows
+    given as ``LOG_COLUMNS`` tuples.
+
+    Driving time comes from "Driving for N minutes" descriptions, each pickup
+    and drop-off is an hour on duty, a rest is a 30-minute break and off-duty
+    entries count as their 10- or 34-hour reset.
+    """
+    totals = {}
+    for user_id, log_date, status, description in rows:
+        day = totals.get((user_id, log_date))
+        if day is None:
+            day = totals[(user_id, log_date)] = [0.0, 0.0, 0.0]
+
+        if status == "Driving":
+            match = _DRIVING_MINUTES.search(description)
+            if match:
+                hours = int(match.group(1)) / 60
+                day[0] += hours
+                day[1] += hours
+        elif status in ("Pickup", "Dropoff"):
+            day[1] += PICKUP_DROPOFF_HOURS
+        elif status == "Resting":
+            day[2] += BREAK_HOURS
+        elif status == "Off Duty":
+            for marker, hours in OFF_DUTY_HOURS.items():
+                if marker in description:
+                    day[2] += hours
+                    break
+    return totals
+
+
+def summary_fields(drive, duty, rest):
+    """DailyHOSSummary column values for a day's totals."""
+
+    def hours(value):
+        return Decimal(str(value)).quantize(_HUNDREDTH)
+
+    return {
+        "total_drive_time": hours(drive),
+        "total_duty_time": hours(duty),
+        "total_rest_time": hours(rest),
+        "available_drive_time": hours(max(0.0, MAX_DRIVE_HOURS - drive)),
+        "available_duty_time": hours(max(0.0, MAX_DUTY_HOURS - duty)),
+    }
+
+
+def save_summaries(totals):
+    """
+    Write ``day_totals()`` output one row at a time, replacing any previous
+    values, so the usual post_save hooks (cache, fleet board, live feed) run.
+    """
+    for (user_id, log_date), (drive, duty, rest) in totals.items():
+        DailyHOSSummary.objects.update_or_create(
+            user_id=user_id,
+            log_date=log_date,
+            defaults=summary_fields(drive, duty, rest),
+        )
+
+
+def refresh_days(user_id, log_dates):
+    """
+    Recompute ``user_id``'s summaries for ``log_dates`` from all of their
+    logs on those days, as ``rebuild_summaries`` would, so every write path
+    agrees with a rebuild. A day left with no logs loses its summary.
+    Returns the ``day_totals()`` written.
+    """
+    log_dates = {day for day in log_dates if day is not None}
+    totals = day_totals(
+        DriverLog.objects.filter(user_id=user_id, log_date__in=log_dates).values_list(*LOG_COLUMNS)
+    )
+    save_summaries(totals)
+    stale = log_dates - {day for _, day in totals}
+    if stale:
+        DailyHOSSummary.objects.filter(user_id=user_id, log_date__in=stale).delete()
+    return totals
+
+
+def stream_logs(queryset, chunk_size):
+    """
+    Iterate ``LOG_COLUMNS`` tuples of ``queryset`` without loading the result
+    set into memory.
+
+    Django's ``iterator()`` streams on PostgreSQL (named cursor) and SQLite,
+    but MySQL drivers buffer the whole result unless asked for an unbuffered
+    (server-side) cursor, so that case uses one directly.
+    """
+    rows = queryset.values_list(*LOG_COLUMNS)
+    connection = connections[rows.db]
+    if connection.vendor != "mysql":
+        yield from rows.iterator(chunk_size=chunk_size)
+        return
+
+    from MySQLdb.cursors import SSCursor
+
+    sql, params = rows.query.sql_with_params()
+    connection.ensure_connection()
+    cursor = connection.connection.cursor(SSCursor)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(chunk_size)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        cursor.close()
+
+
+def rebuild_summaries(user_ids, since=None, until=None, chunk_size=2000, batch_size=500):
+    """
+    Recompute DailyHOSSummary rows for ``user_ids`` from their DriverLogs.
+
+    Days are replaced, not added to, so this can be re-run at any time. Rows
+    are written with batched upserts, and summaries in the range for days
+    that no longer have any logs are deleted. Returns (log rows read,
+    summaries written, summaries deleted).
+    """
+    by_shard = {}
+    for user_id in user_ids:
+        by_shard.setdefault(shard_for_user(user_id), []).append(user_id)
+
+    counts = [0, 0, 0]
+    for alias, shard_users in by_shard.items():
+        with use_shard(alias):
+            shard_counts = _rebuild_shard(shard_users, since, until, chunk_size, batch_size)
+        counts = [total + n for total, n in zip(counts, shard_counts)]
+    return tuple(counts)
+
+
+def _rebuild_shard(user_ids, since, until, chunk_size, batch_size):
+    logs = DriverLog.objects.filter(user_id__in=user_ids, log_date__isnull=False)
+    if since:
+        logs = logs.filter(log_date__gte=since)
+    if until:
+        logs = logs.filter(log_date__lte=until)
+
+    read = 0
+
+    def counted(rows):
+        nonlocal read
+        for row in rows:
+            read += 1
+            yield row
+
+    # The stream must be drained before the same connection can write
+    totals = day_totals(counted(stream_logs(logs.order_by(), chunk_size)))
+
+    summaries = [
+        DailyHOSSummary(user_id=user_id, log_date=log_date, **summary_fields(*day))
+        for (user_id, log_date), day in totals.items()
+    ]
+    DailyHOSSummary.objects.bulk_create(
+        summaries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["user", "log_date"],
+        update_fields=[*summary_fields(0, 0, 0), "updated_at"],
+    )
+
+    # bulk_create skips post_save, so do its cache and fleet-board work here
+    for user_id in {user_id for user_id, _ in totals}:
+        bump_user_version(user_id)
+        refresh_hos(user_id)
+
+    # Days whose logs are gone (deletes run post_delete, unlike bulk_create)
+    days = {}
+    for user_id, log_date in totals:
+        days.setdefault(user_id, set()).add(log_date)
+    deleted = 0
+    with batched_user_changes():
+        for user_id in user_ids:
+            stale = DailyHOSSummary.objects.filter(user_id=user_id).exclude(
+                log_date__in=days.get(user_id, ())
+            )
+            if since:
+                stale = stale.filter(log_date__gte=since)
+            if until:
+                stale = stale.filter(log_date__lte=until)
+            deleted += stale.delete()[0]
+    return read, len(summaries), deleted
@@ -0,0 +1,130 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra`` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=_json_default)
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", errors="replace")
+    return str(value)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through a fraction of records, per endpoint.
+
+    Records carry the endpoint as ``extra={"endpoint": <url name>}``; the rate
+    for it comes from ``rates`` and falls back to ``default_rate``.
+    """
+
+    def __init__(self, rates=None, default_rate=1.0):
+        super().__init__()
+        self.rates = rates or {}
+        self.default_rate = default_rate
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, "endpoint", None), self.default_rate)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Hands records to a background thread that runs the real handlers.
+
+    The calling thread only copies the record onto a bounded queue: message
+    formatting and handler I/O happen on the listener thread. When the queue
+    is full the record is dropped (and counted) instead of blocking the
+    request. ``handlers`` are names of handlers configured in ``LOGGING``.
+    """
+
+    def __init__(self, handlers=(), queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.handler_names = list(handlers)
+        self.dropped = 0
+        self.listener = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The listener thread doesn't survive a fork (and the queue's lock may
+        # have been held when it happened): the child starts its own lazily
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.listener = None
+        self._start_lock = threading.Lock()
+
+    def _start_listener(self):
+        with self._start_lock:
+            if self.listener is not None:
+                return
+            get_handler = getattr(logging, "getHandlerByName", None) or logging._handlers.get
+            targets = [get_handler(name) for name in self.handler_names]
+            self.listener = QueueListener(
+                self.queue, *[target for target in targets if target is not None],
+                respect_handler_level=True,
+            )
+            self.listener.start()
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, leave msg % args for the listener thread.
+        # Tracebacks are rendered now, since the frames won't outlive the call.
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        if self.listener is None:
+            self._start_listener()
+        super().emit(record)
+
+    def flush(self):
+        # Wait for the listener to handle everything queued so far
+        if self.listener is not None:
+            self.queue.join()
+
+    def close(self):
+        with self._start_lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+        super().close()
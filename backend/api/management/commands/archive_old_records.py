@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.archive import MONTH_FIELDS, archive_month, month_filter, next_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Move whole months of driver logs and stops older than "
+        "ARCHIVE_AFTER_MONTHS out of the database into compressed columnar "
+        "files under ARCHIVE_DIR."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            help="Archive months before this one (YYYY-MM). Defaults to "
+            "ARCHIVE_AFTER_MONTHS months before the current month.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = self._cutoff(options["before"])
+
+        for alias in settings.SHARDS:
+            for model in MONTH_FIELDS:
+                self._archive(model, alias, cutoff, options)
+
+    def _archive(self, model, alias, cutoff, options):
+        month_field = MONTH_FIELDS[model]
+        table = model._meta.db_table
+        if alias != "default":
+            table = f"{alias}.{table}"
+        rows = model.objects.using(alias)
+        oldest = (
+            rows.filter(**month_filter(model, cutoff, before=True))
+            .order_by(month_field)
+            .values_list(month_field, flat=True)
+            .first()
+        )
+        if oldest is None:
+            self.stdout.write(f"{table}: nothing before {cutoff:%Y-%m}")
+            return
+        if hasattr(oldest, "date"):
+            oldest = oldest.date()
+
+        month = oldest.replace(day=1)
+        while month < cutoff:
+            if options["dry_run"]:
+                count = rows.filter(**month_filter(model, month)).count()
+            else:
+                count = archive_month(model, month, options["batch_size"], alias)
+            if count:
+                action = "would archive" if options["dry_run"] else "archived"
+                self.stdout.write(f"{table} {month:%Y-%m}: {action} {count} rows")
+            month = next_month(month)
+
+    def _cutoff(self, before):
+        if before:
+            try:
+                year, month = (int(part) for part in before.split("-"))
+                return date(year, month, 1)
+            except ValueError:
+                raise CommandError("--before must be YYYY-MM")
+
+        month = timezone.localdate().replace(day=1)
+        for _ in range(settings.ARCHIVE_AFTER_MONTHS):
+            month = (month - timedelta(days=1)).replace(day=1)
+        return month
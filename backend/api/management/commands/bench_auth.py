@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.authentication import last_seen
+from api.models import spotter_users
+
+PASSWORD = "Bench-Passw0rd"
+
+
+class _QueryCounter:
+    """Counts queries (and writes) across every connection."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.queries += 1
+            if not sql.lstrip().upper().startswith("SELECT"):
+                self.writes += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def reset(self):
+        self.queries = 0
+        self.writes = 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login and JWT-authenticated request throughput, and the "
+        "queries each costs, with the authenticated-user cache on and off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=8)
+
+    def handle(self, *args, **options):
+        counter = _QueryCounter()
+        connection_created.connect(counter.install)
+        counter.install(None, connection)
+
+        stamp = time.time_ns()
+        user = spotter_users.objects.create(
+            username=f"bench-auth-{stamp}",
+            email=f"bench-auth-{stamp}@example.com",
+            password=make_password(PASSWORD),
+        )
+        try:
+            self.stdout.write(f"{'path':>24} {'count':>6} {'seconds':>8} {'req/s':>8} {'queries/req':>12} {'writes/req':>11}")
+
+            body = {"username": user.username, "password": PASSWORD}
+            self._run(
+                "login", counter, options["logins"], options["threads"],
+                lambda client: client.post("/api/login/", body, content_type="application/json"),
+            )
+            last_seen.flush()
+
+            token = str(RefreshToken.for_user(user).access_token)
+            path = f"/api/user/{user.user_id}/"
+            headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+            with override_settings(AUTH_USER_CACHE_SECONDS=0):
+                self._run(
+                    "authenticated, no cache", counter, options["requests"], options["threads"],
+                    lambda client: client.get(path, **headers),
+                )
+            self._run(
+                "authenticated, cached", counter, options["requests"], options["threads"],
+                lambda client: client.get(path, **headers),
+            )
+        finally:
+            connection_created.disconnect(counter.install)
+            user.delete()
+
+    def _run(self, label, counter, count, threads, call):
+        local = threading.local()
+
+        def one(_):
+            if not hasattr(local, "client"):
+                local.client = Client(HTTP_HOST="localhost")
+            response = call(local.client)
+            if response.status_code != 200:
+                raise CommandError(f"{label} returned {response.status_code}")
+
+        # One warm-up call so connection setup isn't measured
+        one(None)
+        counter.reset()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, range(count)))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:>24} {count:>6} {elapsed:>8.2f} {count / elapsed:>8.1f} "
+            f"{counter.queries / count:>12.2f} {counter.writes / count:>11.2f}"
+        )
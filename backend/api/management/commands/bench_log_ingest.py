@@ -0,0 +1,99 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.utils import timezone
+
+from api.models import spotter_users, Trip
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bulk log ingest throughput with application logging on and "
+        "off. Runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batches", type=int, default=50)
+        parser.add_argument("--batch-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        self.client = Client(HTTP_HOST="localhost")
+        with transaction.atomic():
+            trip = self._scratch_trip()
+            batch = self._batch(options["batch_size"])
+
+            # Warm up imports, serializers and the log listener
+            self._post(trip, batch)
+
+            # Alternate the two modes so both see the same table growth
+            on = off = 0.0
+            for _ in range(options["batches"]):
+                on += self._post(trip, batch)
+                logging.disable(logging.CRITICAL)
+                try:
+                    off += self._post(trip, batch)
+                finally:
+                    logging.disable(logging.NOTSET)
+
+            transaction.set_rollback(True)
+
+        for handler in logging.getLogger("api").handlers:
+            handler.flush()
+
+        total = options["batches"] * options["batch_size"]
+        self.stdout.write(f"{'logging':>8} {'seconds':>8} {'entries/s':>10}")
+        self.stdout.write(f"{'on':>8} {on:>8.2f} {total / on:>10.1f}")
+        self.stdout.write(f"{'off':>8} {off:>8.2f} {total / off:>10.1f}")
+        self.stdout.write(f"logging on runs at {off / on:.0%} of logging-off throughput")
+
+    def _scratch_trip(self):
+        now = timezone.now()
+        user = spotter_users.objects.create(
+            username=f"bench-{now.timestamp()}",
+            email=f"bench-{now.timestamp()}@example.com",
+            password="!",
+        )
+        return Trip.objects.create(
+            user=user,
+            pickup_location_name="Bench pickup",
+            pickup_lat=0,
+            pickup_lng=0,
+            dropoff_location_name="Bench dropoff",
+            dropoff_lat=0,
+            dropoff_lng=0,
+            total_distance=0,
+            total_duration=0,
+            driving_time=0,
+            rest_time=0,
+            total_hos_used=0,
+            initial_hos=0,
+            start_time=now,
+            end_time=now,
+        )
+
+    def _batch(self, size):
+        start = timezone.now()
+        return [
+            {
+                "log_time": (start + timedelta(minutes=30 * i)).isoformat(),
+                "status": "Driving",
+                "description": "Driving for 30 minutes (100.0 miles remaining)",
+                "latitude": "40.0000000",
+                "longitude": "-88.0000000",
+            }
+            for i in range(size)
+        ]
+
+    def _post(self, trip, batch):
+        started = time.perf_counter()
+        response = self.client.post(
+            f"/api/trip/{trip.trip_id}/logs/", batch, content_type="application/json"
+        )
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise CommandError(f"Ingest failed with {response.status_code}")
+        return elapsed
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+
+from api.models import spotter_users
+
+
+class _SlowDatabase:
+    """Adds a fixed delay to every query and tracks how many are in flight."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def install(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def reset(self):
+        self.in_flight = 0
+        self.peak = 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many slow dashboard reads can be in flight at once on the "
+        "sync (thread per request) and async (ASGI) read paths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, help="User to read (default: first user)")
+        parser.add_argument("--clients", type=int, nargs="+", default=[10, 50, 200])
+        parser.add_argument("--threads", type=int, default=8, help="Sync worker threads")
+        parser.add_argument("--query-delay", type=float, default=0.1, help="Seconds added to every query")
+
+    def handle(self, *args, **options):
+        user_id = options["user_id"]
+        if user_id is None:
+            user = spotter_users.objects.order_by("user_id").first()
+            if user is None:
+                raise CommandError("No users to benchmark against")
+            user_id = user.user_id
+
+        endpoints = ("trips", "logs", "hos")
+        slow_db = _SlowDatabase(options["query_delay"])
+        connection_created.connect(slow_db.install)
+
+        self.stdout.write(
+            f"user={user_id} query_delay={options['query_delay']}s sync_threads={options['threads']}"
+        )
+        self.stdout.write(f"{'clients':>8} {'path':>6} {'seconds':>8} {'req/s':>8} {'peak in flight':>15}")
+
+        # Measure the database path, not the response cache
+        with override_settings(API_RESPONSE_CACHE_TIMEOUT=0):
+            try:
+                for clients in options["clients"]:
+                    paths = [f"/api/user/{user_id}/{endpoints[i % 3]}/" for i in range(clients)]
+
+                    slow_db.reset()
+                    elapsed = self._run_sync(paths, options["threads"])
+                    self._report(clients, "sync", elapsed, slow_db.peak)
+
+                    slow_db.reset()
+                    async_paths = [path.replace("/api/", "/api/async/", 1) for path in paths]
+                    elapsed = asyncio.run(self._run_async(async_paths))
+                    self._report(clients, "async", elapsed, slow_db.peak)
+            finally:
+                connection_created.disconnect(slow_db.install)
+
+    def _run_sync(self, paths, threads):
+        local = threading.local()
+
+        def fetch(path):
+            if not hasattr(local, "client"):
+                local.client = Client(HTTP_HOST="localhost")
+            response = local.client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f"{path} returned {response.status_code}")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(fetch, paths))
+        return time.perf_counter() - started
+
+    async def _run_async(self, paths):
+        # Drive the real ASGI application rather than the test client, so each
+        # request gets its own thread-sensitive context as under uvicorn
+        from spotter.asgi import application
+
+        async def fetch(path):
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode("ascii"),
+                "query_string": b"",
+                "root_path": "",
+                "headers": [(b"host", b"localhost")],
+                "client": ("127.0.0.1", 0),
+                "server": ("localhost", 80),
+            }
+            sent = []
+            requested = False
+            finished = asyncio.Event()
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await finished.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+                if message["type"] == "http.response.body" and not message.get("more_body"):
+                    finished.set()
+
+            await application(scope, receive, send)
+            status_code = sent[0]["status"]
+            if status_code != 200:
+                raise CommandError(f"{path} returned {status_code}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch(path) for path in paths))
+        return time.perf_counter() - started
+
+    def _report(self, clients, path, elapsed, peak):
+        self.stdout.write(
+            f"{clients:>8} {path:>6} {elapsed:>8.2f} {clients / elapsed:>8.1f} {peak:>15}"
+        )
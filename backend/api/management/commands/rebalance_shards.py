@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.cache import bump_user_version
+from api.models import spotter_users
+from api.sharding import (
+    copy_user_rows,
+    current_shard,
+    delete_user_rows,
+    high_water_marks,
+    target_shard,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move drivers whose trips and logs are not on the shard the hash ring "
+        "places them on (e.g. after adding a shard to SHARDS). Rows are "
+        "copied, the driver is switched over, writes made during the switch "
+        "are copied again, and only then are the old rows deleted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, nargs="+", help="Only these user ids")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--grace",
+            type=float,
+            default=settings.AUTH_USER_CACHE_SECONDS + 5,
+            help="Seconds to wait after switching drivers over, for other "
+            "processes' cached user rows to expire",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        users = spotter_users.objects.order_by("user_id")
+        if options["users"]:
+            users = users.filter(user_id__in=options["users"])
+        moves = [
+            (user, current_shard(user), target_shard(user))
+            for user in users.iterator()
+            if current_shard(user) != target_shard(user)
+        ]
+        if not moves:
+            self.stdout.write("Every driver is on their shard")
+            return
+        if options["dry_run"]:
+            for user, source, target in moves:
+                self.stdout.write(f"user {user.user_id}: would move {source} -> {target}")
+            return
+
+        batch_size = options["batch_size"]
+        switched = []
+        for user, source, target in moves:
+            started = timezone.now()
+            marks = high_water_marks(user.user_id, source)
+            copied = copy_user_rows(user.user_id, source, target, batch_size=batch_size)
+            user.shard = target
+            user.save(update_fields=["shard"])
+            switched.append((user, source, target, marks, started, copied))
+            self.stdout.write(f"user {user.user_id}: copied {copied} rows {source} -> {target}")
+
+        # Processes that cached a driver before the switch still write to the
+        # old shard until their copy of the row expires
+        time.sleep(options["grace"])
+
+        total = 0
+        for user, source, target, marks, started, copied in switched:
+            copied += copy_user_rows(
+                user.user_id, source, target,
+                after=marks, changed_since=started, batch_size=batch_size,
+            )
+            delete_user_rows(user.user_id, source)
+            bump_user_version(user.user_id)
+            total += copied
+            self.stdout.write(f"user {user.user_id}: moved {copied} rows to {target}")
+        self.stdout.write(f"Moved {len(switched)} drivers, {total} rows")
@@ -0,0 +1,106 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.dateparse import parse_date
+
+from api.models import DriverLog
+from api.sharding import fan_out
+
+
+def _init_worker():
+    # Spawned (non-forked) workers start without Django configured
+    import django
+
+    django.setup()
+
+
+def _rebuild(user_ids, since, until, chunk_size, batch_size):
+    from api.hos import rebuild_summaries
+
+    try:
+        return len(user_ids), *rebuild_summaries(user_ids, since, until, chunk_size, batch_size)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild daily HOS summaries from driver logs. Each day is recomputed "
+        "from scratch and days left without logs lose their summary, so the "
+        "command is safe to re-run; drivers are split "
+        "into partitions and rebuilt in parallel worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, nargs="+", help="Only these user ids")
+        parser.add_argument("--since", help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--until", help="Last day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--users-per-task", type=int, default=50)
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Log rows fetched per round trip")
+        parser.add_argument("--batch-size", type=int, default=500, help="Summaries per upsert")
+
+    def handle(self, *args, **options):
+        since, until = (self._date(options[name], name) for name in ("since", "until"))
+
+        logs = DriverLog.objects.all()
+        if options["users"]:
+            logs = logs.filter(user_id__in=options["users"])
+        user_ids = sorted({
+            user_id
+            for _, shard_users in fan_out(
+                lambda alias: list(logs.using(alias).values_list("user_id", flat=True).distinct())
+            )
+            for user_id in shard_users
+        })
+        if not user_ids:
+            self.stdout.write("No driver logs to rebuild from")
+            return
+
+        size = max(1, options["users_per_task"])
+        partitions = [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+        workers = max(1, min(options["workers"], len(partitions)))
+        arguments = (since, until, options["chunk_size"], options["batch_size"])
+        self.stdout.write(
+            f"Rebuilding {len(user_ids)} drivers in {len(partitions)} partitions "
+            f"with {workers} worker{'s' if workers > 1 else ''}"
+        )
+
+        self.started = time.perf_counter()
+        self.totals = [0, 0, 0, 0]
+        if workers == 1:
+            for partition in partitions:
+                self._progress(_rebuild(partition, *arguments), len(user_ids))
+            return
+
+        # Workers must open their own connections, not share the parent's
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_rebuild, partition, *arguments) for partition in partitions]
+            for future in as_completed(futures):
+                self._progress(future.result(), len(user_ids))
+
+    def _progress(self, result, total_users):
+        for n, value in enumerate(result):
+            self.totals[n] += value
+        users, rows, summaries, deleted = self.totals
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f"{users}/{total_users} drivers, {rows} logs, {summaries} summaries, "
+            f"{deleted} stale summaries deleted, "
+            f"{elapsed:.1f}s, {rows / elapsed if elapsed else 0:.0f} rows/s"
+        )
+
+    def _date(self, value, name):
+        if value is None:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"--{name} must be YYYY-MM-DD")
+        return parsed
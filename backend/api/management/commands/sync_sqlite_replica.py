@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.routers import REPLICA_DB
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary onto the SQLite replica (the SQLITE_DIR "
+        "stand-in), once or every --every seconds. Between copies the "
+        "replica lags behind the primary the way a real one can."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, help="Keep copying at this interval (seconds)")
+
+    def handle(self, *args, **options):
+        if REPLICA_DB not in connections.settings:
+            raise CommandError("No replica database is configured")
+        primary, replica = connections["default"], connections[REPLICA_DB]
+        if primary.vendor != "sqlite" or replica.vendor != "sqlite":
+            raise CommandError("Only the SQLite stand-in can be synced; real replicas replicate themselves")
+
+        while True:
+            started = time.perf_counter()
+            primary.ensure_connection()
+            replica.ensure_connection()
+            # The online backup API copies a consistent snapshot, even while
+            # the primary is being written to
+            primary.connection.backup(replica.connection)
+            self.stdout.write(f"Synced replica in {time.perf_counter() - started:.2f}s")
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
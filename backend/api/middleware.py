@@ -0,0 +1,96 @@
+from django.urls import Resolver404, resolve
+
+from .routers import (
+    end_replica_reads,
+    end_shard,
+    is_pinned,
+    pin_to_primary,
+    sharding_enabled,
+    start_replica_reads,
+    start_shard,
+)
+from .sharding import shard_for_trip, shard_for_user
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _resolve(request):
+    # The routing context vars are set and reset in the same __call__: under
+    # ASGI, process_view and __call__ don't run in the same context
+    try:
+        return resolve(request.path_info, getattr(request, "urlconf", None))
+    except Resolver404:
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Routes replica-safe reads to the read replica and pins the user/trip
+    of any successful write to the primary for ``REPLICA_STICKY_SECONDS``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = _resolve(request)
+        token = None
+        if match is not None and self.reads_from_replica(request, match):
+            token = start_replica_reads()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                end_replica_reads(token)
+
+        if (
+            match is not None
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            pin_to_primary(
+                user_id=match.kwargs.get("user_id"),
+                trip_id=match.kwargs.get("trip_id"),
+            )
+        return response
+
+    def reads_from_replica(self, request, match):
+        if request.method not in SAFE_METHODS:
+            return False
+        view_class = getattr(match.func, "view_class", None)
+        if not getattr(view_class, "read_from_replica", False):
+            return False
+        return not is_pinned(
+            user_id=match.kwargs.get("user_id"), trip_id=match.kwargs.get("trip_id")
+        )
+
+
+class ShardRoutingMiddleware:
+    """
+    Serves a request for a driver's or trip's data from that driver's shard,
+    found from the ``user_id`` or ``trip_id`` URL argument. A no-op unless
+    more than one shard is configured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        alias = self.shard_for(request) if sharding_enabled() else None
+        if alias is None:
+            return self.get_response(request)
+        token = start_shard(alias)
+        try:
+            return self.get_response(request)
+        finally:
+            end_shard(token)
+
+    def shard_for(self, request):
+        match = _resolve(request)
+        if match is None:
+            return None
+        if match.kwargs.get("user_id") is not None:
+            return shard_for_user(match.kwargs["user_id"])
+        if match.kwargs.get("trip_id") is not None:
+            return shard_for_trip(match.kwargs["trip_id"])
+        return None
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='spotter_users',
+            fields=[
+                ('user_id', models.AutoField(primary_key=True, serialize=False)),
+                ('username', models.CharField(max_length=50, unique=True)),
+                ('email', models.EmailField(max_length=100, unique=True)),
+                ('password', models.CharField(max_length=255)),
+                ('name', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'spotter_users',
+            },
+        ),
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('trip_id', models.AutoField(primary_key=True, serialize=False)),
+                ('pickup_location_name', models.CharField(max_length=255)),
+                ('pickup_lat', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('pickup_lng', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('dropoff_location_name', models.CharField(max_length=255)),
+                ('dropoff_lat', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('dropoff_lng', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('total_distance', models.DecimalField(decimal_places=2, help_text='in miles', max_digits=10)),
+                ('total_duration', models.DecimalField(decimal_places=2, help_text='in hours', max_digits=10)),
+                ('driving_time', models.DecimalField(decimal_places=2, help_text='in hours', max_digits=10)),
+                ('rest_time', models.DecimalField(decimal_places=2, help_text='in hours', max_digits=10)),
+                ('total_hos_used', models.DecimalField(decimal_places=2, help_text='in hours', max_digits=10)),
+                ('initial_hos', models.DecimalField(decimal_places=2, help_text='initial HOS at start', max_digits=10)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users')),
+            ],
+            options={
+                'db_table': 'trips',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyHOSSummary',
+            fields=[
+                ('summary_id', models.AutoField(primary_key=True, serialize=False)),
+                ('log_date', models.DateField()),
+                ('total_drive_time', models.DecimalField(decimal_places=2, default=0, help_text='in hours', max_digits=5)),
+                ('total_duty_time', models.DecimalField(decimal_places=2, default=0, help_text='in hours', max_digits=5)),
+                ('total_rest_time', models.DecimalField(decimal_places=2, default=0, help_text='in hours', max_digits=5)),
+                ('available_drive_time', models.DecimalField(decimal_places=2, default=11, help_text='in hours', max_digits=5)),
+                ('available_duty_time', models.DecimalField(decimal_places=2, default=14, help_text='in hours', max_digits=5)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users')),
+            ],
+            options={
+                'db_table': 'daily_hos_summary',
+                'constraints': [models.UniqueConstraint(fields=('user', 'log_date'), name='unique_user_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Stop',
+            fields=[
+                ('stop_id', models.AutoField(primary_key=True, serialize=False)),
+                ('stop_time', models.DateTimeField()),
+                ('stop_name', models.CharField(max_length=255)),
+                ('latitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('stop_type', models.CharField(choices=[('Rest', 'Rest'), ('Refueling', 'Refueling'), ('Pickup', 'Pickup'), ('Dropoff', 'Dropoff'), ('Other', 'Other')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.trip')),
+            ],
+            options={
+                'db_table': 'stops',
+                'indexes': [models.Index(fields=['user', 'stop_time'], name='stops_user_id_3608ea_idx'), models.Index(fields=['trip'], name='stops_trip_id_30c4ed_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DriverLog',
+            fields=[
+                ('log_id', models.AutoField(primary_key=True, serialize=False)),
+                ('log_time', models.DateTimeField()),
+                ('status', models.CharField(choices=[('Driving', 'Driving'), ('Resting', 'Resting'), ('Pickup', 'Pickup'), ('Dropoff', 'Dropoff'), ('Off Duty', 'Off Duty'), ('Refueling', 'Refueling')], max_length=20)),
+                ('description', models.TextField()),
+                ('latitude', models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True)),
+                ('miles_remaining', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.trip')),
+            ],
+            options={
+                'db_table': 'driver_logs',
+                'indexes': [models.Index(fields=['user', 'log_time'], name='driver_logs_user_id_b4004c_idx'), models.Index(fields=['trip'], name='driver_logs_trip_id_22f898_idx')],
+            },
+        ),
+    ]
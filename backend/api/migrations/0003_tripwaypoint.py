@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripWaypoint',
+            fields=[
+                ('waypoint_id', models.AutoField(primary_key=True, serialize=False)),
+                ('sequence', models.PositiveIntegerField(help_text='visiting order within the trip')),
+                ('stop_type', models.CharField(choices=[('Pickup', 'Pickup'), ('Dropoff', 'Dropoff')], max_length=20)),
+                ('location_name', models.CharField(max_length=255)),
+                ('latitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('load_ref', models.CharField(blank=True, help_text='pairs a dropoff with its pickup', max_length=50, null=True)),
+                ('window_start', models.DateTimeField(blank=True, null=True)),
+                ('window_end', models.DateTimeField(blank=True, null=True)),
+                ('service_duration', models.DecimalField(decimal_places=2, default=1, help_text='in hours', max_digits=5)),
+                ('planned_arrival', models.DateTimeField(blank=True, null=True)),
+                ('planned_departure', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waypoints', to='api.trip')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users')),
+            ],
+            options={
+                'db_table': 'trip_waypoints',
+                'ordering': ['sequence'],
+                'constraints': [models.UniqueConstraint(fields=('trip', 'sequence'), name='unique_trip_sequence')],
+            },
+        ),
+    ]
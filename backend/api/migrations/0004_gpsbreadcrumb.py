@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_tripwaypoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GPSBreadcrumb',
+            fields=[
+                ('breadcrumb_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('recorded_at', models.DateTimeField()),
+                ('latitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.trip')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users')),
+            ],
+            options={
+                'db_table': 'gps_breadcrumbs',
+                'indexes': [models.Index(fields=['trip', 'recorded_at'], name='gps_breadcr_trip_id_9733af_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:28
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+from api.geo import encode_geohash
+
+
+def backfill_driver_status(apps, schema_editor):
+    spotter_users = apps.get_model('api', 'spotter_users')
+    DriverLog = apps.get_model('api', 'DriverLog')
+    DailyHOSSummary = apps.get_model('api', 'DailyHOSSummary')
+    DriverStatus = apps.get_model('api', 'DriverStatus')
+
+    today = timezone.now().date()
+    rows = []
+    for user_id in spotter_users.objects.values_list('user_id', flat=True).iterator():
+        logs = DriverLog.objects.filter(user_id=user_id).order_by('-log_time')
+        latest = logs.first()
+        positioned = logs.filter(latitude__isnull=False, longitude__isnull=False).first()
+        summaries = DailyHOSSummary.objects.filter(user_id=user_id)
+        current = summaries.filter(log_date=today).first()
+        cycle_used = summaries.filter(
+            log_date__gt=today - timedelta(days=8), log_date__lte=today
+        ).aggregate(total=Sum('total_duty_time'))['total'] or 0
+        if latest is None and current is None:
+            continue
+
+        rows.append(DriverStatus(
+            user_id=user_id,
+            trip_id=latest.trip_id if latest else None,
+            current_status=latest.status if latest else None,
+            status_since=latest.log_time if latest else None,
+            latitude=positioned.latitude if positioned else None,
+            longitude=positioned.longitude if positioned else None,
+            position_at=positioned.log_time if positioned else None,
+            region=encode_geohash(positioned.latitude, positioned.longitude, 4) if positioned else None,
+            hos_date=today,
+            drive_hours_today=current.total_drive_time if current else 0,
+            duty_hours_today=current.total_duty_time if current else 0,
+            cycle_remaining=max(0, 70 - cycle_used),
+        ))
+    DriverStatus.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_gpsbreadcrumb'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverStatus',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='api.spotter_users')),
+                ('current_status', models.CharField(blank=True, choices=[('Driving', 'Driving'), ('Resting', 'Resting'), ('Pickup', 'Pickup'), ('Dropoff', 'Dropoff'), ('Off Duty', 'Off Duty'), ('Refueling', 'Refueling')], max_length=20, null=True)),
+                ('status_since', models.DateTimeField(blank=True, null=True)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True)),
+                ('position_at', models.DateTimeField(blank=True, null=True)),
+                ('region', models.CharField(blank=True, help_text='geohash of the last position', max_length=12, null=True)),
+                ('hos_date', models.DateField(blank=True, null=True)),
+                ('drive_hours_today', models.DecimalField(decimal_places=2, default=0, help_text='in hours', max_digits=5)),
+                ('duty_hours_today', models.DecimalField(decimal_places=2, default=0, help_text='in hours', max_digits=5)),
+                ('cycle_remaining', models.DecimalField(decimal_places=2, default=70, help_text='in hours', max_digits=5)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('trip', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.trip')),
+            ],
+            options={
+                'db_table': 'driver_status',
+                'indexes': [models.Index(fields=['current_status', 'region'], name='driver_stat_current_984e82_idx'), models.Index(fields=['region'], name='driver_stat_region_dda2e9_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_driver_status, migrations.RunPython.noop),
+    ]
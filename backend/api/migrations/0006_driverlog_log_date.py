@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:31
+
+from collections import defaultdict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import migrations, models, transaction
+from django.utils import timezone
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def terminal_date(moment, zone_name):
+    # api.models.terminal_date as of this migration; migrations don't import
+    # live model code
+    try:
+        zone = ZoneInfo(zone_name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = ZoneInfo('UTC')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment.astimezone(zone).date()
+
+
+def backfill_log_date(apps, schema_editor):
+    """Fill driver_logs.log_date in primary-key chunks, one transaction each."""
+    DriverLog = apps.get_model('api', 'DriverLog')
+    db = schema_editor.connection.alias
+    logs = DriverLog.objects.using(db).filter(log_date__isnull=True).order_by('log_id')
+
+    last_id = 0
+    while True:
+        chunk = list(
+            logs.filter(log_id__gt=last_id).values_list(
+                'log_id', 'log_time', 'user__terminal_timezone'
+            )[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+
+        by_date = defaultdict(list)
+        for log_id, log_time, zone_name in chunk:
+            by_date[terminal_date(log_time, zone_name)].append(log_id)
+        with transaction.atomic(using=db):
+            for log_date, ids in by_date.items():
+                DriverLog.objects.using(db).filter(log_id__in=ids).update(log_date=log_date)
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+    # Each backfill chunk commits on its own instead of one long transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0005_driverstatus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverlog',
+            name='log_date',
+            field=models.DateField(blank=True, help_text="date of log_time in the driver's terminal timezone", null=True),
+        ),
+        migrations.AddField(
+            model_name='spotter_users',
+            name='terminal_timezone',
+            field=models.CharField(default='UTC', help_text='IANA zone of the home terminal; HOS days start at its midnight', max_length=64),
+        ),
+        migrations.RunPython(backfill_log_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='driverlog',
+            index=models.Index(fields=['user', 'log_date'], name='driver_logs_user_id_7fa6b5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='driverlog',
+            index=models.Index(fields=['trip', 'log_date'], name='driver_logs_trip_id_4e4814_idx'),
+        ),
+        # (trip, log_date) covers the foreign key, so the single-column index goes
+        migrations.RemoveIndex(
+            model_name='driverlog',
+            name='driver_logs_trip_id_22f898_idx',
+        ),
+    ]
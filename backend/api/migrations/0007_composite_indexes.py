@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_driverlog_log_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyhossummary',
+            index=models.Index(fields=['log_date', 'user'], name='daily_hos_s_log_dat_f74703_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['user', 'start_time'], name='trips_user_id_baf761_idx'),
+        ),
+        # (user, start_time) and the unique (user, log_date) constraint lead
+        # with user and serve the foreign keys, so the single-column indexes
+        # go, after the composites exist
+        migrations.AlterField(
+            model_name='dailyhossummary',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users'),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users'),
+        ),
+    ]
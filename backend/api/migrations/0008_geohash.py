@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:44
+
+from django.db import migrations, models, transaction
+
+from api.models import position_geohash
+
+BACKFILL_CHUNK_SIZE = 2000
+
+
+def backfill_geohash(apps, schema_editor):
+    """Fill geohash on positioned logs and stops in primary-key chunks."""
+    db = schema_editor.connection.alias
+    for model_name in ('DriverLog', 'Stop'):
+        model = apps.get_model('api', model_name)
+        pk = model._meta.pk.attname
+        rows = (
+            model.objects.using(db)
+            .filter(geohash__isnull=True, latitude__isnull=False, longitude__isnull=False)
+            .order_by(pk)
+        )
+
+        last_id = 0
+        while True:
+            chunk = list(
+                rows.filter(**{f'{pk}__gt': last_id}).only(pk, 'latitude', 'longitude')[:BACKFILL_CHUNK_SIZE]
+            )
+            if not chunk:
+                break
+            for row in chunk:
+                row.geohash = position_geohash(row.latitude, row.longitude)
+            with transaction.atomic(using=db):
+                model.objects.using(db).bulk_update(chunk, ['geohash'])
+            last_id = getattr(chunk[-1], pk)
+
+
+class Migration(migrations.Migration):
+    # Each backfill chunk commits on its own instead of one long transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0007_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverlog',
+            name='geohash',
+            field=models.CharField(blank=True, help_text='geohash of the position, for proximity queries', max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='stop',
+            name='geohash',
+            field=models.CharField(blank=True, help_text='geohash of the position, for proximity queries', max_length=12, null=True),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        # Indexes are built once, after the backfill
+        migrations.AddIndex(
+            model_name='driverlog',
+            index=models.Index(fields=['geohash', 'latitude', 'longitude', 'log_time', 'user'], name='driver_logs_geohash_b3cfca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stop',
+            index=models.Index(fields=['geohash', 'latitude', 'longitude', 'stop_time'], name='stops_geohash_f4f958_idx'),
+        ),
+    ]
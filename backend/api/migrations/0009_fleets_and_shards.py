@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def backfill_trip_placements(apps, schema_editor):
+    """Record existing trips, keeping their ids; new ids continue after them."""
+    Trip = apps.get_model('api', 'Trip')
+    TripPlacement = apps.get_model('api', 'TripPlacement')
+    db = schema_editor.connection.alias
+    trips = Trip.objects.using(db).order_by('trip_id')
+
+    last_id = 0
+    while True:
+        chunk = list(
+            trips.filter(trip_id__gt=last_id).values_list('trip_id', 'user_id')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        TripPlacement.objects.using(db).bulk_create(
+            TripPlacement(trip_id=trip_id, user_id=user_id) for trip_id, user_id in chunk
+        )
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fleet',
+            fields=[
+                ('fleet_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'fleets',
+            },
+        ),
+        migrations.AddField(
+            model_name='spotter_users',
+            name='shard',
+            field=models.CharField(blank=True, help_text="database alias holding the driver's trips and logs; empty means default", max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dailyhossummary',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users'),
+        ),
+        migrations.AlterField(
+            model_name='driverlog',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users'),
+        ),
+        migrations.AlterField(
+            model_name='driverstatus',
+            name='trip',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.trip'),
+        ),
+        migrations.AlterField(
+            model_name='gpsbreadcrumb',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users'),
+        ),
+        migrations.AlterField(
+            model_name='stop',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users'),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users'),
+        ),
+        migrations.AlterField(
+            model_name='tripwaypoint',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users'),
+        ),
+        migrations.AddField(
+            model_name='spotter_users',
+            name='fleet',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.fleet'),
+        ),
+        migrations.CreateModel(
+            name='TripPlacement',
+            fields=[
+                ('trip_id', models.AutoField(primary_key=True, serialize=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.spotter_users')),
+            ],
+            options={
+                'db_table': 'trip_placements',
+            },
+        ),
+        migrations.RunPython(backfill_trip_placements, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,22 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
 from django.db import models
+from django.utils import timezone
+
+from .geo import encode_geohash
+
+class Fleet(models.Model):
+    """A carrier; all of its drivers' trips and logs live on the same shard."""
+
+    fleet_id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'fleets'
+
+    def __str__(self):
+        return self.name
 
 class spotter_users(models.Model):
     user_id = models.AutoField(primary_key=True)
@@ -6,6 +24,9 @@ class spotter_users(models.Model):
     email = models.EmailField(max_length=100, unique=True)
     password = models.CharField(max_length=255)  # Assuming passwords are pre-hashed
     name = models.CharField(max_length=50, null=True, blank=True)
+    terminal_timezone = models.CharField(max_length=64, default='UTC', help_text='IANA zone of the home terminal; HOS days start at its midnight')
+    fleet = models.ForeignKey(Fleet, on_delete=models.SET_NULL, null=True, blank=True)
+    shard = models.CharField(max_length=64, null=True, blank=True, help_text="database alias holding the driver's trips and logs; empty means default")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -15,9 +36,59 @@ class spotter_users(models.Model):
     def __str__(self):
         return self.username
 
-class Trip(models.Model):
+    # Lets a driver stand in for request.user once authenticated by JWT
+    is_authenticated = True
+    is_anonymous = False
+
+    def local_date(self, moment):
+        """Calendar date of ``moment`` at the driver's home terminal."""
+        return terminal_date(moment, self.terminal_timezone)
+
+
+def terminal_date(moment, zone_name):
+    try:
+        zone = ZoneInfo(zone_name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = ZoneInfo('UTC')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment.astimezone(zone).date()
+
+
+# Geohash length stored on stops and logs: cells of about 38 m x 19 m
+GEOHASH_PRECISION = 8
+
+
+def position_geohash(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(latitude, longitude, GEOHASH_PRECISION)
+
+class TripPlacement(models.Model):
+    """
+    Hands out trip ids, so they stay unique across shards, and records whose
+    trip each id is, so a trip can be found without knowing its shard.
+    """
+
     trip_id = models.AutoField(primary_key=True)
     user = models.ForeignKey(spotter_users, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'trip_placements'
+
+# Trips, logs, stops, waypoints, breadcrumbs and HOS summaries may live on a
+# shard away from spotter_users (see api/sharding.py), so their user foreign
+# keys are not enforced by the database.
+#
+# Both this and the TripPlacement row written for every trip apply without
+# sharding too: a field's db_constraint can't follow settings without
+# migrations that differ per deployment, and trips created before sharding
+# is switched on need ids no shard will reuse. The cost is one small insert
+# per trip; Django still cascades user deletes itself.
+
+class Trip(models.Model):
+    trip_id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE, db_index=False, db_constraint=False)  # covered by (user, start_time)
     pickup_location_name = models.CharField(max_length=255)
     pickup_lat = models.DecimalField(max_digits=10, decimal_places=7)
     pickup_lng = models.DecimalField(max_digits=10, decimal_places=7)
@@ -36,10 +107,19 @@ class Trip(models.Model):
 
     class Meta:
         db_table = 'trips'
+        indexes = [
+            models.Index(fields=['user', 'start_time']),
+        ]
 
     def __str__(self):
         return f"Trip {self.trip_id}: {self.pickup_location_name} to {self.dropoff_location_name}"
 
+    def save(self, *args, **kwargs):
+        if self.trip_id is None:
+            self.trip_id = TripPlacement.objects.create(user_id=self.user_id).trip_id
+            kwargs['force_insert'] = True
+        super().save(*args, **kwargs)
+
 class DriverLog(models.Model):
     STATUS_CHOICES = [
         ('Driving', 'Driving'),
@@ -52,25 +132,43 @@ class DriverLog(models.Model):
     
     log_id = models.AutoField(primary_key=True)
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE)
-    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE)
+    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE, db_constraint=False)
     log_time = models.DateTimeField()
+    log_date = models.DateField(null=True, blank=True, help_text="date of log_time in the driver's terminal timezone")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     description = models.TextField()
     latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
     longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
     miles_remaining = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True, help_text='geohash of the position, for proximity queries')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'driver_logs'
         indexes = [
             models.Index(fields=['user', 'log_time']),
-            models.Index(fields=['trip']),
+            models.Index(fields=['user', 'log_date']),
+            models.Index(fields=['trip', 'log_date']),
+            # Covers the candidate scan of a proximity query (see api/proximity.py)
+            models.Index(fields=['geohash', 'latitude', 'longitude', 'log_time', 'user']),
         ]
 
     def __str__(self):
         return f"{self.status} at {self.log_time}"
 
+    def save(self, *args, **kwargs):
+        self.log_date = self.user.local_date(self.log_time)
+        self.geohash = position_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = set()
+            if 'log_time' in update_fields:
+                derived.add('log_date')
+            if {'latitude', 'longitude'} & set(update_fields):
+                derived.add('geohash')
+            kwargs['update_fields'] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+
 class Stop(models.Model):
     STOP_TYPE_CHOICES = [
         ('Rest', 'Rest'),
@@ -82,12 +180,13 @@ class Stop(models.Model):
     
     stop_id = models.AutoField(primary_key=True)
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE)
-    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE)
+    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE, db_constraint=False)
     stop_time = models.DateTimeField()
     stop_name = models.CharField(max_length=255)
     latitude = models.DecimalField(max_digits=10, decimal_places=7)
     longitude = models.DecimalField(max_digits=10, decimal_places=7)
     stop_type = models.CharField(max_length=20, choices=STOP_TYPE_CHOICES)
+    geohash = models.CharField(max_length=12, null=True, blank=True, help_text='geohash of the position, for proximity queries')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -95,14 +194,23 @@ class Stop(models.Model):
         indexes = [
             models.Index(fields=['user', 'stop_time']),
             models.Index(fields=['trip']),
+            # Covers the candidate scan of a proximity query (see api/proximity.py)
+            models.Index(fields=['geohash', 'latitude', 'longitude', 'stop_time']),
         ]
 
     def __str__(self):
         return f"{self.stop_type} at {self.stop_name}"
 
+    def save(self, *args, **kwargs):
+        self.geohash = position_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
 class DailyHOSSummary(models.Model):
     summary_id = models.AutoField(primary_key=True)
-    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE)
+    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE, db_index=False, db_constraint=False)  # covered by unique_user_date
     log_date = models.DateField()
     total_drive_time = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text='in hours')
     total_duty_time = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text='in hours')
@@ -116,6 +224,89 @@ class DailyHOSSummary(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'log_date'], name='unique_user_date')
         ]
+        # (user, log_date) is served by the unique constraint; fleet-wide reads
+        # (dispatch: every driver's summaries for the last 8 days) need log_date first
+        indexes = [
+            models.Index(fields=['log_date', 'user']),
+        ]
+
+    def __str__(self):
+        return f"HOS Summary for {self.user.username} on {self.log_date}"
+
+class TripWaypoint(models.Model):
+    STOP_TYPE_CHOICES = [
+        ('Pickup', 'Pickup'),
+        ('Dropoff', 'Dropoff'),
+    ]
+
+    waypoint_id = models.AutoField(primary_key=True)
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='waypoints')
+    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE, db_constraint=False)
+    sequence = models.PositiveIntegerField(help_text='visiting order within the trip')
+    stop_type = models.CharField(max_length=20, choices=STOP_TYPE_CHOICES)
+    location_name = models.CharField(max_length=255)
+    latitude = models.DecimalField(max_digits=10, decimal_places=7)
+    longitude = models.DecimalField(max_digits=10, decimal_places=7)
+    load_ref = models.CharField(max_length=50, null=True, blank=True, help_text='pairs a dropoff with its pickup')
+    window_start = models.DateTimeField(null=True, blank=True)
+    window_end = models.DateTimeField(null=True, blank=True)
+    service_duration = models.DecimalField(max_digits=5, decimal_places=2, default=1, help_text='in hours')
+    planned_arrival = models.DateTimeField(null=True, blank=True)
+    planned_departure = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'trip_waypoints'
+        ordering = ['sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['trip', 'sequence'], name='unique_trip_sequence')
+        ]
+
+    def __str__(self):
+        return f"{self.stop_type} #{self.sequence} at {self.location_name}"
+
+
+class GPSBreadcrumb(models.Model):
+    breadcrumb_id = models.BigAutoField(primary_key=True)
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE)
+    user = models.ForeignKey(spotter_users, on_delete=models.CASCADE, db_constraint=False)
+    recorded_at = models.DateTimeField()
+    latitude = models.DecimalField(max_digits=10, decimal_places=7)
+    longitude = models.DecimalField(max_digits=10, decimal_places=7)
+
+    class Meta:
+        db_table = 'gps_breadcrumbs'
+        indexes = [
+            models.Index(fields=['trip', 'recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"({self.latitude}, {self.longitude}) at {self.recorded_at}"
+
+
+class DriverStatus(models.Model):
+    """One row per driver, kept current on ingest, for the dispatcher board."""
+
+    user = models.OneToOneField(spotter_users, on_delete=models.CASCADE, primary_key=True)
+    trip = models.ForeignKey(Trip, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)  # trip may be on a shard
+    current_status = models.CharField(max_length=20, choices=DriverLog.STATUS_CHOICES, null=True, blank=True)
+    status_since = models.DateTimeField(null=True, blank=True)
+    latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
+    position_at = models.DateTimeField(null=True, blank=True)
+    region = models.CharField(max_length=12, null=True, blank=True, help_text='geohash of the last position')
+    hos_date = models.DateField(null=True, blank=True)
+    drive_hours_today = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text='in hours')
+    duty_hours_today = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text='in hours')
+    cycle_remaining = models.DecimalField(max_digits=5, decimal_places=2, default=70, help_text='in hours')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'driver_status'
+        indexes = [
+            models.Index(fields=['current_status', 'region']),
+            models.Index(fields=['region']),
+        ]
 
     def __str__(self):
-        return f"HOS Summary for {self.user.username} on {self.log_date}"
\ No newline at end of file
+        return f"{self.user_id}: {self.current_status}"
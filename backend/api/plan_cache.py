@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routing import AVERAGE_SPEED_MPH, LATE_PENALTY, schedule_stops, sequence_stops
+
+logger = logging.getLogger(__name__)
+
+# A reused order may cost this many hours more than it did when found (plus
+# the difference in start times); beyond that the search runs again
+REUSE_SLACK_HOURS = 0.25
+
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def _round(value, places):
+    return None if value is None else round(float(value), places)
+
+
+def _start_bucket(stops, start_time):
+    """(bucket, hours into it) of ``start_time``; (None, 0) if no stop has a window."""
+    if all(
+        stop.get("window_start") is None and stop.get("window_end") is None
+        for stop in stops
+    ):
+        return None, 0.0
+    size = settings.PLAN_START_BUCKET_MINUTES * 60
+    seconds = start_time.timestamp()
+    bucket = int(seconds // size)
+    return bucket, (seconds - bucket * size) / 3600
+
+
+def _cost(result):
+    return result["total_hours"] + LATE_PENALTY * result["late_hours"]
+
+
+def plan_key(start, stops, cycle_used, start_time, average_speed=AVERAGE_SPEED_MPH):
+    """
+    Cache key for a sequencing request: the route (start and stops to about
+    ten metres, service times, pickup/dropoff pairs), the cycle hours already
+    used and, only when some stop has a time window, the windows and the
+    PLAN_START_BUCKET_MINUTES bucket the run starts in. Without windows a
+    plan doesn't depend on when it starts.
+    """
+    # Windows are measured from the bucket's start, so every start in the
+    # bucket describes the same (absolute) windows
+    bucket, offset = _start_bucket(stops, start_time)
+
+    def window(value):
+        return None if value is None else round(value + offset, 2)
+
+    route = {
+        "start": [_round(start[0], 4), _round(start[1], 4)],
+        "stops": [
+            [
+                _round(stop["lat"], 4),
+                _round(stop["lng"], 4),
+                _round(stop.get("service_hours"), 2),
+                stop.get("requires"),
+                window(stop.get("window_start")),
+                window(stop.get("window_end")),
+            ]
+            for stop in stops
+        ],
+        "cycle_used": _round(cycle_used, 2),
+        "speed": average_speed,
+        "bucket": bucket,
+    }
+    digest = hashlib.md5(json.dumps(route, separators=(",", ":")).encode("utf-8")).hexdigest()
+    return f"plan:{digest}"
+
+
+def _remember(key, plan):
+    with _plans_lock:
+        _plans[key] = plan
+        _plans.move_to_end(key)
+        while len(_plans) > settings.PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+
+
+def cached_sequence(start, stops, cycle_used, start_time, average_speed=AVERAGE_SPEED_MPH):
+    """
+    ``sequence_stops`` with its search memoized.
+
+    Only the visiting order is cached: per process (an LRU of
+    PLAN_CACHE_SIZE plans) and in the shared cache for PLAN_CACHE_TIMEOUT
+    seconds. A hit replays the HOS walk along that order from this request's
+    start, so arrivals, rest events and lateness are exact for it; only the
+    choice of order is reused.
+
+    With time windows a later start in the same bucket can tip the walk into
+    an extra rest (e.g. a dock wait just short of the 10-hour reset), so a
+    replay that costs noticeably more than the cached plan did is treated as
+    a miss.
+    """
+    key = plan_key(start, stops, cycle_used, start_time, average_speed)
+    _, offset = _start_bucket(stops, start_time)
+    with _plans_lock:
+        plan = _plans.get(key)
+        if plan is not None:
+            _plans.move_to_end(key)
+    if plan is None:
+        plan = cache.get(key)
+        if plan is not None:
+            _remember(key, plan)
+
+    if plan is not None:
+        order, cost, cached_offset = plan
+        if sorted(order) == list(range(len(stops))):
+            result = schedule_stops(start, stops, order, cycle_used, average_speed)
+            if _cost(result) <= cost + abs(offset - cached_offset) + REUSE_SLACK_HOURS:
+                logger.debug("Plan cache hit for %s", key)
+                return result
+
+    logger.debug("Plan cache miss for %s", key)
+    result = sequence_stops(start, stops, cycle_used=cycle_used, average_speed=average_speed)
+    plan = (tuple(result["order"]), _cost(result), offset)
+    _remember(key, plan)
+    cache.set(key, plan, settings.PLAN_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import DailyHOSSummary, DriverLog, Trip
+
+# Filtering shared by the sync (views.py) and async (async_views.py) read
+# endpoints, so both answer the same query string the same way.
+
+
+class InvalidQuery(Exception):
+    """Raised for a query parameter that can't be parsed; the message is the API error."""
+
+
+def _parse_date(params, name):
+    try:
+        return datetime.strptime(params[name], "%Y-%m-%d")
+    except ValueError:
+        raise InvalidQuery(f"Invalid {name} format. Use YYYY-MM-DD.")
+
+
+def user_trips(user_id, params):
+    """A user's trips, newest first, optionally within start_date/end_date."""
+    trips = Trip.objects.filter(user_id=user_id).order_by("-start_time")
+    if params.get("start_date"):
+        trips = trips.filter(start_time__gte=_parse_date(params, "start_date"))
+    if params.get("end_date"):
+        # Add one day to include the end date
+        trips = trips.filter(
+            start_time__lt=_parse_date(params, "end_date") + timedelta(days=1)
+        )
+    return trips
+
+
+def user_logs(user_id, params):
+    """
+    A user's logs, newest first, for ``date`` or from ``start_date`` (to
+    ``end_date``), and the date range to also read from the archive tier
+    ((None, None) for all of them).
+    """
+    logs = DriverLog.objects.filter(user_id=user_id).order_by("-created_at")
+    if params.get("date"):
+        day = _parse_date(params, "date").date()
+        return logs.filter(log_date=day), (day, day)
+    if params.get("start_date"):
+        first_day = _parse_date(params, "start_date").date()
+        logs = logs.filter(log_date__gte=first_day)
+        if params.get("end_date"):
+            last_day = _parse_date(params, "end_date").date()
+            return logs.filter(log_date__lte=last_day), (first_day, last_day)
+        return logs, (first_day, timezone.now().date())
+    return logs, (None, None)
+
+
+def user_hos_summaries(user_id, params):
+    """A user's daily HOS summaries, newest first, filtered like ``user_logs``."""
+    summaries = DailyHOSSummary.objects.filter(user_id=user_id).order_by("-log_date")
+    if params.get("date"):
+        return summaries.filter(log_date=_parse_date(params, "date").date())
+    if params.get("start_date"):
+        summaries = summaries.filter(log_date__gte=_parse_date(params, "start_date").date())
+        if params.get("end_date"):
+            summaries = summaries.filter(log_date__lte=_parse_date(params, "end_date").date())
+    return summaries
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .authentication import get_cached_user
+
+logger = logging.getLogger(__name__)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def fleet_channel(fleet_id):
+    return f"fleet:{fleet_id}"
+
+
+def channels_for_user(user_id):
+    """The channels a driver's updates go out on: theirs and their fleet's."""
+    channels = [user_channel(user_id)]
+    user = get_cached_user(user_id)
+    if user is not None and user.fleet_id is not None:
+        channels.append(fleet_channel(user.fleet_id))
+    return channels
+
+
+class InMemoryBroker:
+    """
+    In-process pub/sub between ingest code and WebSocket connections.
+
+    Each subscriber is an asyncio queue owned by the connection's event
+    loop. Publishing from a worker thread hands the message to that loop
+    with ``call_soon_threadsafe``, and a channel nobody watches costs one
+    dict lookup. A subscriber that falls ``queue_size`` messages behind
+    starts losing messages rather than holding up the publisher.
+    """
+
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, channels):
+        subscribers = self._subscribers
+        return any(subscribers.get(channel) for channel in channels)
+
+    def subscribe(self, channels):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, channels, subscription):
+        with self._lock:
+            for channel in channels:
+                watchers = self._subscribers.get(channel)
+                if watchers is not None:
+                    watchers.discard(subscription)
+                    if not watchers:
+                        del self._subscribers[channel]
+
+    def publish(self, channels, message):
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._subscribers.get(channel, ()))
+
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, message)
+            except RuntimeError:
+                # The connection's loop has already shut down
+                pass
+
+
+def _deliver(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        logger.warning("Dropping realtime message for a slow subscriber")
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME_BROKER)()
+    return _broker
+
+
+def publish(user_id, message):
+    """Push ``message`` to watchers of this user and of their fleet."""
+    get_broker().publish(channels_for_user(user_id), message)
+
+
+def has_watchers(user_id):
+    return get_broker().has_subscribers(channels_for_user(user_id))
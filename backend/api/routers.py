@@ -0,0 +1,162 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA_DB = "replica"
+
+# Tables whose rows live on the owning driver's shard (see api/sharding.py)
+SHARDED_TABLES = frozenset(
+    ["trips", "trip_waypoints", "gps_breadcrumbs", "driver_logs", "stops", "daily_hos_summary"]
+)
+
+# Set by ReplicaRoutingMiddleware for the duration of a replica-safe request
+_read_from_replica = ContextVar("read_from_replica", default=False)
+
+# Set by ShardRoutingMiddleware (or use_shard) to the shard being served
+_current_shard = ContextVar("current_shard", default=None)
+
+
+def _pin_key(kind, pk):
+    return f"db-pin:{kind}:{pk}"
+
+
+def pin_to_primary(user_id=None, trip_id=None):
+    """
+    Send reads for this user/trip to the primary for a few seconds.
+
+    Gives read-your-writes consistency while the replica catches up. Pins
+    live in the cache, so they reach other workers only with a shared one.
+    """
+    timeout = settings.REPLICA_STICKY_SECONDS
+    keys = {}
+    if user_id is not None:
+        keys[_pin_key("user", user_id)] = True
+    if trip_id is not None:
+        keys[_pin_key("trip", trip_id)] = True
+    if keys:
+        cache.set_many(keys, timeout)
+
+
+def is_pinned(user_id=None, trip_id=None):
+    keys = []
+    if user_id is not None:
+        keys.append(_pin_key("user", user_id))
+    if trip_id is not None:
+        keys.append(_pin_key("trip", trip_id))
+    return bool(keys) and bool(cache.get_many(keys))
+
+
+def replica_configured():
+    return REPLICA_DB in settings.DATABASES
+
+
+def start_replica_reads():
+    """Route ORM reads to the replica until ``end_replica_reads(token)``."""
+    return _read_from_replica.set(replica_configured())
+
+
+def end_replica_reads(token):
+    _read_from_replica.reset(token)
+
+
+class use_replica:
+    """Context manager routing ORM reads in its block to the replica."""
+
+    def __enter__(self):
+        self._token = start_replica_reads()
+        return self
+
+    def __exit__(self, *exc_info):
+        end_replica_reads(self._token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to the primary. Reads go to the replica only while
+    replica reads are switched on, which ReplicaRoutingMiddleware does for
+    GETs to views that set ``read_from_replica = True``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            return REPLICA_DB
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+
+def sharding_enabled():
+    return len(settings.SHARDS) > 1
+
+
+def start_shard(alias):
+    """Route sharded models to ``alias`` until ``end_shard(token)``."""
+    return _current_shard.set(alias)
+
+
+def end_shard(token):
+    _current_shard.reset(token)
+
+
+class use_shard:
+    """Context manager routing sharded models in its block to ``alias``."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __enter__(self):
+        self._token = start_shard(self.alias)
+        return self
+
+    def __exit__(self, *exc_info):
+        end_shard(self._token)
+
+
+class ShardRouter:
+    """
+    Sends trips, logs, stops, waypoints, breadcrumbs and HOS summaries to the
+    shard currently being served, or to the shard an instance was loaded
+    from. Everything else, and sharded models outside any shard context,
+    falls through to the next router.
+    """
+
+    def _route(self, model, **hints):
+        if not sharding_enabled() or model._meta.db_table not in SHARDED_TABLES:
+            return None
+        instance = hints.get("instance")
+        if instance is not None:
+            table = instance._meta.db_table
+            if table in SHARDED_TABLES and instance._state.db:
+                return instance._state.db
+            if table == "spotter_users":
+                # e.g. user.trip_set
+                from .sharding import shard_for_user
+
+                return shard_for_user(instance.pk)
+        return _current_shard.get()
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A new shard starts empty, so the data migrations (RunPython, which
+        # names no model) have nothing to do there. Their ORM calls follow the
+        # routers, not the database being migrated, and would write to default.
+        if model_name is None and db != "default" and db in settings.SHARDS:
+            return False
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        sharded = [obj._meta.db_table in SHARDED_TABLES for obj in (obj1, obj2)]
+        if all(sharded):
+            return obj1._state.db == obj2._state.db
+        if any(sharded):
+            # Sharded rows point at drivers in the default database
+            return True
+        return None
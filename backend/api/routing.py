@@ -0,0 +1,393 @@
+import threading
+from time import perf_counter
+from collections import OrderedDict
+
+import numpy as np
+
+# Property-carrying driver assumptions (mirrors the planner in the frontend):
+# - 55 mph average speed
+# - 30-minute break after 8 hours of driving
+# - 10 hours off duty after 11 hours of driving or 14 hours on duty
+# - 34-hour restart once the 70 hour / 8 day cycle is used up
+# - Pickup and drop-off take 1 hour each
+AVERAGE_SPEED_MPH = 55
+MAX_DRIVING_BEFORE_BREAK = 8
+MAX_DRIVING_HOURS = 11
+MAX_DUTY_HOURS = 14
+MAX_CYCLE_HOURS = 70
+BREAK_HOURS = 0.5
+OFF_DUTY_HOURS = 10
+RESTART_HOURS = 34
+DEFAULT_SERVICE_HOURS = 1
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Penalties used by the local search, in "hours" of objective
+LATE_PENALTY = 100.0
+PRECEDENCE_PENALTY = 10000.0
+
+# Upper bound on local search time per sequencing request, in seconds
+SEARCH_TIME_LIMIT = 0.075
+
+DISTANCE_CACHE_SIZE = 256
+
+_distance_cache = OrderedDict()
+_distance_cache_lock = threading.Lock()
+
+
+def haversine(lats1, lngs1, lats2, lngs2):
+    """Element-wise (broadcasting) great-circle distance in miles."""
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))
+    lng1 = np.radians(np.asarray(lngs1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))
+    lng2 = np.radians(np.asarray(lngs2, dtype=np.float64))
+
+    a = (
+        np.sin((lat1 - lat2) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng1 - lng2) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_distances(lats1, lngs1, lats2, lngs2):
+    """Distances in miles between every point of set 1 and every point of set 2."""
+    return haversine(
+        np.asarray(lats1, dtype=np.float64)[:, None],
+        np.asarray(lngs1, dtype=np.float64)[:, None],
+        np.asarray(lats2, dtype=np.float64)[None, :],
+        np.asarray(lngs2, dtype=np.float64)[None, :],
+    )
+
+
+def haversine_matrix(lats, lngs):
+    """Return the pairwise great-circle distance matrix in miles."""
+    return haversine_distances(lats, lngs, lats, lngs)
+
+
+def get_distance_matrix(points):
+    """
+    Distance matrix for a list of (lat, lng) points.
+
+    Matrices are cached per set of points, so re-sequencing the same stops in a
+    different order (or re-planning them later) reuses the computed matrix.
+    """
+    keys = [(round(float(lat), 6), round(float(lng), 6)) for lat, lng in points]
+    cache_key = tuple(sorted(set(keys)))
+
+    with _distance_cache_lock:
+        matrix = _distance_cache.get(cache_key)
+        if matrix is not None:
+            _distance_cache.move_to_end(cache_key)
+
+    if matrix is None:
+        matrix = haversine_matrix(
+            [lat for lat, _ in cache_key], [lng for _, lng in cache_key]
+        )
+        with _distance_cache_lock:
+            _distance_cache[cache_key] = matrix
+            while len(_distance_cache) > DISTANCE_CACHE_SIZE:
+                _distance_cache.popitem(last=False)
+
+    position = {key: i for i, key in enumerate(cache_key)}
+    index = [position[key] for key in keys]
+    return matrix[np.ix_(index, index)]
+
+
+def _drive(state, hours, events=None):
+    """Advance ``state`` by ``hours`` of driving, inserting required rest."""
+    time, driving, since_break, duty, cycle = state
+
+    if (
+        since_break + hours <= MAX_DRIVING_BEFORE_BREAK
+        and driving + hours <= MAX_DRIVING_HOURS
+        and duty + hours <= MAX_DUTY_HOURS
+        and cycle + hours <= MAX_CYCLE_HOURS
+    ):
+        # Common case: the whole leg fits in the current clocks
+        return (
+            time + hours,
+            driving + hours,
+            since_break + hours,
+            duty + hours,
+            cycle + hours,
+        )
+
+    while hours > 1e-9:
+        if cycle >= MAX_CYCLE_HOURS:
+            if events is not None:
+                events.append(("Off Duty", time, RESTART_HOURS))
+            time += RESTART_HOURS
+            driving = since_break = duty = cycle = 0.0
+            continue
+        if driving >= MAX_DRIVING_HOURS or duty >= MAX_DUTY_HOURS:
+            if events is not None:
+                events.append(("Off Duty", time, OFF_DUTY_HOURS))
+            time += OFF_DUTY_HOURS
+            driving = since_break = duty = 0.0
+            continue
+        if since_break >= MAX_DRIVING_BEFORE_BREAK:
+            if events is not None:
+                events.append(("Resting", time, BREAK_HOURS))
+            time += BREAK_HOURS
+            duty += BREAK_HOURS
+            since_break = 0.0
+            continue
+
+        chunk = min(
+            hours,
+            MAX_DRIVING_BEFORE_BREAK - since_break,
+            MAX_DRIVING_HOURS - driving,
+            MAX_DUTY_HOURS - duty,
+            MAX_CYCLE_HOURS - cycle,
+        )
+        time += chunk
+        driving += chunk
+        since_break += chunk
+        duty += chunk
+        cycle += chunk
+        hours -= chunk
+
+    return time, driving, since_break, duty, cycle
+
+
+def _walk(
+    state, previous, order, travel, stops, seen, events=None, schedule=None, bound=None
+):
+    """
+    Visit ``order`` starting from ``state`` at matrix node ``previous``.
+
+    ``state`` is (time, driving, since_break, duty, cycle, lateness,
+    violations); ``seen`` holds the stops already visited before ``order``.
+    Returns the state after the last stop. When ``schedule`` is given, the
+    state after every stop is appended to it so callers can resume from any
+    prefix of the sequence. Every term of the cost only grows along the
+    walk, so it stops early once the partial cost reaches ``bound``.
+    """
+    clock = state[:5]
+    lateness, violations = state[5], state[6]
+
+    for stop_index in order:
+        stop = stops[stop_index]
+        node = stop_index + 1
+
+        clock = _drive(clock, travel[previous][node], events)
+        time, driving, since_break, duty, cycle = clock
+
+        window_start = stop["window_start"]
+        if window_start is not None and time < window_start:
+            wait = window_start - time
+            if wait >= OFF_DUTY_HOURS:
+                # Long enough at the dock to count as the 10-hour rest
+                driving = since_break = duty = 0.0
+            else:
+                duty += wait
+                cycle += wait
+            time = window_start
+        arrival = time
+
+        window_end = stop["window_end"]
+        if window_end is not None and arrival > window_end:
+            lateness += arrival - window_end
+
+        requires = stop["requires"]
+        if requires is not None and requires not in seen:
+            violations += 1
+        seen.add(stop_index)
+
+        service = stop["service_hours"]
+        time += service
+        duty += service
+        cycle += service
+        clock = (time, driving, since_break, duty, cycle)
+
+        if schedule is not None:
+            schedule.append((stop_index, arrival, clock + (lateness, violations)))
+        if bound is not None and (
+            time + LATE_PENALTY * lateness + PRECEDENCE_PENALTY * violations >= bound
+        ):
+            break
+        previous = node
+
+    return clock + (lateness, violations)
+
+
+def _cost(state):
+    return state[0] + LATE_PENALTY * state[5] + PRECEDENCE_PENALTY * state[6]
+
+
+def _nearest_neighbour(distances, stops):
+    order = []
+    remaining = set(range(len(stops)))
+    visited = set()
+    current = 0
+
+    while remaining:
+        candidates = [
+            i
+            for i in remaining
+            if stops[i]["requires"] is None or stops[i]["requires"] in visited
+        ] or list(remaining)
+        nearest = min(candidates, key=lambda i: distances[current][i + 1])
+        order.append(nearest)
+        visited.add(nearest)
+        remaining.discard(nearest)
+        current = nearest + 1
+
+    return order
+
+
+def _prefix_states(order, initial, travel, stops):
+    schedule = []
+    _walk(initial, 0, order, travel, stops, set(), schedule=schedule)
+    return [initial] + [state for _, _, state in schedule]
+
+
+def _improve(order, initial, travel, stops, deadline):
+    """
+    2-opt and Or-opt first-improvement local search.
+
+    Every candidate shares a prefix with the current order, so only the
+    changed suffix is re-simulated from the cached HOS state at that point.
+    The search is anytime: it returns the best order found by ``deadline``.
+    """
+    n = len(order)
+    states = _prefix_states(order, initial, travel, stops)
+    best = _cost(states[-1])
+    improved = True
+
+    def suffix_cost(candidate, i):
+        previous = order[i - 1] + 1 if i else 0
+        state = _walk(
+            states[i],
+            previous,
+            candidate[i:],
+            travel,
+            stops,
+            set(order[:i]),
+            bound=best,
+        )
+        return _cost(state)
+
+    while improved:
+        improved = False
+
+        # 2-opt: reverse order[i:j]
+        for i in range(n - 1):
+            if perf_counter() > deadline:
+                return order, best
+            for j in range(i + 2, n + 1):
+                candidate = order[:i] + order[i:j][::-1] + order[j:]
+                cost = suffix_cost(candidate, i)
+                if cost < best - 1e-9:
+                    order, best, improved = candidate, cost, True
+                    states = _prefix_states(order, initial, travel, stops)
+
+        # Or-opt: move a run of 1-3 stops to another position
+        for length in (1, 2, 3):
+            for i in range(n - length + 1):
+                if perf_counter() > deadline:
+                    return order, best
+                segment = order[i:i + length]
+                rest = order[:i] + order[i + length:]
+                for j in range(len(rest) + 1):
+                    if j == i:
+                        continue
+                    candidate = rest[:j] + segment + rest[j:]
+                    cost = suffix_cost(candidate, min(i, j))
+                    if cost < best - 1e-9:
+                        order, best, improved = candidate, cost, True
+                        states = _prefix_states(order, initial, travel, stops)
+                        break
+
+    return order, best
+
+
+def _prepare(start, stops, average_speed):
+    points = [start] + [(stop["lat"], stop["lng"]) for stop in stops]
+    stops = [
+        {
+            "window_start": stop.get("window_start"),
+            "window_end": stop.get("window_end"),
+            "service_hours": stop.get("service_hours", DEFAULT_SERVICE_HOURS),
+            "requires": stop.get("requires"),
+        }
+        for stop in stops
+    ]
+    distances = get_distance_matrix(points)
+    return stops, (distances / average_speed).tolist(), distances.tolist()
+
+
+def _initial_state(cycle_used):
+    return (0.0, 0.0, 0.0, 0.0, float(cycle_used), 0.0, 0)
+
+
+def _schedule(order, initial, travel, distances, stops):
+    events = []
+    visits = []
+    _walk(initial, 0, order, travel, stops, set(), events=events, schedule=visits)
+    schedule = [
+        (stop_index, arrival, state[0], state[4])
+        for stop_index, arrival, state in visits
+    ]
+
+    total_distance = 0.0
+    previous = 0
+    for stop_index in order:
+        total_distance += distances[previous][stop_index + 1]
+        previous = stop_index + 1
+
+    late_hours = sum(
+        max(0.0, arrival - stops[i]["window_end"])
+        for i, arrival, _, _ in schedule
+        if stops[i]["window_end"] is not None
+    )
+
+    return {
+        "order": order,
+        "schedule": schedule,
+        "events": events,
+        "total_distance": total_distance,
+        "total_hours": schedule[-1][2] if schedule else 0.0,
+        "late_hours": late_hours,
+    }
+
+
+def sequence_stops(
+    start,
+    stops,
+    cycle_used=0,
+    average_speed=AVERAGE_SPEED_MPH,
+    time_limit=SEARCH_TIME_LIMIT,
+):
+    """
+    Order a multi-stop run for a single driver.
+
+    ``start`` is the driver's (lat, lng). Each stop is a dict with ``lat``,
+    ``lng`` and optionally ``window_start``/``window_end`` (hours from the
+    start of the run), ``service_hours`` and ``requires`` (index of a stop
+    that must be visited first, e.g. the pickup of a dropoff). The local
+    search runs for at most ``time_limit`` seconds.
+
+    Returns a dict with the visiting ``order``, a per-stop ``schedule`` of
+    (stop index, arrival, departure, cycle used) in hours from the start,
+    the HOS ``events`` inserted along the way, ``total_distance`` in miles,
+    ``total_hours`` and ``late_hours``.
+    """
+    stops, travel, distances = _prepare(start, stops, average_speed)
+
+    deadline = perf_counter() + time_limit
+    initial = _initial_state(cycle_used)
+    order = _nearest_neighbour(distances, stops)
+    if len(order) > 1:
+        order, _ = _improve(order, initial, travel, stops, deadline)
+
+    return _schedule(order, initial, travel, distances, stops)
+
+
+def schedule_stops(start, stops, order, cycle_used=0, average_speed=AVERAGE_SPEED_MPH):
+    """
+    ``sequence_stops`` output for a known visiting ``order``: only the HOS
+    walk along it is simulated, no search.
+    """
+    stops, travel, distances = _prepare(start, stops, average_speed)
+    return _schedule(list(order), _initial_state(cycle_used), travel, distances, stops)
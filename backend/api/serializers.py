@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from .models import spotter_users, Trip, DriverLog, Stop, DailyHOSSummary
+from .models import spotter_users, Trip, DriverLog, Stop, DailyHOSSummary, TripWaypoint
+from .cache import batched_user_changes
+from .driver_status import record_logs
+from .hos import refresh_days
 
 class spotter_usersSerializer(serializers.ModelSerializer):
     class Meta:
         model = spotter_users
-        fields = ['user_id', 'username', 'email', 'password', 'name', 'created_at', 'updated_at']
+        fields = ['user_id', 'username', 'email', 'password', 'name', 'terminal_timezone', 'fleet', 'created_at', 'updated_at']
         extra_kwargs = {
             'password': {'write_only': True}
         }
@@ -23,21 +26,47 @@ class DriverLogCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = DriverLog
         fields = '__all__'
-        read_only_fields = ['log_id', 'created_at']
+        # trip and user come from the URL (or the enclosing trip), passed to save()
+        read_only_fields = ['log_id', 'trip', 'user', 'log_date', 'geohash', 'created_at']
 
 class StopSerializer(serializers.ModelSerializer):
     class Meta:
         model = Stop
         fields = '__all__'
+        read_only_fields = ['geohash']
 
 class DailyHOSSummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = DailyHOSSummary
         fields = '__all__'
 
+class TripWaypointSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TripWaypoint
+        fields = '__all__'
+        read_only_fields = ['waypoint_id', 'trip', 'user', 'created_at']
+
+class WaypointInputSerializer(serializers.Serializer):
+    location_name = serializers.CharField(max_length=255)
+    stop_type = serializers.ChoiceField(choices=TripWaypoint.STOP_TYPE_CHOICES)
+    latitude = serializers.DecimalField(max_digits=10, decimal_places=7)
+    longitude = serializers.DecimalField(max_digits=10, decimal_places=7)
+    load_ref = serializers.CharField(max_length=50, required=False, allow_null=True)
+    window_start = serializers.DateTimeField(required=False, allow_null=True)
+    window_end = serializers.DateTimeField(required=False, allow_null=True)
+    service_duration = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, default=1)
+
+class LoadInputSerializer(serializers.Serializer):
+    load_ref = serializers.CharField(max_length=50)
+    pickup_lat = serializers.FloatField(min_value=-90, max_value=90)
+    pickup_lng = serializers.FloatField(min_value=-180, max_value=180)
+    dropoff_lat = serializers.FloatField(min_value=-90, max_value=90)
+    dropoff_lng = serializers.FloatField(min_value=-180, max_value=180)
+
 class TripWithLogsSerializer(serializers.ModelSerializer):
     logs = serializers.SerializerMethodField()
     stops = serializers.SerializerMethodField()
+    waypoints = serializers.SerializerMethodField()
     
     class Meta:
         model = Trip
@@ -51,61 +80,52 @@ class TripWithLogsSerializer(serializers.ModelSerializer):
         stops = Stop.objects.filter(trip=obj).order_by('stop_time')
         return StopSerializer(stops, many=True).data
 
+    def get_waypoints(self, obj):
+        waypoints = TripWaypoint.objects.filter(trip=obj).order_by('sequence')
+        return TripWaypointSerializer(waypoints, many=True).data
+
 class TripCreateSerializer(serializers.ModelSerializer):
     logs = DriverLogCreateSerializer(many=True, required=False)
     stops = StopSerializer(many=True, required=False)
+    waypoints = TripWaypointSerializer(many=True, required=False)
     
     class Meta:
         model = Trip
         fields = '__all__'
     
     def create(self, validated_data):
+        # One cache bump and pin for the trip and everything saved with it
+        with batched_user_changes():
+            return self._create(validated_data)
+
+    def _create(self, validated_data):
         logs_data = validated_data.pop('logs', [])
         stops_data = validated_data.pop('stops', [])
+        waypoints_data = validated_data.pop('waypoints', [])
         
         trip = Trip.objects.create(**validated_data)
         
-        for log_data in logs_data:
+        logs = [
             DriverLog.objects.create(trip=trip, user=trip.user, **log_data)
+            for log_data in logs_data
+        ]
+        record_logs(trip.user_id, logs)
         
         for stop_data in stops_data:
             Stop.objects.create(trip=trip, user=trip.user, **stop_data)
         
+        TripWaypoint.objects.bulk_create([
+            TripWaypoint(trip=trip, user=trip.user, **waypoint_data)
+            for waypoint_data in waypoints_data
+        ])
+        
         # Update daily HOS summary
-        self._update_hos_summary(trip, logs_data)
+        self._update_hos_summary(trip, logs)
         
         return trip
     
-    def _update_hos_summary(self, trip, logs_data):
-        from django.db.models import Sum
-        from django.utils import timezone
-        import datetime
-        
-        user = trip.user
-        today = timezone.now().date()
-        
-        # Get or create today's summary
-        summary, created = DailyHOSSummary.objects.get_or_create(
-            user=user,
-            log_date=today,
-            defaults={
-                'total_drive_time': 0,
-                'total_duty_time': 0,
-                'total_rest_time': 0,
-                'available_drive_time': 11,
-                'available_duty_time': 14
-            }
-        )
-        
-        # Calculate time spent in each status
-        drive_time = trip.driving_time
-        duty_time = trip.total_hos_used
-        rest_time = trip.rest_time
-        
-        # Update summary
-        summary.total_drive_time += drive_time
-        summary.total_duty_time += duty_time
-        summary.total_rest_time += rest_time
-        summary.available_drive_time = max(0, 11 - summary.total_drive_time)
-        summary.available_duty_time = max(0, 14 - summary.total_duty_time)
-        summary.save()
\ No newline at end of file
+    def _update_hos_summary(self, trip, logs):
+        # The trip's logs' days are recomputed from logs like every other
+        # write path (see hos.refresh_days); a trip's planned hours count
+        # once its logs are recorded, not on top of them
+        refresh_days(trip.user_id, {log.log_date for log in logs})
\ No newline at end of file
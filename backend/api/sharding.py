@@ -0,0 +1,220 @@
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .authentication import get_cached_user
+from .models import (
+    DailyHOSSummary,
+    DriverLog,
+    GPSBreadcrumb,
+    Stop,
+    Trip,
+    TripPlacement,
+    TripWaypoint,
+)
+from .routers import sharding_enabled
+
+# Everything stored on a driver's shard, parents before children
+SHARDED_MODELS = (Trip, TripWaypoint, GPSBreadcrumb, DriverLog, Stop, DailyHOSSummary)
+
+TRIP_OWNER_CACHE_SIZE = 10000
+
+_trip_owners = OrderedDict()
+_trip_owners_lock = threading.Lock()
+_rings = {}
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hashing of placement keys onto shard aliases. Each shard owns
+    ``points`` spots on the ring, so adding a shard takes over roughly an
+    equal share of keys from every other shard and leaves the rest in place.
+    """
+
+    def __init__(self, nodes, points):
+        ring = sorted((_hash(f"{node}#{n}"), node) for node in nodes for n in range(points))
+        self.hashes = [point for point, _ in ring]
+        self.nodes = [node for _, node in ring]
+
+    def node_for(self, key):
+        index = bisect.bisect(self.hashes, _hash(key)) % len(self.hashes)
+        return self.nodes[index]
+
+
+def ring():
+    key = (tuple(settings.SHARDS), settings.SHARD_RING_POINTS)
+    if key not in _rings:
+        _rings[key] = HashRing(*key)
+    return _rings[key]
+
+
+def placement_key(user):
+    """A fleet's drivers share a key, so they share a shard."""
+    if user.fleet_id:
+        return f"fleet:{user.fleet_id}"
+    return f"user:{user.user_id}"
+
+
+def target_shard(user):
+    """Where the ring places ``user``'s rows."""
+    return ring().node_for(placement_key(user))
+
+
+def current_shard(user):
+    """Where ``user``'s rows are now; drivers from before sharding are on default."""
+    return user.shard or "default"
+
+
+def assign_shard(user):
+    """Place a new driver, before their first save."""
+    if sharding_enabled() and not user.shard:
+        user.shard = target_shard(user)
+
+
+def shard_for_user(user_id):
+    if not sharding_enabled():
+        return "default"
+    user = get_cached_user(user_id)
+    return current_shard(user) if user is not None else "default"
+
+
+def shard_for_trip(trip_id):
+    if not sharding_enabled():
+        return "default"
+    with _trip_owners_lock:
+        user_id = _trip_owners.get(trip_id)
+        if user_id is not None:
+            _trip_owners.move_to_end(trip_id)
+    if user_id is None:
+        # A trip never changes hands, so owners are cached without expiry
+        user_id = (
+            TripPlacement.objects.filter(trip_id=trip_id)
+            .values_list("user_id", flat=True)
+            .first()
+        )
+        if user_id is None:
+            return "default"
+        with _trip_owners_lock:
+            _trip_owners[trip_id] = user_id
+            while len(_trip_owners) > TRIP_OWNER_CACHE_SIZE:
+                _trip_owners.popitem(last=False)
+    return shard_for_user(user_id)
+
+
+def fan_out(query, aliases=None):
+    """
+    Run ``query(alias)`` against every shard at once and return
+    ``[(alias, result), ...]`` in shard order. Each thread uses (and closes)
+    its own connections, so ``query`` must pick the database with
+    ``.using(alias)``.
+    """
+    aliases = list(aliases or settings.SHARDS)
+    if len(aliases) == 1:
+        return [(aliases[0], query(aliases[0]))]
+
+    def run(alias):
+        try:
+            return query(alias)
+        finally:
+            connections[alias].close()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as pool:
+        return list(zip(aliases, pool.map(run, aliases)))
+
+
+def high_water_marks(user_id, alias):
+    """Highest primary key of each sharded table for ``user_id`` on ``alias``."""
+    marks = {}
+    for model in SHARDED_MODELS:
+        pk = model._meta.pk.attname
+        marks[model] = (
+            model.objects.using(alias)
+            .filter(user_id=user_id)
+            .order_by(f"-{pk}")
+            .values_list(pk, flat=True)
+            .first()
+            or 0
+        )
+    return marks
+
+
+def copy_user_rows(user_id, source, target, after=None, changed_since=None, batch_size=1000):
+    """
+    Copy a driver's rows from ``source`` to ``target`` in one transaction on
+    ``target``; returns the number of rows copied.
+
+    Trips keep their ids, which are unique across shards (TripPlacement);
+    other rows get new ids, as theirs are only unique per database. With
+    ``after`` (from ``high_water_marks``) only rows added since are copied,
+    plus HOS summaries updated since ``changed_since``.
+    """
+    after = after or {}
+    copied = 0
+    with transaction.atomic(using=target):
+        for model in SHARDED_MODELS:
+            pk = model._meta.pk.attname
+            rows = model.objects.using(source).filter(user_id=user_id)
+            if model is DailyHOSSummary and changed_since is not None:
+                rows = rows.filter(updated_at__gte=changed_since)
+            elif model in after:
+                rows = rows.filter(**{f"{pk}__gt": after[model]})
+
+            batch = []
+            for row in rows.order_by(pk).iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    _insert(model, batch, target)
+                    copied += len(batch)
+                    batch = []
+            if batch:
+                _insert(model, batch, target)
+                copied += len(batch)
+    return copied
+
+
+def _insert(model, rows, alias):
+    if model is DailyHOSSummary:
+        # A day may already have been copied; the newer values win
+        for row in rows:
+            row.pk = None
+        model.objects.using(alias).bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["user", "log_date"],
+            update_fields=[
+                "total_drive_time",
+                "total_duty_time",
+                "total_rest_time",
+                "available_drive_time",
+                "available_duty_time",
+                "updated_at",
+            ],
+        )
+        return
+
+    # A raw insert keeps created_at and other auto-set values from the source
+    fields = [
+        field for field in model._meta.concrete_fields
+        if model is Trip or not field.primary_key
+    ]
+    size = max(1, connections[alias].ops.bulk_batch_size(fields, rows))
+    for start in range(0, len(rows), size):
+        model._base_manager.using(alias)._insert(
+            rows[start:start + size], fields=fields, using=alias, raw=True
+        )
+
+
+def delete_user_rows(user_id, alias):
+    """Delete all of a driver's sharded rows on ``alias``, children first."""
+    with transaction.atomic(using=alias):
+        for model in reversed(SHARDED_MODELS):
+            model.objects.using(alias).filter(user_id=user_id)._raw_delete(alias)
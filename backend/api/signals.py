@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import evict_cached_user
+from .cache import bump_user_version, user_data_changed
+from .driver_status import refresh_hos
+from .models import DailyHOSSummary, DriverLog, Stop, Trip, TripPlacement, TripWaypoint, spotter_users
+from .realtime import has_watchers, publish
+from .sharding import current_shard, delete_user_rows
+from .serializers import DailyHOSSummarySerializer, DriverLogSerializer
+
+USER_SCOPED_MODELS = (Trip, DriverLog, Stop, DailyHOSSummary, TripWaypoint)
+
+
+def _user_data_changed(sender, instance, **kwargs):
+    # Read-your-writes: also keeps this user's and trip's reads off the
+    # replica. Bulk writes batch these (cache.batched_user_changes)
+    user_data_changed(instance.user_id, getattr(instance, "trip_id", None))
+
+
+for model in USER_SCOPED_MODELS:
+    post_save.connect(_user_data_changed, sender=model, dispatch_uid=f"cache-{model.__name__}-save")
+    post_delete.connect(_user_data_changed, sender=model, dispatch_uid=f"cache-{model.__name__}-delete")
+
+
+@receiver(post_delete, sender=spotter_users, dispatch_uid="cache-spotter_users-delete")
+def _invalidate_deleted_user(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=spotter_users, dispatch_uid="auth-spotter_users-save")
+@receiver(post_delete, sender=spotter_users, dispatch_uid="auth-spotter_users-delete")
+def _evict_authenticated_user(sender, instance, **kwargs):
+    evict_cached_user(instance.user_id)
+
+
+@receiver(pre_delete, sender=spotter_users, dispatch_uid="shard-spotter_users-delete")
+def _delete_sharded_rows(sender, instance, **kwargs):
+    # The delete cascades within the user's own database only
+    if current_shard(instance) != instance._state.db:
+        delete_user_rows(instance.user_id, current_shard(instance))
+
+
+@receiver(post_delete, sender=Trip, dispatch_uid="shard-Trip-delete")
+def _release_trip_placement(sender, instance, **kwargs):
+    TripPlacement.objects.filter(trip_id=instance.trip_id).delete()
+
+
+@receiver(post_save, sender=DailyHOSSummary, dispatch_uid="status-DailyHOSSummary-save")
+@receiver(post_delete, sender=DailyHOSSummary, dispatch_uid="status-DailyHOSSummary-delete")
+def _refresh_driver_hos(sender, instance, created=None, **kwargs):
+    # Deletes may be part of deleting the user, so never create the row then
+    refresh_hos(instance.user_id, create=created is not None)
+
+
+@receiver(post_save, sender=DriverLog, dispatch_uid="realtime-DriverLog-save")
+def _push_driver_log(sender, instance, created, **kwargs):
+    if not created or not has_watchers(instance.user_id):
+        return
+
+    messages = [
+        {
+            "type": "log",
+            "user_id": instance.user_id,
+            "trip_id": instance.trip_id,
+            "log": DriverLogSerializer(instance).data,
+        }
+    ]
+    if instance.latitude is not None and instance.longitude is not None:
+        messages.append(
+            {
+                "type": "position",
+                "user_id": instance.user_id,
+                "trip_id": instance.trip_id,
+                "latitude": str(instance.latitude),
+                "longitude": str(instance.longitude),
+                "recorded_at": instance.log_time.isoformat(),
+            }
+        )
+    transaction.on_commit(lambda: [publish(instance.user_id, m) for m in messages])
+
+
+@receiver(post_save, sender=DailyHOSSummary, dispatch_uid="realtime-DailyHOSSummary-save")
+def _push_hos_summary(sender, instance, **kwargs):
+    if not has_watchers(instance.user_id):
+        return
+
+    message = {
+        "type": "hos",
+        "user_id": instance.user_id,
+        "summary": DailyHOSSummarySerializer(instance).data,
+    }
+    transaction.on_commit(lambda: publish(instance.user_id, message))
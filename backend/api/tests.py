@@ -1,3 +1,1630 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import select
+import signal
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import archive, columnar, compression, logutils, plan_cache, routers
+from . import cache as cache_module
+from .admission import PayloadRejected, iter_json_array
+from .assignment import solve_assignment
+from .authentication import CachedJWTAuthentication, LastSeenRecorder
+from .cache import bump_user_version, get_user_version
+from .driver_status import record_logs, record_position, refresh_hos
+from .geo import encode_geohash
+from .hos import rebuild_summaries
+from .logutils import QueueLogHandler, SamplingFilter
+from .models import (
+    DailyHOSSummary,
+    DriverLog,
+    DriverStatus,
+    Fleet,
+    GPSBreadcrumb,
+    Stop,
+    Trip,
+    TripWaypoint,
+    spotter_users,
+    terminal_date,
+)
+from .realtime import publish
+from .routing import LATE_PENALTY, schedule_stops, sequence_stops
+from .sharding import HashRing, assign_shard, current_shard, placement_key, ring, target_shard
+from .tracks import douglas_peucker, simplify_track, zoom_tolerance
+from .websocket import websocket_application
+
+try:
+    import msgpack
+except ImportError:  # the columnar tests are skipped
+    msgpack = None
+
+
+# Endpoint, request and the most queries it may take. Lower a budget when a
+# change saves queries; raising one needs a reason in the commit.
+#   (name, method, path, body, max_queries, tables allowed to be full-scanned)
+ENDPOINTS = [
+    ("get-user", "get", "/api/user/{user}/", None, 1, ()),
+    ("user-trips", "get", "/api/user/{user}/trips/", None, 2, ()),
+    ("user-trips-range", "get", "/api/user/{user}/trips/?start_date=2026-09-01&end_date=2026-09-30", None, 2, ()),
+    ("trip-detail", "get", "/api/trip/{trip}/", None, 4, ()),
+    # Finished trip: served from the precompressed payload stored above
+    ("trip-detail-repeat", "get", "/api/trip/{trip}/", None, 1, ()),
+    ("user-logs", "get", "/api/user/{user}/logs/", None, 2, ()),
+    ("user-logs-date", "get", "/api/user/{user}/logs/?date=2026-09-03", None, 2, ()),
+    ("user-logs-range", "get", "/api/user/{user}/logs/?start_date=2026-09-01&end_date=2026-09-05", None, 2, ()),
+    ("user-hos-range", "get", "/api/user/{user}/hos/?start_date=2026-09-01&end_date=2026-09-05", None, 2, ()),
+    ("async-user-logs", "get", "/api/async/user/{user}/logs/?date=2026-09-03", None, 2, ()),
+    ("trip-breadcrumbs", "get", "/api/trip/{trip}/breadcrumbs/", None, 2, ()),
+    # The whole board is the point of this endpoint
+    ("fleet-status", "get", "/api/fleet/status/", None, 1, ("driver_status",)),
+    ("fleet-status-filtered", "get", "/api/fleet/status/?status=Driving&region=dp", None, 1, ()),
+    ("fleet-nearby", "get", "/api/fleet/nearby/?lat=41&lng=-86.5&radius=100", None, 1, ()),
+    ("fleet-nearby-history", "get", "/api/fleet/nearby/?lat=41&lng=-86.5&radius=100&start=2026-09-01T00:00:00Z&end=2026-09-30T00:00:00Z", None, 1, ()),
+    ("stops-nearby", "get", "/api/stops/nearby/?lat=41&lng=-86.5&radius=100", None, 2, ()),
+    ("login", "post", "/api/login/", {"username": "driver0", "password": "Passw0rd!"}, 1, ()),
+    ("assignments", "post", "/api/assignments/", {
+        "loads": [{"load_ref": "L1", "pickup_lat": 41.9, "pickup_lng": -87.6, "dropoff_lat": 39.1, "dropoff_lng": -84.5}],
+    }, 1, ("spotter_users",)),
+]
+
+
+def explain(sql, params):
+    """Plan rows for one statement, or None when the backend isn't supported."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == "mysql":
+            cursor.execute(f"EXPLAIN {sql}", params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return None
+
+
+def full_scans(plan):
+    """Tables the plan reads in full, without any index."""
+    tables = set()
+    for row in plan:
+        if connection.vendor == "sqlite":
+            # "SCAN driver_logs" (but not "SCAN ... USING INDEX ..." or a subquery)
+            parts = row.split()
+            if len(parts) == 2 and parts[0] == "SCAN" and not parts[1].startswith("("):
+                tables.add(parts[1])
+        elif row.get("type") == "ALL" and row.get("table"):
+            tables.add(row["table"])
+    return tables
+
+
+def make_trip(user, start_time, **fields):
+    """A Chicago to Cincinnati trip for ``user`` leaving at ``start_time``."""
+    return Trip.objects.create(
+        **{
+            "user": user,
+            "pickup_location_name": "Chicago, IL",
+            "pickup_lat": Decimal("41.8781136"),
+            "pickup_lng": Decimal("-87.6297982"),
+            "dropoff_location_name": "Cincinnati, OH",
+            "dropoff_lat": Decimal("39.1031182"),
+            "dropoff_lng": Decimal("-84.5120196"),
+            "total_distance": 300,
+            "total_duration": 8,
+            "driving_time": 6,
+            "rest_time": 1,
+            "total_hos_used": 7,
+            "initial_hos": 0,
+            "start_time": start_time,
+            "end_time": start_time + timedelta(hours=8),
+            **fields,
+        }
+    )
+
+
+class _Recorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+# Queries are recorded on the default connection, so everything is served
+# from it: no shards, and replica-safe reads (the replica is a test mirror of
+# default anyway) stay on the primary
+@override_settings(
+    API_RESPONSE_CACHE_TIMEOUT=0,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    SHARDS=["default"],
+)
+@mock.patch.object(routers, "replica_configured", mock.Mock(return_value=False))
+class QueryPlanRegressionTests(TestCase):
+    """
+    Runs every read path against a seeded database, recording each query and
+    its plan. Fails when an endpoint takes more queries than its budget or a
+    query reads a table without an index.
+
+    Set QUERY_PLAN_REPORT=<file> to write every query and plan as JSON.
+    """
+
+    report = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        start = datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc)
+        cls.users = []
+        for n in range(3):
+            user = spotter_users.objects.create(
+                username=f"driver{n}",
+                email=f"driver{n}@example.com",
+                password=make_password("Passw0rd!", hasher="md5"),
+                terminal_timezone="America/Chicago",
+            )
+            cls.users.append(user)
+            for t in range(3):
+                trip_start = start + timedelta(days=3 * t)
+                trip = Trip.objects.create(
+                    user=user,
+                    pickup_location_name="Chicago, IL",
+                    pickup_lat=Decimal("41.8781136"),
+                    pickup_lng=Decimal("-87.6297982"),
+                    dropoff_location_name="Cincinnati, OH",
+                    dropoff_lat=Decimal("39.1031182"),
+                    dropoff_lng=Decimal("-84.5120196"),
+                    total_distance=300,
+                    total_duration=8,
+                    driving_time=6,
+                    rest_time=1,
+                    total_hos_used=7,
+                    initial_hos=0,
+                    start_time=trip_start,
+                    end_time=trip_start + timedelta(hours=8),
+                )
+                logs = [
+                    DriverLog.objects.create(
+                        trip=trip,
+                        user=user,
+                        log_time=trip_start + timedelta(hours=h),
+                        status="Driving" if h % 3 else "Resting",
+                        description="Driving for 60 minutes",
+                        latitude=Decimal("41.5") - Decimal(h) / 10,
+                        longitude=Decimal("-87.0") + Decimal(h) / 10,
+                    )
+                    for h in range(12)
+                ]
+                record_logs(user.user_id, logs)
+                Stop.objects.create(
+                    trip=trip,
+                    user=user,
+                    stop_time=trip_start + timedelta(hours=4),
+                    stop_name="Rest area",
+                    latitude=Decimal("40.5"),
+                    longitude=Decimal("-86.0"),
+                    stop_type="Rest",
+                )
+                TripWaypoint.objects.create(
+                    trip=trip,
+                    user=user,
+                    sequence=0,
+                    stop_type="Pickup",
+                    location_name="Chicago, IL",
+                    latitude=Decimal("41.8781136"),
+                    longitude=Decimal("-87.6297982"),
+                )
+                GPSBreadcrumb.objects.bulk_create(
+                    GPSBreadcrumb(
+                        trip=trip,
+                        user=user,
+                        recorded_at=trip_start + timedelta(minutes=m),
+                        latitude=Decimal("41.5") - Decimal(m) / 1000,
+                        longitude=Decimal("-87.0") + Decimal(m) / 1000,
+                    )
+                    for m in range(50)
+                )
+            for d in range(10):
+                DailyHOSSummary.objects.create(
+                    user=user,
+                    log_date=date(2026, 9, 1) + timedelta(days=d),
+                    total_drive_time=6,
+                    total_duty_time=7,
+                    total_rest_time=1,
+                    available_drive_time=5,
+                    available_duty_time=7,
+                )
+        cls.trip = Trip.objects.filter(user=cls.users[0]).first()
+
+    @classmethod
+    def tearDownClass(cls):
+        path = os.environ.get("QUERY_PLAN_REPORT")
+        if path:
+            with open(path, "w") as handle:
+                json.dump(cls.report, handle, indent=2, default=str)
+        super().tearDownClass()
+
+    def test_endpoints_use_indexes_within_query_budget(self):
+        client = APIClient()
+        for name, method, path, body, max_queries, allowed_scans in ENDPOINTS:
+            with self.subTest(endpoint=name):
+                path = path.format(user=self.users[0].user_id, trip=self.trip.trip_id)
+                recorder = _Recorder()
+                with connection.execute_wrapper(recorder):
+                    if method == "get":
+                        response = client.get(path)
+                    else:
+                        response = client.post(path, body, format="json")
+                self.assertLess(response.status_code, 300, f"{name}: {response.content[:200]}")
+
+                entries = []
+                for sql, params in recorder.statements:
+                    plan = None
+                    if sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                        plan = explain(sql, params)
+                    entries.append({"sql": sql, "params": params, "plan": plan})
+                self.report[name] = entries
+
+                queries = [entry for entry in entries if not entry["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+                self.assertLessEqual(
+                    len(queries),
+                    max_queries,
+                    f"{name} ran {len(queries)} queries (budget {max_queries}):\n"
+                    + "\n".join(entry["sql"] for entry in queries),
+                )
+                for entry in queries:
+                    if entry["plan"] is None:
+                        continue
+                    scanned = full_scans(entry["plan"]) - set(allowed_scans)
+                    self.assertFalse(
+                        scanned,
+                        f"{name} full-scans {sorted(scanned)}:\n{entry['sql']}\n{entry['plan']}",
+                    )
+
+
+# Sharded models are routed by ShardRouter when shards are configured
+@override_settings(SHARDS=["default"])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = spotter_users.objects.create(
+            username="driver", email="driver@example.com", terminal_timezone="America/Chicago"
+        )
+
+    def setUp(self):
+        # Saves pin their rows (api/signals.py)
+        cache.clear()
+
+    async def test_replica_reads_under_asgi(self):
+        # Reads made by the view see the flag, and the middleware resets it
+        # in the context it set it in
+        seen = []
+
+        def db_for_read(router, model, **hints):
+            seen.append(routers._read_from_replica.get())
+            return "default"
+
+        with mock.patch.object(routers, "replica_configured", return_value=True), \
+                mock.patch.object(routers.PrimaryReplicaRouter, "db_for_read", db_for_read):
+            response = await AsyncClient().get(f"/api/user/{self.user.user_id}/logs/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(seen)
+        self.assertTrue(all(seen))
+        self.assertFalse(routers._read_from_replica.get())
+
+    def test_reads_follow_the_replica_flag(self):
+        router = routers.PrimaryReplicaRouter()
+        with mock.patch.object(routers, "replica_configured", return_value=True):
+            with routers.use_replica():
+                self.assertEqual(router.db_for_read(Trip), "replica")
+                self.assertEqual(router.db_for_write(Trip), "default")
+        self.assertEqual(router.db_for_read(Trip), "default")
+
+        # Without a replica the flag never goes up
+        with mock.patch.object(routers, "replica_configured", return_value=False):
+            with routers.use_replica():
+                self.assertEqual(router.db_for_read(Trip), "default")
+
+    def test_pins(self):
+        routers.pin_to_primary(user_id=self.user.user_id, trip_id=7)
+        self.assertTrue(routers.is_pinned(user_id=self.user.user_id))
+        self.assertTrue(routers.is_pinned(trip_id=7))
+        self.assertTrue(routers.is_pinned(user_id=self.user.user_id + 1, trip_id=7))
+        self.assertFalse(routers.is_pinned(user_id=self.user.user_id + 1))
+        self.assertFalse(routers.is_pinned())
+
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            routers.pin_to_primary(trip_id=8)
+        self.assertFalse(routers.is_pinned(trip_id=8))
+
+    def test_written_trip_reads_from_primary(self):
+        trip = make_trip(self.user, datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc))
+        # Saving it pinned it
+        cache.clear()
+        seen = []
+
+        def db_for_read(router, model, **hints):
+            seen.append(routers._read_from_replica.get())
+            return "default"
+
+        client = APIClient()
+        path = f"/api/trip/{trip.trip_id}/"
+        with mock.patch.object(routers, "replica_configured", return_value=True), \
+                mock.patch.object(routers.PrimaryReplicaRouter, "db_for_read", db_for_read):
+            client.get(path)
+            self.assertTrue(seen and all(seen))
+
+            # A successful write pins the trip, so the next read sees it
+            response = client.post(
+                f"/api/trip/{trip.trip_id}/logs/",
+                [{"log_time": "2026-09-01T07:00:00Z", "status": "Driving", "description": "Driving"}],
+                format="json",
+            )
+            self.assertLess(response.status_code, 400, response.content[:200])
+            seen.clear()
+            client.get(path)
+            self.assertTrue(seen)
+            self.assertFalse(any(seen))
+
+
+@skipUnless(routers.replica_configured(), "needs a replica database (e.g. SQLITE_DIR)")
+@override_settings(SHARDS=["default"])
+class ReplicaReadYourWritesTests(TestCase):
+    # The runner sets up every alias named here, skipped or not
+    databases = {"default", routers.REPLICA_DB} if routers.replica_configured() else {"default"}
+
+    def test_get_after_post_reads_the_primary(self):
+        # Written to the primary only; the test replica never catches up
+        user = spotter_users.objects.create(username="driver", email="driver@example.com")
+        trip = make_trip(user, datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc))
+        cache.clear()
+        client = APIClient()
+        path = f"/api/user/{user.user_id}/logs/"
+        self.assertEqual(client.get(path).status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                f"/api/trip/{trip.trip_id}/logs/",
+                [{"log_time": "2026-09-01T07:00:00Z", "status": "Driving", "description": "Driving"}],
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([log["trip"] for log in client.get(path).json()], [trip.trip_id])
+
+        # Once the pin expires, reads go back to the (stale) replica
+        cache.clear()
+        self.assertEqual(client.get(path).status_code, 404)
+
+
+class _Collector(logging.Handler):
+    def __init__(self, name, delay=0):
+        super().__init__()
+        self.set_name(name)
+        self.delay = delay
+        self.messages = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.messages.append(record.getMessage())
+
+
+class LoggingTests(SimpleTestCase):
+    def _record(self, msg, *args, **extra):
+        return logging.makeLogRecord({"msg": msg, "args": args, "levelno": logging.INFO, **extra})
+
+    def _records(self, endpoint, count):
+        for n in range(count):
+            yield self._record("log %d", n, endpoint=endpoint)
+
+    def test_sampling_drops_records_at_the_configured_rate(self):
+        sampler = SamplingFilter(rates={"ingest": 0.25, "muted": 0}, default_rate=1.0)
+        with mock.patch.object(logutils.random, "random", random.Random(0).random):
+            kept = {
+                endpoint: sum(map(sampler.filter, self._records(endpoint, 10000)))
+                for endpoint in ("ingest", "muted", "other")
+            }
+        self.assertAlmostEqual(kept["ingest"], 2500, delta=150)
+        self.assertEqual(kept["muted"], 0)
+        self.assertEqual(kept["other"], 10000)
+
+    def _handler(self, delay=0):
+        collector = _Collector(f"collector-{id(self)}", delay)
+        handler = QueueLogHandler(handlers=[collector.name])
+        self.addCleanup(collector.close)
+        self.addCleanup(handler.close)
+        return handler, collector
+
+    def test_flush_drains_the_queue(self):
+        handler, collector = self._handler(delay=0.001)
+        for record in self._records("ingest", 200):
+            handler.handle(record)
+        handler.flush()
+        self.assertEqual(collector.messages, [f"log {n}" for n in range(200)])
+        self.assertEqual(handler.queue.unfinished_tasks, 0)
+        # The listener keeps running after a flush
+        handler.handle(self._record("after flush"))
+        handler.flush()
+        self.assertEqual(collector.messages[-1], "after flush")
+
+    @skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_listener_restarts_after_fork(self):
+        handler, collector = self._handler()
+        handler.handle(self._record("parent"))
+        handler.flush()
+        parent_listener = handler.listener
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # child: log, flush and report what the collector saw
+            try:
+                os.close(read_fd)
+                restarted = handler.listener is None
+                handler.handle(self._record("child"))
+                handler.flush()
+                report = {"restarted": restarted, "messages": collector.messages}
+                os.write(write_fd, json.dumps(report).encode())
+            finally:
+                os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as pipe:
+            # A child without a listener would wait on flush() forever
+            if select.select([pipe], [], [], 10)[0]:
+                report = json.loads(pipe.read() or b"null")
+            else:
+                os.kill(pid, signal.SIGKILL)
+                report = None
+        os.waitpid(pid, 0)
+        self.assertEqual(report, {"restarted": True, "messages": ["parent", "child"]})
+
+        # The parent's listener is untouched and still delivers
+        self.assertIs(handler.listener, parent_listener)
+        handler.handle(self._record("parent again"))
+        handler.flush()
+        self.assertEqual(collector.messages, ["parent", "parent again"])
+
+
+class SequencingTests(SimpleTestCase):
+    start = (40.0, -100.0)
+
+    def _cost(self, result):
+        return result["total_hours"] + LATE_PENALTY * result["late_hours"]
+
+    def test_stops_along_a_road_are_visited_in_order(self):
+        stops = [{"lat": 40.0, "lng": -100.0 + offset} for offset in (6, 2, 10, 4, 8)]
+        result = sequence_stops(self.start, stops)
+        self.assertEqual(result["order"], [1, 3, 0, 4, 2])
+        self.assertEqual(result["late_hours"], 0)
+
+        # 10 degrees of longitude is over 11 hours of driving: a break at
+        # 8 hours, then a 10-hour rest once the 14-hour window closes
+        self.assertEqual([event[0] for event in result["events"]], ["Resting", "Off Duty"])
+        arrivals = [arrival for _, arrival, _, _ in result["schedule"]]
+        self.assertEqual(arrivals, sorted(arrivals))
+
+    def test_close_to_brute_force_on_small_runs(self):
+        rng = random.Random(0)
+        for n in (2, 3, 4, 5) * 5:
+            stops = [
+                {"lat": rng.uniform(39, 41), "lng": rng.uniform(-102, -98)}
+                for _ in range(n)
+            ]
+            best = min(
+                self._cost(schedule_stops(self.start, stops, order))
+                for order in itertools.permutations(range(n))
+            )
+            result = sequence_stops(self.start, stops, time_limit=1)
+            # A local search, so close to the optimum rather than always on it
+            self.assertLessEqual(self._cost(result), best * 1.01)
+
+    def test_pickup_before_dropoff(self):
+        # The dropoff is nearer, but needs the pickup first
+        stops = [{"lat": 40.0, "lng": -99.0, "requires": 1}, {"lat": 40.0, "lng": -95.0}]
+        self.assertEqual(sequence_stops(self.start, stops)["order"], [1, 0])
+
+    def test_time_window_reorders_two_stops(self):
+        # Nearest first would reach the far stop hours after its window
+        stops = [{"lat": 40.0, "lng": -99.0}, {"lat": 40.0, "lng": -95.0, "window_end": 5}]
+        result = sequence_stops(self.start, stops)
+        self.assertEqual(result["order"], [1, 0])
+        self.assertEqual(result["late_hours"], 0)
+
+    def test_schedule_stops_replays_an_order(self):
+        stops = [{"lat": 40.0, "lng": -100.0 + offset} for offset in (3, 1, 2)]
+        result = sequence_stops(self.start, stops, cycle_used=60)
+        self.assertEqual(
+            schedule_stops(self.start, stops, result["order"], cycle_used=60), result
+        )
+
+
+class AssignmentSolverTests(SimpleTestCase):
+    def _brute_force(self, cost):
+        rows, cols = cost.shape
+        if rows > cols:
+            return self._brute_force(cost.T)
+        return min(
+            sum(cost[row, col] for row, col in enumerate(columns))
+            for columns in itertools.permutations(range(cols), rows)
+        )
+
+    def test_optimal_against_brute_force(self):
+        rng = np.random.default_rng(0)
+        for shape in [(1, 1), (3, 3), (5, 5), (6, 6), (3, 6), (6, 3), (4, 7)] * 3:
+            with self.subTest(shape=shape):
+                # Integer costs, so ties (and the degenerate paths they cause) occur
+                cost = rng.integers(0, 20, size=shape).astype(float)
+                rows, cols = solve_assignment(cost)
+                self.assertEqual(len(rows), min(shape))
+                self.assertEqual(len(set(rows.tolist())), len(rows))
+                self.assertEqual(len(set(cols.tolist())), len(cols))
+                self.assertAlmostEqual(cost[rows, cols].sum(), self._brute_force(cost))
+
+    def test_empty(self):
+        rows, cols = solve_assignment(np.zeros((0, 3)))
+        self.assertEqual((len(rows), len(cols)), (0, 0))
+
+
+class LoadAssignmentTests(TestCase):
+    def test_unknown_driver_ids_are_rejected(self):
+        user = spotter_users.objects.create(username="driver", email="driver@example.com")
+        load = {"load_ref": "L1", "pickup_lat": 41.9, "pickup_lng": -87.6, "dropoff_lat": 39.1, "dropoff_lng": -84.5}
+        client = APIClient()
+
+        response = client.post(
+            "/api/assignments/", {"loads": [load], "driver_ids": [user.user_id, user.user_id + 1]}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["driver_ids"], [user.user_id + 1])
+
+        response = client.post("/api/assignments/", {"loads": [load], "driver_ids": "1,2"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        response = client.post("/api/assignments/", {"loads": [load], "driver_ids": [user.user_id]}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+
+class BreadcrumbUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = spotter_users.objects.create(username="driver", email="driver@example.com")
+        cls.trip = make_trip(user, datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc))
+
+    def _post(self, points):
+        return APIClient().post(f"/api/trip/{self.trip.trip_id}/breadcrumbs/", points, format="json")
+
+    def test_stores_a_batch(self):
+        start = datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc).timestamp()
+        response = self._post(
+            {"t": [start, start + 60, start + 120], "lat": [41.5, 41.51, 41.52], "lng": [-87.0, -87.0, -87.0]}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"received": 3, "stored": 2})
+        self.assertEqual(GPSBreadcrumb.objects.filter(trip=self.trip).count(), 2)
+
+    def test_rejects_bad_values(self):
+        start = datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc).timestamp()
+        batches = [
+            {"t": [start, start + 60], "lat": [41.5, None], "lng": [-87.0, -87.0]},
+            {"t": [start, start + 60], "lat": [41.5, 41.5], "lng": [None, -87.0]},
+            {"t": [start, None], "lat": [41.5, 41.5], "lng": [-87.0, -87.0]},
+            {"t": [start, 1e300], "lat": [41.5, 41.5], "lng": [-87.0, -87.0]},
+            {"t": [start, -1], "lat": [41.5, 41.5], "lng": [-87.0, -87.0]},
+            {"t": [start, start + 60], "lat": [41.5, 91], "lng": [-87.0, -87.0]},
+            {"t": [start, start + 60], "lat": [[41.5], [41.5]], "lng": [-87.0, -87.0]},
+            {"t": [start], "lat": 41.5, "lng": -87.0},
+        ]
+        for batch in batches:
+            with self.subTest(batch=batch):
+                self.assertEqual(self._post(batch).status_code, 400)
+        self.assertFalse(GPSBreadcrumb.objects.filter(trip=self.trip).exists())
+
+
+# The rebuild command reads every shard from worker threads, which can't see
+# the test transaction's rows on SQLite
+@override_settings(SHARDS=["default"])
+class HOSSummaryTests(TestCase):
+    start = datetime(2026, 9, 2, 2, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = spotter_users.objects.create(
+            username="driver", email="driver@example.com", terminal_timezone="America/Chicago"
+        )
+
+    def _logs(self, hours):
+        # Hourly from 9pm Chicago time, so the later ones fall on the next day
+        return [
+            {
+                "log_time": (self.start + timedelta(hours=h)).isoformat(),
+                "status": ("Driving", "Pickup", "Resting")[h % 3],
+                "description": "Driving for 60 minutes",
+            }
+            for h in hours
+        ]
+
+    def _summaries(self):
+        return {
+            summary.log_date: (summary.total_drive_time, summary.total_duty_time, summary.total_rest_time)
+            for summary in DailyHOSSummary.objects.filter(user=self.user)
+        }
+
+    def test_trip_creation_ingest_and_rebuild_agree(self):
+        client = APIClient()
+        response = client.post(
+            f"/api/user/{self.user.user_id}/trips/",
+            {
+                "pickup_location_name": "Chicago, IL",
+                "pickup_lat": "41.8781136",
+                "pickup_lng": "-87.6297982",
+                "dropoff_location_name": "Cincinnati, OH",
+                "dropoff_lat": "39.1031182",
+                "dropoff_lng": "-84.5120196",
+                "total_distance": 300,
+                "total_duration": 8,
+                "driving_time": 6,
+                "rest_time": 1,
+                "total_hos_used": 7,
+                "initial_hos": 0,
+                "start_time": self.start.isoformat(),
+                "end_time": (self.start + timedelta(hours=8)).isoformat(),
+                "logs": self._logs(range(0, 3)),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content[:300])
+        trip_id = response.json()["trip_id"]
+        # Only the logs count, not the trip's planned hours on top of them
+        self.assertEqual(self._summaries(), {date(2026, 9, 1): (1, 2, Decimal("0.5"))})
+
+        response = client.post(f"/api/trip/{trip_id}/logs/", self._logs(range(3, 8)), format="json")
+        self.assertEqual(response.status_code, 201)
+        ingested = self._summaries()
+        self.assertEqual(
+            ingested,
+            {date(2026, 9, 1): (1, 2, Decimal("0.5")), date(2026, 9, 2): (2, 4, Decimal("0.5"))},
+        )
+
+        for _ in range(2):
+            output = io.StringIO()
+            call_command("rebuild_hos_summaries", workers=1, stdout=output)
+            self.assertEqual(self._summaries(), ingested)
+        self.assertIn("2 summaries, 0 stale summaries deleted", output.getvalue())
+
+    def test_rebuild_deletes_days_left_without_logs(self):
+        trip = make_trip(self.user, self.start)
+        client = APIClient()
+        client.post(f"/api/trip/{trip.trip_id}/logs/", self._logs(range(0, 8)), format="json")
+        self.assertEqual(len(self._summaries()), 2)
+        stale = DailyHOSSummary.objects.create(
+            user=self.user,
+            log_date=date(2026, 8, 1),
+            total_drive_time=6,
+            total_duty_time=7,
+            total_rest_time=1,
+            available_drive_time=5,
+            available_duty_time=7,
+        )
+
+        DriverLog.objects.filter(user=self.user, log_date=date(2026, 9, 2)).delete()
+        self.assertEqual(
+            rebuild_summaries([self.user.user_id], since=date(2026, 9, 1), until=date(2026, 9, 30)),
+            (3, 1, 1),
+        )
+        self.assertEqual(set(self._summaries()), {date(2026, 8, 1), date(2026, 9, 1)})
+
+        # Outside the range until the whole history is rebuilt
+        self.assertEqual(rebuild_summaries([self.user.user_id]), (3, 1, 1))
+        self.assertFalse(DailyHOSSummary.objects.filter(pk=stale.pk).exists())
+        self.assertEqual(rebuild_summaries([self.user.user_id]), (3, 1, 0))
+
+
+class TrackSimplificationTests(SimpleTestCase):
+    def test_collinear_points_collapse_to_endpoints(self):
+        x = np.arange(10, dtype=float)
+        self.assertEqual(douglas_peucker(x, 2 * x, 0.01).tolist(), [0, 9])
+
+    def test_keeps_only_deviations_past_the_tolerance(self):
+        x = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+        y = np.array([0.0, 0.05, 0.0, 3.0, 0.0, -0.05, 0.0])
+        self.assertEqual(douglas_peucker(x, y, 0.1).tolist(), [0, 2, 3, 4, 6])
+        self.assertEqual(douglas_peucker(x, y, 0.01).tolist(), list(range(7)))
+        self.assertEqual(douglas_peucker(x, y, 5).tolist(), [0, 6])
+
+    def test_closed_loop(self):
+        # Start and end coincide, so distances are measured from that point
+        x = np.array([0.0, 10.0, 10.0, 0.0, 0.0])
+        y = np.array([0.0, 0.0, 10.0, 10.0, 0.0])
+        self.assertEqual(douglas_peucker(x, y, 1).tolist(), [0, 1, 2, 3, 4])
+
+    def test_short_tracks(self):
+        self.assertEqual(douglas_peucker(np.array([]), np.array([]), 1).tolist(), [])
+        self.assertEqual(simplify_track([41.0, 41.1], [-87.0, -87.1], 1000).tolist(), [0, 1])
+
+    def test_parked_pings_dropped_before_simplifying(self):
+        # A truck parked at the first point (a metre or so apart), then driving
+        # north and turning east
+        lats = [41.0, 41.00001, 41.00002, 41.00001, 41.05, 41.1, 41.1, 41.1]
+        lngs = [-87.0, -87.00001, -87.0, -87.00001, -87.0, -87.0, -86.95, -86.9]
+        self.assertEqual(simplify_track(lats, lngs, 0.5).tolist(), [0, 1, 2, 3, 5, 7])
+        self.assertEqual(simplify_track(lats, lngs, 0.5, min_distance=50).tolist(), [0, 5, 7])
+        self.assertEqual(simplify_track(lats, lngs, 10).tolist(), [0, 5, 7])
+
+    def test_zoom_tolerance(self):
+        self.assertAlmostEqual(zoom_tolerance(0, 0), 156543.03)
+        self.assertAlmostEqual(zoom_tolerance(10, 0), zoom_tolerance(9, 0) / 2)
+        self.assertAlmostEqual(zoom_tolerance(10, 60), zoom_tolerance(10, 0) / 2)
+
+
+# The fleet views are replica-safe; keep them on the primary, which has the rows
+@mock.patch.object(routers, "replica_configured", mock.Mock(return_value=False))
+class DriverStatusTests(TestCase):
+    start = datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            spotter_users.objects.create(
+                username=f"driver{n}", email=f"driver{n}@example.com", terminal_timezone="America/Chicago"
+            )
+            for n in range(3)
+        ]
+        cls.trip = make_trip(cls.users[0], cls.start)
+
+    def _log(self, hours, status="Driving", **values):
+        return DriverLog(
+            trip=self.trip, user=self.users[0], log_time=self.start + timedelta(hours=hours), status=status, **values
+        )
+
+    def test_newer_events_win(self):
+        user_id = self.users[0].user_id
+        record_logs(user_id, [self._log(1), self._log(2, "Resting"), self._log(0, "Pickup")])
+        status_row = DriverStatus.objects.get(user_id=user_id)
+        self.assertEqual((status_row.current_status, status_row.status_since), ("Resting", self.start + timedelta(hours=2)))
+        self.assertIsNone(status_row.region)
+
+        # A late-arriving older batch doesn't roll the board back
+        record_logs(user_id, [self._log(1.5, "Off Duty", latitude=Decimal("41.8781136"), longitude=Decimal("-87.6297982"))])
+        status_row.refresh_from_db()
+        self.assertEqual(status_row.current_status, "Resting")
+        # but its position is the first one known
+        self.assertEqual(status_row.region, "dp3w")
+
+        record_position(user_id, self.trip.trip_id, Decimal("39.1031182"), Decimal("-84.5120196"), self.start)
+        status_row.refresh_from_db()
+        self.assertEqual(status_row.region, "dp3w")
+        record_position(user_id, self.trip.trip_id, Decimal("39.1031182"), Decimal("-84.5120196"), self.start + timedelta(hours=3))
+        status_row.refresh_from_db()
+        self.assertEqual(
+            (status_row.latitude, status_row.region),
+            (Decimal("39.1031182"), encode_geohash(39.1031182, -84.5120196, 4)),
+        )
+
+    def test_hours_today_and_cycle(self):
+        user = self.users[0]
+        today = user.local_date(timezone.now())
+        for days_ago, duty in ((8, 14), (7, 10), (0, 8)):
+            DailyHOSSummary.objects.create(
+                user=user,
+                log_date=today - timedelta(days=days_ago),
+                total_drive_time=duty - 2,
+                total_duty_time=duty,
+                total_rest_time=0,
+                available_drive_time=0,
+                available_duty_time=0,
+            )
+        refresh_hos(user.user_id)
+        status_row = DriverStatus.objects.get(user_id=user.user_id)
+        # The 8-day cycle takes in today and the 7 days before it
+        self.assertEqual(
+            (status_row.hos_date, status_row.drive_hours_today, status_row.duty_hours_today, status_row.cycle_remaining),
+            (today, 6, 8, 52),
+        )
+
+        # A refresh for an earlier day doesn't replace today's figures
+        refresh_hos(user.user_id, today=today - timedelta(days=1))
+        status_row.refresh_from_db()
+        self.assertEqual((status_row.hos_date, status_row.duty_hours_today), (today, 8))
+
+    def test_fleet_board_filters(self):
+        chicago = (Decimal("41.8781136"), Decimal("-87.6297982"))
+        for user, status_value, position in (
+            (self.users[0], "Driving", chicago),
+            (self.users[1], "Off Duty", chicago),
+            (self.users[2], "Driving", (Decimal("39.1031182"), Decimal("-84.5120196"))),
+        ):
+            record_logs(user.user_id, [DriverLog(trip=self.trip, user=user, log_time=self.start, status=status_value)])
+            record_position(user.user_id, self.trip.trip_id, *position, self.start)
+        client = APIClient()
+
+        def board(query):
+            response = client.get(f"/api/fleet/status/{query}")
+            self.assertEqual(response.status_code, 200)
+            return [driver["user_id"] for driver in response.json()["drivers"]]
+
+        ids = [user.user_id for user in self.users]
+        self.assertEqual(board(""), ids)
+        self.assertEqual(board("?status=Driving"), [ids[0], ids[2]])
+        self.assertEqual(board("?status=Driving,Off%20Duty&region=dp3"), ids[:2])
+        self.assertEqual(board(f"?region={encode_geohash(39.1031182, -84.5120196, 3)}"), [ids[2]])
+        self.assertEqual(board("?status=Resting"), [])
+        # Hours from an earlier day read as none today
+        self.assertEqual(client.get("/api/fleet/status/").json()["drivers"][0]["duty_hours_today"], 0)
+
+        self.assertEqual(client.get("/api/fleet/status/?status=Napping").status_code, 400)
+        self.assertEqual(client.get("/api/fleet/status/?region=dp3a").status_code, 400)
+
+
+class LogDateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = spotter_users.objects.create(
+            username="driver", email="driver@example.com", terminal_timezone="America/Chicago"
+        )
+        cls.trip = make_trip(cls.user, datetime(2026, 10, 31, 6, tzinfo=dt_timezone.utc))
+
+    def _log_date(self, log_time):
+        return DriverLog.objects.create(
+            trip=self.trip, user=self.user, log_time=log_time, status="Driving", description="Driving"
+        ).log_date
+
+    def test_terminal_midnight_across_dst(self):
+        cases = [
+            # CDT (UTC-5) until 2am on November 1st
+            (datetime(2026, 11, 1, 4, 59, tzinfo=dt_timezone.utc), date(2026, 10, 31)),
+            (datetime(2026, 11, 1, 5, 0, tzinfo=dt_timezone.utc), date(2026, 11, 1)),
+            # then CST (UTC-6): 5:30 UTC is still the evening before
+            (datetime(2026, 11, 2, 5, 30, tzinfo=dt_timezone.utc), date(2026, 11, 1)),
+            (datetime(2026, 11, 2, 6, 0, tzinfo=dt_timezone.utc), date(2026, 11, 2)),
+            # and back to CDT on March 8th
+            (datetime(2026, 3, 8, 5, 30, tzinfo=dt_timezone.utc), date(2026, 3, 7)),
+            (datetime(2026, 3, 9, 5, 30, tzinfo=dt_timezone.utc), date(2026, 3, 9)),
+        ]
+        for log_time, expected in cases:
+            with self.subTest(log_time=log_time):
+                self.assertEqual(self._log_date(log_time), expected)
+
+    def test_follows_log_time_updates(self):
+        log = DriverLog.objects.create(
+            trip=self.trip,
+            user=self.user,
+            log_time=datetime(2026, 9, 1, 12, tzinfo=dt_timezone.utc),
+            status="Driving",
+            description="Driving",
+        )
+        log.log_time = datetime(2026, 9, 2, 3, tzinfo=dt_timezone.utc)
+        log.save(update_fields=["log_time"])
+        log.refresh_from_db()
+        self.assertEqual(log.log_date, date(2026, 9, 1))
+
+        response = APIClient().get(f"/api/user/{self.user.user_id}/logs/?date=2026-09-01")
+        self.assertEqual([row["log_id"] for row in response.json()], [log.log_id])
+
+    def test_unknown_zone_falls_back_to_utc(self):
+        moment = datetime(2026, 9, 2, 3, tzinfo=dt_timezone.utc)
+        self.assertEqual(terminal_date(moment, "Mars/Olympus_Mons"), date(2026, 9, 2))
+        self.assertEqual(terminal_date(moment, None), date(2026, 9, 2))
+        self.assertEqual(terminal_date(moment, "Asia/Kolkata"), date(2026, 9, 2))
+        self.assertEqual(terminal_date(moment, "America/Los_Angeles"), date(2026, 9, 1))
+
+
+class CompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = spotter_users.objects.create(username="driver", email="driver@example.com")
+        # Finished, so its detail payload is precompressed
+        cls.trip = make_trip(cls.user, datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc))
+
+    def test_negotiation(self):
+        cases = [
+            ("", None),
+            ("identity", None),
+            ("gzip", "gzip"),
+            ("GZIP, deflate", "gzip"),
+            ("gzip;q=0.5, br", "br"),
+            ("br;q=0.2, gzip;q=0.8", "gzip"),
+            ("gzip, br", "br"),
+            ("*;q=0.1", "br"),
+            ("*, br;q=0", "gzip"),
+            ("gzip;q=0, br;q=0", None),
+            ("gzip;q=abc", None),
+        ]
+        with mock.patch.object(compression, "available_encodings", return_value=("br", "gzip")):
+            for header, expected in cases:
+                with self.subTest(header=header):
+                    self.assertEqual(compression.negotiate_encoding(header), expected)
+        with mock.patch.object(compression, "available_encodings", return_value=("gzip",)):
+            self.assertEqual(compression.negotiate_encoding("br, gzip;q=0.1"), "gzip")
+
+    def test_min_size_threshold(self):
+        client = APIClient()
+        path = f"/api/user/{self.user.user_id}/trips/"
+        body = client.get(path).content
+
+        with override_settings(COMPRESS_MIN_BYTES=len(body) + 1):
+            response = client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        with override_settings(COMPRESS_MIN_BYTES=len(body)):
+            response = client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), body)
+
+    @override_settings(COMPRESS_MIN_BYTES=100)
+    def test_finished_trip_variants(self):
+        client = APIClient()
+        path = f"/api/trip/{self.trip.trip_id}/"
+        body = client.get(path).content
+        self.assertEqual(json.loads(body)["trip_id"], self.trip.trip_id)
+
+        with mock.patch.object(compression, "compress", wraps=compression.compress) as compress:
+            response = client.get(path, HTTP_ACCEPT_ENCODING="gzip;q=1, identity;q=0.5")
+            compress.assert_not_called()
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        # A write for the driver builds the variants again
+        DriverLog.objects.create(
+            trip=self.trip,
+            user=self.user,
+            log_time=datetime(2026, 9, 1, 7, tzinfo=dt_timezone.utc),
+            status="Driving",
+            description="Driving",
+        )
+        with mock.patch.object(compression, "compress", wraps=compression.compress) as compress:
+            response = client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(compress.call_count, len(compression.available_encodings()))
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))["logs"]), 1)
+
+        with override_settings(COMPRESS_MIN_BYTES=len(body) * 10):
+            response = client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+def haversine_miles(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 3958.8 * math.asin(math.sqrt(a))
+
+
+@override_settings(SHARDS=["default"])
+# The nearby views are replica-safe; keep them on the primary, which has the rows
+@mock.patch.object(routers, "replica_configured", mock.Mock(return_value=False))
+class ProximityTests(TestCase):
+    # Scattered around Chicago, plus a cluster either side of the antimeridian
+    areas = [(41.88, -87.63, 3.0), (60.0, 179.8, 0.5), (60.0, -179.8, 0.5)]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(1)
+        cls.points = [
+            (round(lat + rng.uniform(-spread, spread), 7), round(lng + rng.uniform(-spread, spread), 7))
+            for lat, lng, spread in cls.areas
+            for _ in range(60)
+        ]
+        # Longitudes past 180 wrap around
+        cls.points = [(lat, lng - 360 if lng > 180 else lng + 360 if lng < -180 else lng) for lat, lng in cls.points]
+
+        cls.users = []
+        start = datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc)
+        owner = spotter_users.objects.create(username="owner", email="owner@example.com")
+        trip = make_trip(owner, start)
+        cls.stops = {}
+        cls.drivers = {}
+        for n, (lat, lng) in enumerate(cls.points):
+            stop = Stop.objects.create(
+                trip=trip,
+                user=owner,
+                stop_time=start + timedelta(hours=n),
+                stop_name=f"Stop {n}",
+                latitude=Decimal(str(lat)),
+                longitude=Decimal(str(lng)),
+                stop_type=("Rest", "Refueling")[n % 2],
+            )
+            cls.stops[stop.stop_id] = (lat, lng, stop.stop_type)
+            if n % 3 == 0:
+                driver = spotter_users.objects.create(username=f"driver{n}", email=f"driver{n}@example.com")
+                record_position(driver.user_id, trip.trip_id, Decimal(str(lat)), Decimal(str(lng)), start)
+                cls.drivers[driver.user_id] = (lat, lng)
+
+    def _brute_force(self, points, lat, lng, radius=None, bbox=None):
+        matches = []
+        for key, (point_lat, point_lng, *_) in points.items():
+            if radius is not None:
+                distance = haversine_miles(lat, lng, point_lat, point_lng)
+                if distance <= radius:
+                    matches.append((distance, key))
+            else:
+                min_lat, min_lng, max_lat, max_lng = bbox
+                span = (max_lng - min_lng) % 360
+                if min_lat <= point_lat <= max_lat and (point_lng - min_lng) % 360 <= span:
+                    matches.append((haversine_miles(lat, lng, point_lat, point_lng), key))
+        return [key for _, key in sorted(matches)]
+
+    def _query(self, path, query, key):
+        response = APIClient().get(f"{path}?{query}&limit=1000")
+        self.assertEqual(response.status_code, 200, response.content[:200])
+        rows = response.json()[key]
+        return [row["stop_id" if key == "stops" else "user_id"] for row in rows], rows
+
+    def test_radius(self):
+        for lat, lng, radius in ((41.88, -87.63, 25), (42.5, -88.0, 120), (41.88, -87.63, 500), (60.0, 179.95, 30), (60.0, -179.99, 15)):
+            with self.subTest(lat=lat, lng=lng, radius=radius):
+                query = f"lat={lat}&lng={lng}&radius={radius}"
+                ids, rows = self._query("/api/stops/nearby/", query, "stops")
+                self.assertEqual(ids, self._brute_force(self.stops, lat, lng, radius=radius))
+                for stop_id, row in zip(ids, rows):
+                    expected = haversine_miles(lat, lng, *self.stops[stop_id][:2])
+                    self.assertAlmostEqual(row["distance_miles"], expected, delta=0.01)
+
+                ids, _ = self._query("/api/fleet/nearby/", query, "drivers")
+                self.assertEqual(ids, self._brute_force(self.drivers, lat, lng, radius=radius))
+
+    def test_bbox(self):
+        for bbox in ((40.0, -89.0, 42.5, -86.5), (41.0, -88.0, 41.2, -87.9), (59.7, 179.5, 60.3, -179.6)):
+            with self.subTest(bbox=bbox):
+                min_lat, min_lng, max_lat, max_lng = bbox
+                center_lng = min_lng + ((max_lng - min_lng) % 360) / 2
+                center = ((min_lat + max_lat) / 2, center_lng)
+                query = "bbox=" + ",".join(str(value) for value in bbox)
+                ids, _ = self._query("/api/stops/nearby/", query, "stops")
+                expected = self._brute_force(self.stops, *center, bbox=bbox)
+                self.assertEqual(ids, expected)
+                ids, _ = self._query("/api/fleet/nearby/", query, "drivers")
+                self.assertEqual(ids, self._brute_force(self.drivers, *center, bbox=bbox))
+
+    def test_antimeridian_results_span_both_sides(self):
+        ids, _ = self._query("/api/stops/nearby/", "bbox=59.5,179.0,60.5,-179.0", "stops")
+        longitudes = {self.stops[stop_id][1] > 0 for stop_id in ids}
+        self.assertEqual(longitudes, {True, False})
+        self.assertEqual(len(ids), 120)
+
+    def test_stop_type_filter_and_bad_areas(self):
+        ids, _ = self._query("/api/stops/nearby/", "lat=41.88&lng=-87.63&radius=100&stop_type=Rest", "stops")
+        expected = [
+            stop_id
+            for stop_id in self._brute_force(self.stops, 41.88, -87.63, radius=100)
+            if self.stops[stop_id][2] == "Rest"
+        ]
+        self.assertEqual(ids, expected)
+
+        client = APIClient()
+        for query in ("lat=41.88", "lat=91&lng=0", "lat=41.88&lng=-87.63&radius=0", "bbox=1,2,3", "bbox=10,0,5,1"):
+            with self.subTest(query=query):
+                self.assertEqual(client.get(f"/api/stops/nearby/?{query}").status_code, 400)
+
+
+class ArchiveTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(ARCHIVE_DIR=directory.name, SHARDS=["default", "shard1"])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _log(self, log_id, day, **values):
+        log_time = datetime(2024, 3, day, 14, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        return {
+            "log_id": log_id,
+            "trip_id": 7,
+            "user_id": 3,
+            "log_time": log_time,
+            "log_date": log_time.date(),
+            "status": "Driving",
+            "description": "Leaving Zürich depot",
+            "latitude": Decimal("41.8781136"),
+            "longitude": Decimal("-87.6297982"),
+            "miles_remaining": Decimal("120.50"),
+            "geohash": "dp3wjztvt",
+            "created_at": log_time,
+            **values,
+        }
+
+    def _read_month(self, month, using="default"):
+        columns = archive.load_month(DriverLog, month, using)
+        index = np.arange(len(columns["log_id"]))
+        fields = [field.attname for field in DriverLog._meta.concrete_fields]
+        values = [archive._decode(field, columns, index) for field in DriverLog._meta.concrete_fields]
+        return [dict(zip(fields, row)) for row in zip(*values)]
+
+    def test_round_trip(self):
+        month = date(2024, 3, 1)
+        rows = [
+            self._log(2, 5),
+            self._log(1, 4, description="", latitude=None, longitude=None, geohash=None, log_date=None),
+        ]
+        self.assertEqual(archive.write_month(DriverLog, month, rows), 2)
+        self.assertTrue(archive.month_path(DriverLog, month).endswith("driver_logs/2024-03.npz"))
+        self.assertEqual(archive.archived_months(DriverLog), [month])
+        self.assertEqual(self._read_month(month), sorted(rows, key=lambda row: row["log_id"]))
+
+    def test_rewrite_merges_with_the_archived_month(self):
+        month = date(2024, 3, 1)
+        archive.write_month(DriverLog, month, [self._log(1, 4), self._log(2, 5)])
+        # Loaded once, so the rewrite below must not be served from the cache
+        archive.load_month(DriverLog, month)
+        self.assertEqual(
+            archive.write_month(DriverLog, month, [self._log(2, 5, status="Resting"), self._log(3, 6)]),
+            3,
+        )
+        self.assertEqual(
+            [(row["log_id"], row["status"]) for row in self._read_month(month)],
+            [(1, "Driving"), (2, "Resting"), (3, "Driving")],
+        )
+
+    def test_read_archived_searches_every_shard(self):
+        archive.write_month(DriverLog, date(2024, 3, 1), [self._log(1, 4), self._log(2, 20)])
+        archive.write_month(DriverLog, date(2024, 3, 1), [self._log(1, 10)], using="shard1")
+        archive.write_month(DriverLog, date(2024, 4, 1), [self._log(5, 1, user_id=4)])
+        self.assertEqual(archive.archived_months(DriverLog, "shard1"), [date(2024, 3, 1)])
+
+        logs = archive.read_archived(DriverLog, 3, date(2024, 3, 1), date(2024, 3, 15))
+        self.assertEqual(sorted((log.log_id, log.log_date.day) for log in logs), [(1, 4), (1, 10)])
+        self.assertIsNone(archive.load_month(DriverLog, date(2024, 5, 1)))
+
+
+class JsonArrayStreamTests(SimpleTestCase):
+    def _items(self, body, max_bytes=10_000, max_items=100, chunk_size=64 * 1024):
+        stream = io.BytesIO(body.encode("utf-8") if isinstance(body, str) else body)
+        return list(iter_json_array(stream, max_bytes, max_items, chunk_size))
+
+    def _rejected(self, body, **limits):
+        with self.assertRaises(PayloadRejected) as raised:
+            self._items(body, **limits)
+        return raised.exception
+
+    def test_elements_split_across_chunks(self):
+        body = ' [ 2.5, 10, "é→ü", {"a": [1, 2]}, true, null, -0.125e2 ] '
+        expected = [2.5, 10, "é→ü", {"a": [1, 2]}, True, None, -12.5]
+        # Every chunk size cuts numbers, literals and multibyte characters somewhere
+        for chunk_size in (1, 2, 3, 5, 64 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self._items(body, chunk_size=chunk_size), expected)
+
+    def test_empty_array(self):
+        self.assertEqual(self._items("[]", chunk_size=1), [])
+        self.assertEqual(self._items(" [ ] \n"), [])
+
+    def test_limits(self):
+        self.assertEqual(self._items("[1, 2, 3]", max_items=3), [1, 2, 3])
+        error = self._rejected("[1, 2, 3, 4]", max_items=3, chunk_size=1)
+        self.assertEqual(error.status_code, 413)
+
+        self.assertEqual(self._items("[1, 2]", max_bytes=6), [1, 2])
+        error = self._rejected("[1, 2] ", max_bytes=6, chunk_size=2)
+        self.assertEqual(error.status_code, 413)
+
+    def test_stops_reading_at_the_item_limit(self):
+        stream = io.BytesIO(b"[" + b",".join(b"1" for _ in range(1000)) + b"]")
+        items = iter_json_array(stream, 10_000, 5, chunk_size=4)
+        with self.assertRaises(PayloadRejected):
+            list(items)
+        self.assertLess(stream.tell(), 20)
+
+    def test_malformed(self):
+        for body in ("", "{}", "[1 2]", "[1,]", "[,1]", "[1, 2", '["abc', "[1] 2", "[tru]", b"[\"\xff\"]"):
+            with self.subTest(body=body):
+                for chunk_size in (1, 64 * 1024):
+                    self.assertEqual(self._rejected(body, chunk_size=chunk_size).status_code, 400)
+
+
+class ShardPlacementTests(SimpleTestCase):
+    keys = [f"user:{n}" for n in range(4000)]
+
+    def test_keys_spread_evenly(self):
+        nodes = ["default", "shard1", "shard2", "shard3"]
+        hash_ring = HashRing(nodes, 128)
+        placed = [hash_ring.node_for(key) for key in self.keys]
+        for node in nodes:
+            self.assertAlmostEqual(placed.count(node) / len(self.keys), 0.25, delta=0.05)
+
+    def test_adding_a_shard_only_moves_keys_onto_it(self):
+        before = HashRing(["default", "shard1", "shard2"], 128)
+        after = HashRing(["default", "shard1", "shard2", "shard3"], 128)
+        moved = 0
+        for key in self.keys:
+            old, new = before.node_for(key), after.node_for(key)
+            if old != new:
+                self.assertEqual(new, "shard3")
+                moved += 1
+        self.assertAlmostEqual(moved / len(self.keys), 0.25, delta=0.05)
+
+    def test_placement_is_stable_and_order_independent(self):
+        ring_a = HashRing(["default", "shard1", "shard2"], 16)
+        ring_b = HashRing(["shard2", "default", "shard1"], 16)
+        self.assertEqual(
+            [ring_a.node_for(key) for key in self.keys[:200]],
+            [ring_b.node_for(key) for key in self.keys[:200]],
+        )
+
+    def test_fleet_drivers_share_a_shard(self):
+        fleet = Fleet(fleet_id=9, name="Northwind")
+        drivers = [spotter_users(user_id=n, fleet=fleet) for n in range(1, 50)]
+        loner = spotter_users(user_id=7)
+        self.assertEqual(placement_key(drivers[0]), "fleet:9")
+        self.assertEqual(placement_key(loner), "user:7")
+        with override_settings(SHARDS=["default", "shard1", "shard2"]):
+            self.assertEqual(len({target_shard(driver) for driver in drivers}), 1)
+
+    def test_ring_follows_settings(self):
+        with override_settings(SHARDS=["default"]):
+            self.assertIs(ring(), ring())
+            self.assertEqual(target_shard(spotter_users(user_id=1)), "default")
+            user = spotter_users(user_id=1)
+            assign_shard(user)
+            self.assertIsNone(user.shard)
+        with override_settings(SHARDS=["default", "shard1"], SHARD_RING_POINTS=32):
+            self.assertEqual(len(ring().hashes), 64)
+            user = spotter_users(user_id=1)
+            assign_shard(user)
+            self.assertEqual(user.shard, target_shard(user))
+            self.assertEqual(current_shard(spotter_users(user_id=2)), "default")
+
+
+@skipUnless(columnar.available(), "msgpack is not installed")
+class ColumnarFormatTests(SimpleTestCase):
+    def _row(self, log_id, minute, **values):
+        log_time = datetime(2024, 3, 4, 14, minute, 5, 250000, tzinfo=dt_timezone.utc)
+        return {
+            "log_id": log_id,
+            "trip": 7,
+            "user": 3,
+            "log_time": log_time,
+            "log_date": log_time.date(),
+            "status": "Driving",
+            "description": "En route",
+            "latitude": Decimal("41.8781136"),
+            "longitude": Decimal("-87.6297982"),
+            "miles_remaining": Decimal("120.50"),
+            "geohash": "dp3wjztvt",
+            "created_at": log_time,
+            **values,
+        }
+
+    def _round_trip(self, rows, max_items=100):
+        body = msgpack.packb(columnar.encode_rows(rows), use_bin_type=True)
+        return columnar.decode_rows(body, max_items, accepted=tuple(columnar.LOG_COLUMNS))
+
+    def test_round_trip_with_nulls(self):
+        rows = [
+            self._row(10, 0, latitude=None, longitude=None, geohash=None, log_date=None),
+            self._row(11, 1, status="Resting", miles_remaining=Decimal("0.00")),
+            self._row(15, 3, latitude=Decimal("-41.0000001"), description="Fuel stop, Gary IN"),
+            self._row(16, 4, log_time=None, miles_remaining=None, geohash=None),
+        ]
+        self.assertEqual(self._round_trip(rows), rows)
+
+    def test_serialized_values(self):
+        row = self._row(1, 0)
+        serialized = {
+            **row,
+            "log_time": row["log_time"].isoformat(),
+            "log_date": row["log_date"].isoformat(),
+            "latitude": str(row["latitude"]),
+        }
+        self.assertEqual(self._round_trip([serialized]), [row])
+
+    def test_columns_use_the_narrowest_type(self):
+        columns = columnar.encode_rows([self._row(n, 0) for n in range(1000, 1100)])["columns"]
+        # Consecutive ids are a base plus one-byte deltas
+        self.assertEqual(columns["log_id"][:3], ["delta", 1000, "i1"])
+        self.assertEqual(len(columns["log_id"][3]), 100)
+        self.assertEqual(columns["status"][:2], ["dict", ["Driving"]])
+        self.assertEqual(columns["latitude"][:3], ["fixed", 7, "i4"])
+        self.assertEqual(len(columns["latitude"]), 4)
+
+    def test_empty(self):
+        self.assertEqual(self._round_trip([]), [])
+
+    def test_limits_and_malformed_tables(self):
+        body = msgpack.packb(columnar.encode_rows([self._row(n, 0) for n in range(5)]), use_bin_type=True)
+        with self.assertRaises(PayloadRejected) as raised:
+            columnar.decode_rows(body, 4)
+        self.assertEqual(raised.exception.status_code, 413)
+
+        table = columnar.encode_rows([self._row(1, 0), self._row(2, 1)])
+        bad_tables = [
+            {**table, "v": 2},
+            {**table, "n": 3},
+            {**table, "columns": {**table["columns"], "status": ["dict", ["Driving"], "i1", b"\x05\x00"]}},
+            {**table, "columns": {**table["columns"], "latitude": ["delta", 0, "i1", b"\x00\x00"]}},
+            {**table, "columns": {**table["columns"], "latitude": ["fixed", 7, "i1", b"\x00\x00", b""]}},
+        ]
+        for bad in bad_tables:
+            with self.subTest(bad=bad), self.assertRaises(PayloadRejected) as raised:
+                columnar.decode_rows(msgpack.packb(bad, use_bin_type=True), 100)
+            self.assertEqual(raised.exception.status_code, 400)
+        with self.assertRaises(PayloadRejected):
+            columnar.decode_rows(b"\xc1", 100)
+
+
+@override_settings(PLAN_START_BUCKET_MINUTES=15)
+class PlanCacheTests(SimpleTestCase):
+    start = (40.0, -100.0)
+    stops = [{"lat": 40.0, "lng": -100.0 + offset} for offset in (3, 1, 2)]
+    monday = datetime(2024, 3, 4, 8, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        cache.clear()
+        plan_cache._plans.clear()
+        patcher = mock.patch.object(plan_cache, "sequence_stops", wraps=sequence_stops)
+        self.search = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _plan(self, stops=None, start_time=None, cycle_used=0):
+        return plan_cache.cached_sequence(
+            self.start, stops or self.stops, cycle_used, start_time or self.monday
+        )
+
+    def test_hit_replays_the_cached_order(self):
+        first = self._plan()
+        second = self._plan()
+        self.assertEqual(self.search.call_count, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(first["order"], [1, 2, 0])
+
+    def test_without_windows_the_start_time_does_not_matter(self):
+        self._plan()
+        self._plan(start_time=self.monday + timedelta(days=3, hours=5))
+        self.assertEqual(self.search.call_count, 1)
+
+    def test_shared_cache_hit_after_the_process_cache_is_gone(self):
+        self._plan()
+        plan_cache._plans.clear()
+        self._plan()
+        self.assertEqual(self.search.call_count, 1)
+        self.assertEqual(len(plan_cache._plans), 1)
+
+    def test_changed_route_misses(self):
+        self._plan()
+        # Moved by less than the key's rounding: the same route
+        self._plan(stops=[{**self.stops[0], "lat": 40.000001}, *self.stops[1:]])
+        self.assertEqual(self.search.call_count, 1)
+
+        self._plan(stops=[{**self.stops[0], "lat": 40.01}, *self.stops[1:]])
+        self._plan(stops=[*self.stops[:2], {**self.stops[2], "service_hours": 1}])
+        self._plan(cycle_used=20)
+        self.assertEqual(self.search.call_count, 4)
+
+    def test_windows_key_on_the_start_bucket(self):
+        stops = [{**self.stops[0], "window_end": 10}, *self.stops[1:]]
+        self._plan(stops=stops)
+        # Later in the same 15-minute bucket, with the window moved to match
+        same_bucket = self.monday + timedelta(minutes=6)
+        self._plan(stops=[{**stops[0], "window_end": 9.9}, *stops[1:]], start_time=same_bucket)
+        self.assertEqual(self.search.call_count, 1)
+
+        self._plan(stops=stops, start_time=same_bucket)
+        self.assertEqual(self.search.call_count, 2)
+        self._plan(stops=stops, start_time=self.monday + timedelta(minutes=15))
+        self.assertEqual(self.search.call_count, 3)
+
+
+class UserVersionTests(SimpleTestCase):
+    def test_evicted_counter_does_not_reuse_versions(self):
+        cache.clear()
+        seen = {get_user_version(1)}
+        seen.add(bump_user_version(1))
+        seen.add(bump_user_version(1))
+
+        for evict in range(2):
+            cache.delete("user-version:1")
+            version = bump_user_version(1) if evict else get_user_version(1)
+            self.assertNotIn(version, seen)
+            self.assertGreater(version, max(seen))
+            seen.add(version)
+
+
+class BatchedInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = spotter_users.objects.create(username="driver", email="driver@example.com")
+        cls.trip = make_trip(cls.user, datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        bump = mock.patch.object(cache_module, "bump_user_version", wraps=bump_user_version)
+        pin = mock.patch.object(cache_module, "pin_to_primary", wraps=routers.pin_to_primary)
+        self.bump, self.pin = bump.start(), pin.start()
+        self.addCleanup(bump.stop)
+        self.addCleanup(pin.stop)
+
+    def test_single_save_invalidates_at_once(self):
+        self.trip.save()
+        self.bump.assert_called_once_with(self.user.user_id)
+        self.pin.assert_called_once_with(user_id=self.user.user_id, trip_id=self.trip.trip_id)
+
+    def test_bulk_upload_invalidates_once_on_commit(self):
+        logs = [
+            {"log_time": f"2026-09-01T{hour:02}:00:00Z", "status": "Driving", "description": "Driving for 60 minutes"}
+            for hour in range(6, 16)
+        ]
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = APIClient().post(f"/api/trip/{self.trip.trip_id}/logs/", logs, format="json")
+            self.assertEqual(response.status_code, 201)
+            self.bump.assert_not_called()
+        for callback in callbacks:
+            callback()
+        # Ten logs and a day summary
+        self.bump.assert_called_once_with(self.user.user_id)
+        self.pin.assert_called_once_with(user_id=self.user.user_id, trip_id=self.trip.trip_id)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = spotter_users.objects.create(
+            username="driver", email="driver@example.com", terminal_timezone="America/Chicago"
+        )
+
+    def test_saving_a_user_evicts_their_cached_row(self):
+        auth = CachedJWTAuthentication()
+        token = auth.get_validated_token(str(RefreshToken.for_user(self.user).access_token))
+        self.assertEqual(auth.get_user(token).terminal_timezone, "America/Chicago")
+
+        self.user.terminal_timezone = "America/Denver"
+        self.user.save()
+        self.assertEqual(auth.get_user(token).terminal_timezone, "America/Denver")
+
+    def test_last_seen_flush_at_exit(self):
+        recorder = LastSeenRecorder(interval=3600)
+        seen = datetime(2026, 9, 1, 6, tzinfo=dt_timezone.utc)
+        recorder.record(self.user.user_id, seen)
+        recorder.flush_at_exit()
+        self.assertEqual(spotter_users.objects.get(pk=self.user.pk).updated_at, seen)
+
+        # Not into a database other than the one the login happened on
+        recorder.record(self.user.user_id, seen + timedelta(hours=1))
+        recorder.database = "torn-down-test-database"
+        recorder.flush_at_exit()
+        self.assertEqual(spotter_users.objects.get(pk=self.user.pk).updated_at, seen)
+        recorder.pending.clear()
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = spotter_users.objects.create(
+            username="driver", email="driver@example.com", terminal_timezone="America/Chicago"
+        )
+        DailyHOSSummary.objects.create(
+            user=cls.user,
+            log_date=date(2026, 9, 1),
+            total_drive_time=6,
+            total_duty_time=7,
+            total_rest_time=1,
+            available_drive_time=5,
+            available_duty_time=7,
+        )
+
+    async def test_async_views_answer_like_sync_views(self):
+        sync_client, async_client = APIClient(), AsyncClient()
+        for endpoint in ("trips", "logs", "hos"):
+            for query in ("", "?date=2026-09-01", "?start_date=2026-09-01&end_date=2026-09-02", "?date=09/01"):
+                with self.subTest(endpoint=endpoint, query=query):
+                    path = f"/api/user/{self.user.user_id}/{endpoint}/{query}"
+                    expected = await sync_to_async(sync_client.get)(path)
+                    response = await async_client.get(path.replace("/api/", "/api/async/", 1))
+                    self.assertEqual(response.status_code, expected.status_code)
+                    self.assertEqual(response.json(), expected.json())
+
+    async def test_async_views_authenticate_like_sync_views(self):
+        headers = {"Authorization": "Bearer not-a-token"}
+        path = f"/api/user/{self.user.user_id}/logs/"
+        expected = await sync_to_async(APIClient().get)(path, headers=headers)
+        response = await AsyncClient().get(path.replace("/api/", "/api/async/", 1), headers=headers)
+        self.assertEqual(expected.status_code, 401)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response["WWW-Authenticate"], expected["WWW-Authenticate"])
+
+        token = str(RefreshToken.for_user(self.user).access_token)
+        response = await AsyncClient().get(
+            path.replace("/api/", "/api/async/", 1), headers={"Authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class WebSocketTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleets = [Fleet.objects.create(name=name) for name in ("north", "south")]
+        cls.dispatcher, cls.mate, cls.outsider, cls.loner = [
+            spotter_users.objects.create(
+                username=name, email=f"{name}@example.com", fleet=fleet,
+                terminal_timezone="America/Chicago",
+            )
+            for name, fleet in (
+                ("dispatcher", cls.fleets[0]),
+                ("mate", cls.fleets[0]),
+                ("outsider", cls.fleets[1]),
+                ("loner", None),
+            )
+        ]
+
+    def _token(self, user):
+        return str(RefreshToken.for_user(user).access_token)
+
+    async def _connect(self, path, token=None, query=b""):
+        inbox, sent = asyncio.Queue(), []
+        await inbox.put({"type": "websocket.connect"})
+
+        async def send(message):
+            sent.append(message)
+
+        headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+        scope = {"type": "websocket", "path": path, "query_string": query, "headers": headers}
+        task = asyncio.ensure_future(websocket_application(scope, inbox.get, send))
+        for _ in range(200):
+            if sent or task.done():
+                break
+            await asyncio.sleep(0.01)
+        return task, inbox, sent
+
+    async def _close(self, task, inbox):
+        await inbox.put({"type": "websocket.disconnect"})
+        await task
+
+    async def _handshake(self, path, token=None, query=b""):
+        task, inbox, sent = await self._connect(path, token, query)
+        if not task.done():
+            await self._close(task, inbox)
+        return sent[0]
+
+    async def test_handshake_needs_a_token(self):
+        for path in ("/ws/fleet/", f"/ws/user/{self.mate.user_id}/"):
+            with self.subTest(path=path):
+                self.assertEqual(await self._handshake(path), {"type": "websocket.close", "code": 4401})
+                self.assertEqual(
+                    (await self._handshake(path, "not-a-token"))["code"], 4401
+                )
+
+    async def test_subscriptions_are_scoped_to_the_caller(self):
+        own = await sync_to_async(self._token)(self.mate)
+        dispatcher = await sync_to_async(self._token)(self.dispatcher)
+        loner = await sync_to_async(self._token)(self.loner)
+        accepted = {"type": "websocket.accept"}
+
+        self.assertEqual(await self._handshake(f"/ws/user/{self.mate.user_id}/", own), accepted)
+        self.assertEqual(
+            await self._handshake(f"/ws/user/{self.mate.user_id}/", query=f"token={own}".encode()),
+            accepted,
+        )
+        self.assertEqual(await self._handshake(f"/ws/user/{self.mate.user_id}/", dispatcher), accepted)
+        self.assertEqual((await self._handshake(f"/ws/user/{self.outsider.user_id}/", dispatcher))["code"], 4403)
+        self.assertEqual((await self._handshake(f"/ws/user/{self.dispatcher.user_id}/", loner))["code"], 4403)
+        self.assertEqual((await self._handshake("/ws/fleet/", loner))["code"], 4403)
+
+    async def test_fleet_feed_carries_only_the_callers_fleet(self):
+        token = await sync_to_async(self._token)(self.dispatcher)
+        task, inbox, sent = await self._connect("/ws/fleet/", token)
+        self.assertEqual(sent, [{"type": "websocket.accept"}])
+
+        for user in (self.outsider, self.mate, self.loner):
+            await sync_to_async(publish)(user.user_id, {"type": "position", "user_id": user.user_id})
+        for _ in range(100):
+            if len(sent) > 1:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        await self._close(task, inbox)
+
+        received = [json.loads(message["text"])["user_id"] for message in sent[1:]]
+        self.assertEqual(received, [self.mate.user_id])
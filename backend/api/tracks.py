@@ -0,0 +1,87 @@
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8
+
+# Ground resolution of a 256px web-mercator tile at zoom 0, in meters/pixel
+METERS_PER_PIXEL_Z0 = 156543.03
+
+
+def _project(lats, lngs):
+    """Equirectangular projection to meters around the track's mean latitude."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    scale = np.cos(np.radians(lats.mean())) if len(lats) else 1.0
+    x = np.radians(lngs) * EARTH_RADIUS_METERS * scale
+    y = np.radians(lats) * EARTH_RADIUS_METERS
+    return x, y
+
+
+def distance_filter(x, y, min_distance):
+    """Indices of points at least ``min_distance`` meters from the last kept one."""
+    n = len(x)
+    if n <= 2 or min_distance <= 0:
+        return np.arange(n)
+
+    kept = [0]
+    last_x, last_y = x[0], y[0]
+    threshold = min_distance * min_distance
+    for i, (px, py) in enumerate(zip(x[1:-1].tolist(), y[1:-1].tolist()), start=1):
+        if (px - last_x) ** 2 + (py - last_y) ** 2 >= threshold:
+            kept.append(i)
+            last_x, last_y = px, py
+    kept.append(n - 1)
+    return np.asarray(kept)
+
+
+def douglas_peucker(x, y, tolerance):
+    """Indices kept by Douglas-Peucker simplification at ``tolerance`` meters."""
+    n = len(x)
+    if n <= 2:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+
+        dx = x[end] - x[start]
+        dy = y[end] - y[start]
+        px = x[start + 1:end] - x[start]
+        py = y[start + 1:end] - y[start]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(dx * py - dy * px) / length
+
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            index = start + 1 + farthest
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return np.nonzero(keep)[0]
+
+
+def simplify_track(lats, lngs, tolerance, min_distance=0):
+    """
+    Indices of the points to keep from a GPS track.
+
+    Points closer than ``min_distance`` meters to the previous kept point are
+    dropped first (a parked truck pinging in place), then the remaining line
+    is simplified with Douglas-Peucker at ``tolerance`` meters.
+    """
+    x, y = _project(lats, lngs)
+    candidates = distance_filter(x, y, min_distance)
+    kept = douglas_peucker(x[candidates], y[candidates], tolerance)
+    return candidates[kept]
+
+
+def zoom_tolerance(zoom, latitude):
+    """Meters covered by one screen pixel at a web map zoom level."""
+    return METERS_PER_PIXEL_Z0 * np.cos(np.radians(latitude)) / (2 ** zoom)
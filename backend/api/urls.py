@@ -1,8 +1,11 @@
 from django.urls import path
 from .views import (
     GetUserView, TripListCreateView, TripDetailView, DriverLogCreateBulkView,
-    UserLogsView, UserHOSSummaryView, UpdateHOSView,SignupView,LoginView
+    UserLogsView, UserHOSSummaryView, UpdateHOSView,SignupView,LoginView,
+    RouteSequenceView, LoadAssignmentView, TripBreadcrumbsView, FleetStatusView,
+    NearbyDriversView, NearbyStopsView
 )
+from . import async_views
 from rest_framework_simplejwt.views import TokenRefreshView
 urlpatterns = [
     path('user/<int:user_id>/', GetUserView.as_view(), name='get-user'),
@@ -10,15 +13,28 @@ urlpatterns = [
     # Trip endpoints
     path('user/<int:user_id>/trips/', TripListCreateView.as_view(), name='user-trips'),
     path('trip/<int:trip_id>/', TripDetailView.as_view(), name='trip-detail'),
+    path('user/<int:user_id>/route/sequence/', RouteSequenceView.as_view(), name='route-sequence'),
     
+    # Dispatch endpoints
+    path('assignments/', LoadAssignmentView.as_view(), name='load-assignments'),
+    path('fleet/status/', FleetStatusView.as_view(), name='fleet-status'),
+    path('fleet/nearby/', NearbyDriversView.as_view(), name='fleet-nearby'),
+    path('stops/nearby/', NearbyStopsView.as_view(), name='stops-nearby'),
+
     # Log endpoints
     path('trip/<int:trip_id>/logs/', DriverLogCreateBulkView.as_view(), name='trip-logs-create'),
     path('user/<int:user_id>/logs/', UserLogsView.as_view(), name='user-logs'),
+    path('trip/<int:trip_id>/breadcrumbs/', TripBreadcrumbsView.as_view(), name='trip-breadcrumbs'),
     
     # HOS endpoints
     path('user/<int:user_id>/hos/', UserHOSSummaryView.as_view(), name='user-hos'),
     path('user/<int:user_id>/hos/update/', UpdateHOSView.as_view(), name='update-hos'),
 
+    # Async read endpoints (served under ASGI)
+    path('async/user/<int:user_id>/trips/', async_views.user_trips, name='async-user-trips'),
+    path('async/user/<int:user_id>/logs/', async_views.user_logs, name='async-user-logs'),
+    path('async/user/<int:user_id>/hos/', async_views.user_hos, name='async-user-hos'),
+
     # Auth endpoints
     path('signup/', SignupView.as_view(), name='signup'),
     path('login/', LoginView.as_view(), name='login'),
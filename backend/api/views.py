@@ -8,10 +8,23 @@ from django.contrib.auth.hashers import make_password, check_password
 from django.db import IntegrityError
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.conf import settings
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import spotter_users, Trip, DriverLog, Stop, DailyHOSSummary
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from .models import (
+    spotter_users,
+    Trip,
+    DriverLog,
+    Stop,
+    DailyHOSSummary,
+    GPSBreadcrumb,
+    DriverStatus,
+    Fleet,
+    GEOHASH_PRECISION,
+    terminal_date,
+)
 from .serializers import (
     spotter_usersSerializer,
     TripSerializer,
@@ -20,14 +33,53 @@ from .serializers import (
     TripWithLogsSerializer,
     TripCreateSerializer,
     DriverLogCreateSerializer,
+    WaypointInputSerializer,
+    LoadInputSerializer,
+    StopSerializer,
+)
+from . import queries
+from .admission import (
+    PayloadRejected,
+    check_content_length,
+    heavy_requests,
+    iter_json_array,
+    read_body,
+    too_busy,
+)
+from .archive import with_archived_logs
+from .authentication import last_seen, password_check_slots
+from .assignment import (
+    INFEASIBLE_COST,
+    build_cost_matrix,
+    hours_available,
+    solve_assignment,
+)
+from .cache import batched_user_changes, cache_user_response
+from .columnar import MEDIA_TYPE as COLUMNAR_MEDIA_TYPE, available as columnar_available, decode_rows, log_renderers
+from .compression import precompressed_response, trip_payload_key
+from .driver_status import REGION_PRECISION, record_logs, record_position
+from .hos import refresh_days
+from .proximity import (
+    cell_filter,
+    nearest_per_key,
+    parse_area,
+    parse_limit,
+    positions,
+    within,
 )
+from .plan_cache import cached_sequence
+from .realtime import has_watchers, publish
+from .routing import MAX_CYCLE_HOURS, MAX_DRIVING_HOURS, MAX_DUTY_HOURS
+from .sharding import assign_shard, fan_out
+from .tracks import simplify_track, zoom_tolerance
 import json
 import logging
-import traceback
+import numpy as np
 import re
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
 
 logger = logging.getLogger(__name__)
+payload_logger = logging.getLogger("api.payload")
 
 
 class GetUserView(APIView):
@@ -94,6 +146,26 @@ class SignupView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            # Home terminal timezone decides where HOS days start
+            terminal_timezone = data.get("terminal_timezone") or "UTC"
+            try:
+                ZoneInfo(terminal_timezone)
+            except (ZoneInfoNotFoundError, ValueError):
+                return Response(
+                    {"error": "Invalid terminal_timezone"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Optional carrier; its drivers' data shares a shard
+            fleet_id = data.get("fleet_id")
+            if fleet_id is not None and not (
+                str(fleet_id).isdigit() and Fleet.objects.filter(fleet_id=fleet_id).exists()
+            ):
+                return Response(
+                    {"error": "Fleet not found"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
             # Create new user
             current_time = datetime.now()
             new_user = spotter_users(
@@ -101,9 +173,12 @@ class SignupView(APIView):
                 email=data["email"],
                 password=make_password(data["password"]),  # Hash the password
                 name=data["name"],
+                terminal_timezone=terminal_timezone,
+                fleet_id=fleet_id,
                 created_at=current_time,
                 updated_at=current_time,
             )
+            assign_shard(new_user)
             new_user.save()
 
             # Generate JWT tokens
@@ -171,16 +246,29 @@ class LoginView(APIView):
                     {"error": "Invalid credentials"},
                     status=status.HTTP_401_UNAUTHORIZED,
                 )
-            # Verify password
-            if not check_password(data["password"], user.password):
+            # Verify password, with a bounded number of hashes in flight
+            if not password_check_slots.acquire(
+                timeout=settings.LOGIN_HASH_WAIT_SECONDS
+            ):
+                response = Response(
+                    {"error": "Too many logins in progress, try again shortly"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+                response["Retry-After"] = "1"
+                return response
+            try:
+                valid = check_password(data["password"], user.password)
+            finally:
+                password_check_slots.release()
+            if not valid:
                 return Response(
                     {"error": "Invalid credentials"},
                     status=status.HTTP_401_UNAUTHORIZED,
                 )
 
-            # Update last login time
-            user.updated_at = datetime.now()
-            user.save()
+            # Record the login; written in batches, not a row save per login
+            user.updated_at = timezone.now()
+            last_seen.record(user.user_id, user.updated_at)
 
             # Generate JWT tokens
             refresh = RefreshToken.for_user(user)
@@ -189,18 +277,13 @@ class LoginView(APIView):
                 "access": str(refresh.access_token),
             }
 
-            # Prepare response
-            serializer = spotter_usersSerializer(user)
+            # Prepare response (password is write-only, so it is never included)
             response_data = {
-                "user": serializer.data,
+                "user": spotter_usersSerializer(user).data,
                 "tokens": tokens,
                 "message": "Login successful",
             }
 
-            # Remove password from response
-            if "password" in response_data["user"]:
-                del response_data["user"]["password"]
-
             return Response(response_data, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -212,39 +295,16 @@ class LoginView(APIView):
 
 
 class TripListCreateView(APIView):
+    @cache_user_response
     def get(self, request, user_id):
         try:
             # Verify user exists
             user = spotter_users.objects.get(user_id=user_id)
 
-            # Get query parameters
-            start_date = request.query_params.get("start_date")
-            end_date = request.query_params.get("end_date")
-
-            # Filter trips by date range if provided
-            trips = Trip.objects.filter(user=user).order_by("-start_time")
-
-            if start_date:
-                try:
-                    start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-                    trips = trips.filter(start_time__gte=start_datetime)
-                except ValueError:
-                    return Response(
-                        {"error": "Invalid start_date format. Use YYYY-MM-DD."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-            if end_date:
-                try:
-                    end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
-                    # Add one day to include the end date
-                    end_datetime = end_datetime + timedelta(days=1)
-                    trips = trips.filter(start_time__lt=end_datetime)
-                except ValueError:
-                    return Response(
-                        {"error": "Invalid end_date format. Use YYYY-MM-DD."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
+            try:
+                trips = queries.user_trips(user.user_id, request.query_params)
+            except queries.InvalidQuery as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             serializer = TripSerializer(trips, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -276,9 +336,19 @@ class TripListCreateView(APIView):
 
 
 class TripDetailView(APIView):
+    read_from_replica = True
+
     def get(self, request, trip_id):
         try:
             trip = Trip.objects.get(trip_id=trip_id)
+            if trip.end_time <= timezone.now() and request.accepted_renderer.format == "json":
+                # A finished trip's payload only changes through a write for
+                # its driver, which moves the key on
+                return precompressed_response(
+                    request,
+                    trip_payload_key(trip),
+                    lambda: TripWithLogsSerializer(trip).data,
+                )
             serializer = TripWithLogsSerializer(trip)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Trip.DoesNotExist:
@@ -287,244 +357,915 @@ class TripDetailView(APIView):
             )
 
 
-class DriverLogCreateBulkView(APIView):
-    def post(self, request, trip_id):
+class RouteSequenceView(APIView):
+    MAX_STOPS = 50
+
+    def post(self, request, user_id):
         try:
-            # Log the raw request data for debugging
-            logger.info(
-                f"Raw request data for trip {trip_id}: {request.body.decode('utf-8')}"
+            # Verify user exists
+            spotter_users.objects.get(user_id=user_id)
+        except spotter_users.DoesNotExist:
+            return Response(
+                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-            # Get the trip
-            try:
-                trip = Trip.objects.get(trip_id=trip_id)
-            except Trip.DoesNotExist:
-                logger.error(f"Trip with ID {trip_id} not found")
+        data = request.data
+        current_location = data.get("current_location") or {}
+        try:
+            start = (float(current_location["lat"]), float(current_location["lng"]))
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "current_location with lat and lng is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            cycle_used = float(data.get("current_cycle_used") or 0)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "current_cycle_used must be a number of hours"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        start_time = timezone.now()
+        if data.get("start_time"):
+            start_time = parse_datetime(str(data["start_time"]))
+            if start_time is None:
                 return Response(
-                    {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+                    {"error": "Invalid start_time format. Use ISO 8601."},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
+            if timezone.is_naive(start_time):
+                start_time = timezone.make_aware(start_time)
 
-            # Extract logs data from request
+        serializer = WaypointInputSerializer(data=data.get("stops") or [], many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        waypoints = serializer.validated_data
+        if not waypoints:
+            return Response(
+                {"error": "At least one stop is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(waypoints) > self.MAX_STOPS:
+            return Response(
+                {"error": f"At most {self.MAX_STOPS} stops can be sequenced"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        def hours_from_start(value):
+            if value is None:
+                return None
+            return (value - start_time).total_seconds() / 3600
+
+        # A dropoff must come after the pickup carrying the same load
+        pickups = {
+            waypoint["load_ref"]: i
+            for i, waypoint in enumerate(waypoints)
+            if waypoint["stop_type"] == "Pickup" and waypoint.get("load_ref")
+        }
+        stops = [
+            {
+                "lat": waypoint["latitude"],
+                "lng": waypoint["longitude"],
+                "window_start": hours_from_start(waypoint.get("window_start")),
+                "window_end": hours_from_start(waypoint.get("window_end")),
+                "service_hours": float(waypoint["service_duration"]),
+                "requires": (
+                    pickups.get(waypoint.get("load_ref"))
+                    if waypoint["stop_type"] == "Dropoff"
+                    else None
+                ),
+            }
+            for waypoint in waypoints
+        ]
+
+        result = cached_sequence(start, stops, cycle_used, start_time)
+
+        planned = []
+        for sequence, (i, arrival, departure, _) in enumerate(result["schedule"]):
+            waypoint = waypoints[i]
+            planned.append(
+                {
+                    "sequence": sequence,
+                    "location_name": waypoint["location_name"],
+                    "stop_type": waypoint["stop_type"],
+                    "latitude": str(waypoint["latitude"]),
+                    "longitude": str(waypoint["longitude"]),
+                    "load_ref": waypoint.get("load_ref"),
+                    "window_start": waypoint.get("window_start"),
+                    "window_end": waypoint.get("window_end"),
+                    "service_duration": str(waypoint["service_duration"]),
+                    "planned_arrival": start_time + timedelta(hours=arrival),
+                    "planned_departure": start_time + timedelta(hours=departure),
+                }
+            )
+
+        hos_events = [
+            {
+                "status": event_status,
+                "time": start_time + timedelta(hours=at),
+                "duration": duration,
+            }
+            for event_status, at, duration in result["events"]
+        ]
+
+        return Response(
+            {
+                "waypoints": planned,
+                "hos_events": hos_events,
+                "total_distance": round(result["total_distance"], 2),
+                "total_duration": round(result["total_hours"], 2),
+                "late_hours": round(result["late_hours"], 2),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class LoadAssignmentView(APIView):
+    MAX_LOADS = 5000
+
+    def post(self, request):
+        try:
+            check_content_length(request, settings.BULK_MAX_BYTES)
+        except PayloadRejected as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+        # Solving is CPU-bound; only the global limit applies (no per-driver caller)
+        if not heavy_requests.try_acquire():
+            return too_busy()
+        try:
+            return self._assign(request)
+        finally:
+            heavy_requests.release()
+
+    def _assign(self, request):
+        data = request.data
+
+        serializer = LoadInputSerializer(data=data.get("loads") or [], many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        loads = serializer.validated_data
+        if not loads:
+            return Response(
+                {"error": "At least one load is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(loads) > self.MAX_LOADS:
+            return Response(
+                {"error": f"At most {self.MAX_LOADS} loads can be assigned at once"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        max_deadhead = data.get("max_deadhead_miles")
+        if max_deadhead is not None:
             try:
-                # Try to parse the data - handle both JSON string and direct data
-                if hasattr(request, "data"):
-                    logs_data = request.data
-                else:
-                    logs_data = json.loads(request.body.decode("utf-8"))
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error: {str(e)}")
+                max_deadhead = float(max_deadhead)
+            except (TypeError, ValueError):
+                return Response(
+                    {"error": "max_deadhead_miles must be a number"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        # Position and hours come from the fleet board, which lives with the
+        # drivers rather than on their (possibly several) shards
+        drivers_qs = spotter_users.objects.all()
+        driver_ids = data.get("driver_ids")
+        if driver_ids is not None:
+            if not isinstance(driver_ids, list) or not all(
+                isinstance(user_id, int) and not isinstance(user_id, bool)
+                for user_id in driver_ids
+            ):
                 return Response(
-                    {"error": f"Invalid JSON format: {str(e)}"},
+                    {"error": "driver_ids must be a list of user ids"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+        if driver_ids:
+            drivers_qs = drivers_qs.filter(user_id__in=driver_ids)
+
+        now = timezone.now()
+        today = {}
+        drivers = []
+        for (
+            user_id, username, zone_name, last_lat, last_lng, hos_date, drive, duty, cycle_remaining
+        ) in drivers_qs.order_by("user_id").values_list(
+            "user_id",
+            "username",
+            "terminal_timezone",
+            "driverstatus__latitude",
+            "driverstatus__longitude",
+            "driverstatus__hos_date",
+            "driverstatus__drive_hours_today",
+            "driverstatus__duty_hours_today",
+            "driverstatus__cycle_remaining",
+        ):
+            if zone_name not in today:
+                today[zone_name] = terminal_date(now, zone_name)
+            available_drive = available_duty = None
+            if hos_date == today[zone_name]:
+                available_drive = max(0.0, MAX_DRIVING_HOURS - float(drive))
+                available_duty = max(0.0, MAX_DUTY_HOURS - float(duty))
+            cycle_used = MAX_CYCLE_HOURS - float(cycle_remaining) if cycle_remaining is not None else 0.0
+            drivers.append(
+                {
+                    "user_id": user_id,
+                    "username": username,
+                    "lat": float(last_lat) if last_lat is not None else None,
+                    "lng": float(last_lng) if last_lng is not None else None,
+                    "hours_available": hours_available(
+                        available_drive, available_duty, cycle_used
+                    ),
+                }
+            )
 
-            # Validate it's a list
-            if not isinstance(logs_data, list):
-                logger.error(f"Expected a list of logs, got: {type(logs_data)}")
+        if driver_ids:
+            # Every requested driver must have a row in the cost matrix
+            unknown = sorted(set(driver_ids) - {driver["user_id"] for driver in drivers})
+            if unknown:
                 return Response(
-                    {"error": f"Expected a list of logs, got: {type(logs_data)}"},
+                    {"error": "Unknown driver_ids", "driver_ids": unknown},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+        if not drivers:
+            return Response(
+                {"error": "No drivers available"}, status=status.HTTP_404_NOT_FOUND
+            )
 
-            logger.info(f"Processing {len(logs_data)} logs for trip {trip_id}")
-
-            created_logs = []
-            errors = []
-
-            # Process each log entry
-            for i, log_data in enumerate(logs_data):
-                try:
-                    # Ensure log_data is a dictionary
-                    if not isinstance(log_data, dict):
-                        errors.append(
-                            {
-                                "index": i,
-                                "error": f"Expected a dictionary, got {type(log_data)}",
-                            }
-                        )
-                        continue
-
-                    # Add required fields
-                    log_data["trip"] = trip_id
-                    log_data["user"] = trip.user.user_id
-
-                    # Handle optional fields - ensure they exist with appropriate defaults
-                    if "latitude" not in log_data or log_data["latitude"] is None:
-                        log_data["latitude"] = None
-                    if "longitude" not in log_data or log_data["longitude"] is None:
-                        log_data["longitude"] = None
-                    if (
-                        "miles_remaining" not in log_data
-                        or log_data["miles_remaining"] is None
-                    ):
-                        log_data["miles_remaining"] = None
-
-                    # Log the processed data
-                    logger.info(f"Processing log entry {i}: {log_data}")
-
-                    serializer = DriverLogCreateSerializer(data=log_data)
-                    if serializer.is_valid():
-                        log = serializer.save()
-                        created_logs.append(DriverLogSerializer(log).data)
-                    else:
-                        error_detail = {
-                            "index": i,
-                            "data": log_data,
-                            "errors": serializer.errors,
-                        }
-                        logger.error(f"Validation error for log {i}: {error_detail}")
-                        errors.append(error_detail)
-                except Exception as e:
-                    logger.error(f"Error processing log {i}: {str(e)}")
-                    logger.error(traceback.format_exc())
-                    errors.append({"index": i, "error": str(e)})
-
-            # If we have errors but also created some logs, continue
-            if errors and created_logs:
-                logger.warning(
-                    f"Created {len(created_logs)} logs with {len(errors)} errors"
+        cost, deadhead = build_cost_matrix(drivers, loads, max_deadhead)
+        rows, cols = solve_assignment(cost)
+
+        assignments = []
+        assigned_drivers = set()
+        assigned_loads = set()
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            if cost[row, col] >= INFEASIBLE_COST:
+                continue
+            driver = drivers[row]
+            assigned_drivers.add(row)
+            assigned_loads.add(col)
+            assignments.append(
+                {
+                    "load_ref": loads[col]["load_ref"],
+                    "driver_id": driver["user_id"],
+                    "username": driver["username"],
+                    "deadhead_miles": round(float(deadhead[row, col]), 2),
+                    "hours_available": round(driver["hours_available"], 2),
+                    "cost": round(float(cost[row, col]), 2),
+                }
+            )
+
+        return Response(
+            {
+                "assignments": assignments,
+                "unassigned_loads": [
+                    load["load_ref"]
+                    for i, load in enumerate(loads)
+                    if i not in assigned_loads
+                ],
+                "unassigned_drivers": [
+                    driver["user_id"]
+                    for i, driver in enumerate(drivers)
+                    if i not in assigned_drivers
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class FleetStatusView(APIView):
+    """
+    Dispatcher board: every driver's current status, position and hours.
+
+    Served from the ``driver_status`` table in one indexed scan; filter with
+    ``?status=Driving,Off Duty`` and ``?region=<geohash prefix>``.
+    """
+
+    read_from_replica = True
+
+    def get(self, request):
+        board = DriverStatus.objects.order_by("user_id")
+
+        statuses = request.query_params.get("status")
+        if statuses:
+            statuses = [value.strip() for value in statuses.split(",") if value.strip()]
+            valid = {choice for choice, _ in DriverLog.STATUS_CHOICES}
+            unknown = [value for value in statuses if value not in valid]
+            if unknown:
+                return Response(
+                    {"error": f"Unknown status: {', '.join(unknown)}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            board = board.filter(current_status__in=statuses)
+
+        region = request.query_params.get("region")
+        if region:
+            if not re.fullmatch(r"[0-9b-hjkmnp-z]{1,12}", region):
+                return Response(
+                    {"error": "region must be a geohash prefix"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            board = board.filter(region__startswith=region)
+
+        now = timezone.now()
+        today = {}
+        drivers = []
+        for row in board.values(
+            "user_id",
+            "user__username",
+            "user__name",
+            "user__terminal_timezone",
+            "trip_id",
+            "current_status",
+            "status_since",
+            "latitude",
+            "longitude",
+            "position_at",
+            "region",
+            "hos_date",
+            "drive_hours_today",
+            "duty_hours_today",
+            "cycle_remaining",
+        ):
+            # Hours recorded on an earlier day no longer count for today
+            zone_name = row["user__terminal_timezone"]
+            if zone_name not in today:
+                today[zone_name] = terminal_date(now, zone_name)
+            current = row["hos_date"] == today[zone_name]
+            drivers.append(
+                {
+                    "user_id": row["user_id"],
+                    "username": row["user__username"],
+                    "name": row["user__name"],
+                    "trip_id": row["trip_id"],
+                    "status": row["current_status"],
+                    "status_since": row["status_since"],
+                    "latitude": row["latitude"],
+                    "longitude": row["longitude"],
+                    "position_at": row["position_at"],
+                    "region": row["region"],
+                    "drive_hours_today": row["drive_hours_today"] if current else 0,
+                    "duty_hours_today": row["duty_hours_today"] if current else 0,
+                    "cycle_remaining": row["cycle_remaining"],
+                }
+            )
+
+        return Response(
+            {"count": len(drivers), "drivers": drivers}, status=status.HTTP_200_OK
+        )
+
+
+class NearbyDriversView(APIView):
+    """
+    Drivers within ``?radius=`` miles of ``?lat=&lng=`` (or inside ``?bbox=``),
+    nearest first.
+
+    By default this is current positions from the fleet board. With
+    ``?start=&end=`` (ISO 8601) it is drivers who logged a position in the
+    area during that window, each at their closest logged point.
+    """
+
+    read_from_replica = True
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            center, radius, bounds = parse_area(params)
+            limit = parse_limit(params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if params.get("start") or params.get("end"):
+            start = parse_datetime(params.get("start") or "")
+            end = parse_datetime(params.get("end") or "")
+            if start is None or end is None:
+                return Response(
+                    {"error": "start and end must both be ISO 8601 datetimes"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-                self._update_hos_summary(trip)
+            if timezone.is_naive(start):
+                start = timezone.make_aware(start)
+            if timezone.is_naive(end):
+                end = timezone.make_aware(end)
+
+            logs = DriverLog.objects.filter(
+                cell_filter("geohash", bounds, GEOHASH_PRECISION),
+                log_time__gte=start,
+                log_time__lte=end,
+            )
+            rows = [
+                row
+                for _, shard_rows in fan_out(
+                    lambda alias: positions(logs.using(alias), "user_id", "log_time")
+                )
+                for row in shard_rows
+            ]
+            matches = nearest_per_key(within(rows, center, radius, bounds))[:limit]
+            drivers = [
+                {
+                    "user_id": user_id,
+                    "position_at": log_time,
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "distance_miles": round(distance, 2),
+                }
+                for (user_id, log_time, latitude, longitude), distance in matches
+            ]
+            return Response(
+                {"count": len(drivers), "drivers": drivers}, status=status.HTTP_200_OK
+            )
+
+        board = DriverStatus.objects.filter(
+            cell_filter("region", bounds, REGION_PRECISION),
+            latitude__isnull=False,
+            longitude__isnull=False,
+        )
+        rows = list(
+            board.values_list(
+                "user_id",
+                "user__username",
+                "trip_id",
+                "current_status",
+                "position_at",
+                "latitude",
+                "longitude",
+            )
+        )
+        drivers = [
+            {
+                "user_id": user_id,
+                "username": username,
+                "trip_id": trip_id,
+                "status": current_status,
+                "position_at": position_at,
+                "latitude": latitude,
+                "longitude": longitude,
+                "distance_miles": round(distance, 2),
+            }
+            for (
+                user_id, username, trip_id, current_status, position_at, latitude, longitude
+            ), distance in within(rows, center, radius, bounds)[:limit]
+        ]
+        return Response(
+            {"count": len(drivers), "drivers": drivers}, status=status.HTTP_200_OK
+        )
+
+
+class NearbyStopsView(APIView):
+    """
+    Stops within ``?radius=`` miles of ``?lat=&lng=`` (or inside ``?bbox=``),
+    nearest first; ``?upcoming=true`` keeps planned (future) stops only and
+    ``?stop_type=Rest,Refueling`` filters by type.
+    """
+
+    read_from_replica = True
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            center, radius, bounds = parse_area(params)
+            limit = parse_limit(params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        candidates = Stop.objects.filter(cell_filter("geohash", bounds, GEOHASH_PRECISION))
+        if params.get("upcoming", "").lower() in ("1", "true", "yes"):
+            candidates = candidates.filter(stop_time__gte=timezone.now())
+        stop_types = params.get("stop_type")
+        if stop_types:
+            stop_types = [value.strip() for value in stop_types.split(",") if value.strip()]
+            valid = {choice for choice, _ in Stop.STOP_TYPE_CHOICES}
+            unknown = [value for value in stop_types if value not in valid]
+            if unknown:
                 return Response(
-                    {"created": created_logs, "errors": errors},
-                    status=status.HTTP_207_MULTI_STATUS,
+                    {"error": f"Unknown stop_type: {', '.join(unknown)}"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
+            candidates = candidates.filter(stop_type__in=stop_types)
+
+        # Distances from the index alone (on every shard), then full rows for
+        # the nearest few. Stop ids are only unique within a shard.
+        rows = [
+            (alias, *row)
+            for alias, shard_rows in fan_out(
+                lambda alias: positions(candidates.using(alias), "stop_id")
+            )
+            for row in shard_rows
+        ]
+        matches = within(rows, center, radius, bounds)[:limit]
+        wanted = {}
+        for (alias, stop_id, _, _), _ in matches:
+            wanted.setdefault(alias, []).append(stop_id)
+        details = {
+            (alias, stop_id): stop
+            for alias, ids in wanted.items()
+            for stop_id, stop in Stop.objects.using(alias).in_bulk(ids).items()
+        }
+        stops = StopSerializer([details[row[:2]] for row, _ in matches], many=True).data
+        for stop, (_, distance) in zip(stops, matches):
+            stop["distance_miles"] = round(distance, 2)
+        return Response(
+            {"count": len(stops), "stops": stops}, status=status.HTTP_200_OK
+        )
+
+
+class DriverLogCreateBulkView(APIView):
+    renderer_classes = log_renderers()
+
+    def post(self, request, trip_id):
+        try:
+            # Reject oversized uploads before touching the body or the database
+            try:
+                check_content_length(request, settings.BULK_MAX_BYTES)
+            except PayloadRejected as e:
+                return Response({"error": str(e)}, status=e.status_code)
 
-            # If we have only errors, return a 400
-            elif errors:
-                logger.error(f"Failed to create any logs, {len(errors)} errors")
-                return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+            # Get the trip
+            try:
+                trip = Trip.objects.only("trip_id", "user_id").get(trip_id=trip_id)
+            except Trip.DoesNotExist:
+                logger.error("Trip with ID %s not found", trip_id)
+                return Response(
+                    {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+                )
 
-            # If everything succeeded
-            logger.info(f"Successfully created {len(created_logs)} logs")
-            self._update_hos_summary(trip)
-            return Response(created_logs, status=status.HTTP_201_CREATED)
+            if not heavy_requests.try_acquire(trip.user_id):
+                logger.warning(
+                    "Rejected bulk log upload for trip %s: too many in flight",
+                    trip_id,
+                    extra={"trip_id": trip_id},
+                )
+                return too_busy()
+            try:
+                with batched_user_changes():
+                    return self._ingest(request, trip)
+            finally:
+                heavy_requests.release(trip.user_id)
 
         except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Unexpected error ingesting logs for trip %s", trip_id)
             return Response(
                 {"error": f"Server error: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-    def _update_hos_summary(self, trip):
-        try:
-            from django.db.models import Sum
+    def _ingest(self, request, trip):
+        trip_id = trip.trip_id
+        valid = []
+        errors = []
+
+        columnar = request.content_type.split(";")[0].strip() == COLUMNAR_MEDIA_TYPE
+        if columnar and not columnar_available():
+            return Response(
+                {"error": f"{COLUMNAR_MEDIA_TYPE} is not supported by this server"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
 
-            user = trip.user
-            logs = DriverLog.objects.filter(trip=trip)
+        # Read and validate the array one element at a time; limits and bad
+        # JSON reject the request before the rest of the body is read, and
+        # before anything is saved
+        try:
+            for i, log_data in enumerate(self._read_logs(request, columnar)):
+                # Ensure log_data is a dictionary
+                if not isinstance(log_data, dict):
+                    errors.append(
+                        {
+                            "index": i,
+                            "error": f"Expected a dictionary, got {type(log_data).__name__}",
+                        }
+                    )
+                    continue
+
+                # Optional fields default to None; trip and user are set on save
+                log_data = {
+                    "latitude": None,
+                    "longitude": None,
+                    "miles_remaining": None,
+                    **log_data,
+                }
+
+                serializer = DriverLogCreateSerializer(data=log_data)
+                if serializer.is_valid():
+                    valid.append((i, serializer))
+                else:
+                    logger.warning(
+                        "Validation error for log %d of trip %s",
+                        i,
+                        trip_id,
+                        extra={"trip_id": trip_id, "index": i},
+                    )
+                    errors.append({"index": i, "errors": serializer.errors})
+        except PayloadRejected as e:
+            logger.warning(
+                "Rejected bulk log upload for trip %s: %s",
+                trip_id,
+                e,
+                extra={"trip_id": trip_id},
+            )
+            return Response({"error": str(e)}, status=e.status_code)
+
+        count = len(valid) + len(errors)
+        logger.info(
+            "Processing %d logs for trip %s",
+            count,
+            trip_id,
+            extra={"trip_id": trip_id, "count": count},
+        )
+        # Log the validated payload for debugging (sampled, see LOGGING)
+        if payload_logger.isEnabledFor(logging.INFO):
+            payload_logger.info(
+                "Request data for trip %s",
+                trip_id,
+                extra={
+                    "endpoint": "trip-logs-create",
+                    "trip_id": trip_id,
+                    "payload": [serializer.initial_data for _, serializer in valid],
+                },
+            )
 
-            # Group logs by date
-            log_dates = logs.values_list("log_time__date", flat=True).distinct()
-            logger.info(
-                f"Updating HOS summary for trip {trip.trip_id}, {len(log_dates)} dates"
-            )
-
-            for log_date in log_dates:
-                # Calculate time spent in each status for this date
-                day_logs = logs.filter(log_time__date=log_date)
-
-                drive_logs = day_logs.filter(status="Driving")
-                drive_time = 0
-                for log in drive_logs:
-                    # Extract minutes from description
-                    import re
-
-                    match = re.search(r"Driving for (\d+) minutes", log.description)
-                    if match:
-                        drive_time += int(match.group(1)) / 60  # Convert to hours
-
-                rest_logs = day_logs.filter(Q(status="Resting") | Q(status="Off Duty"))
-                rest_time = 0
-                for log in rest_logs:
-                    if "Resting" in log.status:
-                        rest_time += 0.5  # 30 minutes
-                    elif "10-hour" in log.description:
-                        rest_time += 10
-                    elif "34-hour" in log.description:
-                        rest_time += 34
-
-                duty_time = (
-                    drive_time
-                    + len(day_logs.filter(status="Pickup"))
-                    + len(day_logs.filter(status="Dropoff"))
+        # Loaded once: each log's save reads the driver's terminal timezone
+        user = trip.user
+        created_logs = []
+        ingested = []
+        for i, serializer in valid:
+            try:
+                log = serializer.save(trip=trip, user=user)
+                ingested.append(log)
+                created_logs.append(DriverLogSerializer(log).data)
+            except Exception as e:
+                logger.exception(
+                    "Error processing log %d of trip %s",
+                    i,
+                    trip_id,
+                    extra={"trip_id": trip_id, "index": i},
                 )
+                errors.append({"index": i, "error": str(e)})
+        errors.sort(key=lambda error: error["index"])
+
+        # If we have errors but also created some logs, continue
+        if errors and created_logs:
+            logger.warning(
+                "Created %d logs with %d errors for trip %s",
+                len(created_logs),
+                len(errors),
+                trip_id,
+                extra={
+                    "trip_id": trip_id,
+                    "created_count": len(created_logs),
+                    "error_count": len(errors),
+                },
+            )
+            record_logs(trip.user_id, ingested)
+            self._update_hos_summary(trip, {log.log_date for log in ingested})
+            return Response(
+                {"created": created_logs, "errors": errors},
+                status=status.HTTP_207_MULTI_STATUS,
+            )
 
-                # Get or create summary for this date
-                summary, created = DailyHOSSummary.objects.get_or_create(
-                    user=user,
-                    log_date=log_date,
-                    defaults={
-                        "total_drive_time": 0,
-                        "total_duty_time": 0,
-                        "total_rest_time": 0,
-                        "available_drive_time": 11,
-                        "available_duty_time": 14,
-                    },
-                )
+        # If we have only errors, return a 400
+        elif errors:
+            logger.error(
+                "Failed to create any logs for trip %s, %d errors",
+                trip_id,
+                len(errors),
+                extra={"trip_id": trip_id, "error_count": len(errors)},
+            )
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # If everything succeeded
+        logger.info(
+            "Successfully created %d logs for trip %s",
+            len(created_logs),
+            trip_id,
+            extra={"trip_id": trip_id, "created_count": len(created_logs)},
+        )
+        record_logs(trip.user_id, ingested)
+        self._update_hos_summary(trip, {log.log_date for log in ingested})
+        return Response(created_logs, status=status.HTTP_201_CREATED)
+
+    def _read_logs(self, request, columnar):
+        if columnar:
+            # Read whole, then decoded a column at a time
+            return decode_rows(
+                read_body(request.stream, settings.BULK_MAX_BYTES), settings.BULK_MAX_ITEMS
+            )
+        return iter_json_array(
+            request.stream, settings.BULK_MAX_BYTES, settings.BULK_MAX_ITEMS
+        )
 
-                # Update summary
-                summary.total_drive_time += drive_time
-                summary.total_duty_time += duty_time
-                summary.total_rest_time += rest_time
-                summary.available_drive_time = max(0, 11 - summary.total_drive_time)
-                summary.available_duty_time = max(0, 14 - summary.total_duty_time)
-                summary.save()
+    def _update_hos_summary(self, trip, log_dates):
+        try:
+            # Recompute each touched day from all of the driver's logs for it,
+            # so retried or partial batches can't count a log twice
+            logger.info(
+                "Updating HOS summary for trip %s, %d dates",
+                trip.trip_id,
+                len(log_dates),
+            )
+            totals = refresh_days(trip.user_id, log_dates)
 
+            for (_, log_date), (drive_time, duty_time, rest_time) in totals.items():
                 logger.info(
-                    f"Updated HOS summary for {log_date}: drive={drive_time:.2f}h, duty={duty_time:.2f}h, rest={rest_time:.2f}h"
+                    "Updated HOS summary for %s: drive=%.2fh, duty=%.2fh, rest=%.2fh",
+                    log_date,
+                    drive_time,
+                    duty_time,
+                    rest_time,
                 )
-        except Exception as e:
-            logger.error(f"Error updating HOS summary: {str(e)}")
-            logger.error(traceback.format_exc())
+        except Exception:
+            logger.exception("Error updating HOS summary for trip %s", trip.trip_id)
             # Continue execution even if HOS update fails
 
 
+class TripBreadcrumbsView(APIView):
+    MAX_POINTS = 50000
+    # Accepted range of ``t``, 1970-01-01 to 2100-01-01 in epoch seconds
+    MAX_TIMESTAMP = 4102444800
+
+    def post(self, request, trip_id):
+        try:
+            check_content_length(request, settings.BULK_MAX_BYTES)
+        except PayloadRejected as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+        try:
+            trip = Trip.objects.only("trip_id", "user_id").get(trip_id=trip_id)
+        except Trip.DoesNotExist:
+            return Response(
+                {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        if not heavy_requests.try_acquire(trip.user_id):
+            return too_busy()
+        try:
+            return self._store(request, trip)
+        finally:
+            heavy_requests.release(trip.user_id)
+
+    def _store(self, request, trip):
+        # Compact columnar payload: {"t": [epoch seconds], "lat": [...], "lng": [...]}
+        data = request.data
+        try:
+            times = np.asarray(data["t"], dtype=np.float64)
+            lats = np.asarray(data["lat"], dtype=np.float64)
+            lngs = np.asarray(data["lng"], dtype=np.float64)
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "Expected numeric arrays t, lat and lng"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not (times.ndim == lats.ndim == lngs.ndim == 1) or not (
+            len(times) == len(lats) == len(lngs)
+        ):
+            return Response(
+                {"error": "t, lat and lng must be flat arrays of the same length"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(times) == 0:
+            return Response(
+                {"received": 0, "stored": 0}, status=status.HTTP_201_CREATED
+            )
+        if len(times) > self.MAX_POINTS:
+            return Response(
+                {"error": f"At most {self.MAX_POINTS} points per batch"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # A JSON null is NaN here, which no comparison rejects
+        if (
+            not np.isfinite(times).all()
+            or not np.isfinite(lats).all()
+            or not np.isfinite(lngs).all()
+            or (times < 0).any()
+            or (times > self.MAX_TIMESTAMP).any()
+            or (np.abs(lats) > 90).any()
+            or (np.abs(lngs) > 180).any()
+        ):
+            return Response(
+                {"error": "Invalid timestamp or coordinate values"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        order = np.argsort(times, kind="stable")
+        times, lats, lngs = times[order], lats[order], lngs[order]
+
+        kept = simplify_track(
+            lats,
+            lngs,
+            settings.BREADCRUMB_STORE_TOLERANCE_M,
+            settings.BREADCRUMB_MIN_DISTANCE_M,
+        )
+
+        GPSBreadcrumb.objects.bulk_create(
+            [
+                GPSBreadcrumb(
+                    trip_id=trip.trip_id,
+                    user_id=trip.user_id,
+                    recorded_at=datetime.fromtimestamp(t, tz=dt_timezone.utc),
+                    latitude=round(lat, 7),
+                    longitude=round(lng, 7),
+                )
+                for t, lat, lng in zip(
+                    times[kept].tolist(), lats[kept].tolist(), lngs[kept].tolist()
+                )
+            ],
+            batch_size=1000,
+        )
+
+        last = kept[-1]
+        record_position(
+            trip.user_id,
+            trip.trip_id,
+            round(float(lats[last]), 7),
+            round(float(lngs[last]), 7),
+            datetime.fromtimestamp(times[last], tz=dt_timezone.utc),
+        )
+
+        if has_watchers(trip.user_id):
+            publish(
+                trip.user_id,
+                {
+                    "type": "position",
+                    "user_id": trip.user_id,
+                    "trip_id": trip.trip_id,
+                    "latitude": f"{lats[last]:.7f}",
+                    "longitude": f"{lngs[last]:.7f}",
+                    "recorded_at": datetime.fromtimestamp(
+                        times[last], tz=dt_timezone.utc
+                    ).isoformat(),
+                },
+            )
+
+        return Response(
+            {"received": len(times), "stored": len(kept)},
+            status=status.HTTP_201_CREATED,
+        )
+
+    def get(self, request, trip_id):
+        if not Trip.objects.filter(trip_id=trip_id).exists():
+            return Response(
+                {"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        tolerance = request.query_params.get("tolerance")
+        zoom = request.query_params.get("zoom")
+        try:
+            tolerance = float(tolerance) if tolerance is not None else None
+            zoom = float(zoom) if zoom is not None else None
+        except ValueError:
+            return Response(
+                {"error": "tolerance and zoom must be numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        points = list(
+            GPSBreadcrumb.objects.filter(trip_id=trip_id)
+            .order_by("recorded_at")
+            .values_list("latitude", "longitude")
+        )
+        if points:
+            lats = np.array([float(lat) for lat, _ in points])
+            lngs = np.array([float(lng) for _, lng in points])
+        else:
+            lats = lngs = np.zeros(0)
+
+        if tolerance is None and zoom is not None and len(lats):
+            # One screen pixel at the requested zoom
+            tolerance = float(zoom_tolerance(zoom, lats.mean()))
+        if tolerance is not None and len(lats):
+            kept = simplify_track(lats, lngs, tolerance)
+            lats, lngs = lats[kept], lngs[kept]
+
+        return Response(
+            {
+                "trip_id": trip_id,
+                "tolerance_m": tolerance,
+                "points_stored": len(points),
+                "points_returned": len(lats),
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": np.column_stack([lngs, lats]).round(7).tolist(),
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class UserLogsView(APIView):
+    read_from_replica = True
+    renderer_classes = log_renderers()
+
+    @cache_user_response
     def get(self, request, user_id):
         try:
             user = spotter_users.objects.get(user_id=user_id)
 
-            # Get query parameters
-            date = request.query_params.get("date")
-            start_date = request.query_params.get("start_date")
-            end_date = request.query_params.get("end_date")
-
-            logs = DriverLog.objects.filter(user=user).order_by("-created_at")
-
-            # Filter by specific date or date range
-            if date:
-                try:
-                    date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-                    logs = logs.filter(log_time__date=date_obj)
-                except ValueError:
-                    return Response(
-                        {"error": "Invalid date format. Use YYYY-MM-DD."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-            elif start_date:
-                try:
-                    start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-                    logs = logs.filter(log_time__gte=start_datetime)
-
-                    if end_date:
-                        try:
-                            end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
-                            # Add one day to include the end date
-                            end_datetime = end_datetime + timedelta(days=1)
-                            logs = logs.filter(log_time__lt=end_datetime)
-                        except ValueError:
-                            return Response(
-                                {"error": "Invalid end_date format. Use YYYY-MM-DD."},
-                                status=status.HTTP_400_BAD_REQUEST,
-                            )
-                except ValueError:
-                    return Response(
-                        {"error": "Invalid start_date format. Use YYYY-MM-DD."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
+            try:
+                # archive_range: dates to also read from the archive (cold) tier
+                logs, archive_range = queries.user_logs(user.user_id, request.query_params)
+            except queries.InvalidQuery as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+            logs = with_archived_logs(logs, user.user_id, *archive_range)
             serializer = DriverLogSerializer(logs, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -534,47 +1275,17 @@ class UserLogsView(APIView):
             )
 
 class UserHOSSummaryView(APIView):
+    read_from_replica = True
+
+    @cache_user_response
     def get(self, request, user_id):
         try:
             user = spotter_users.objects.get(user_id=user_id)
 
-            # Get query parameters
-            date = request.query_params.get("date")
-            start_date = request.query_params.get("start_date")
-            end_date = request.query_params.get("end_date")
-
-            summaries = DailyHOSSummary.objects.filter(user=user).order_by("-log_date")
-
-            if date:
-                try:
-                    date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-                    summaries = summaries.filter(log_date=date_obj)
-                except ValueError:
-                    return Response(
-                        {"error": "Invalid date format. Use YYYY-MM-DD."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-            elif start_date:
-                try:
-                    start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-                    summaries = summaries.filter(log_date__gte=start_date_obj)
-
-                    if end_date:
-                        try:
-                            end_date_obj = datetime.strptime(
-                                end_date, "%Y-%m-%d"
-                            ).date()
-                            summaries = summaries.filter(log_date__lte=end_date_obj)
-                        except ValueError:
-                            return Response(
-                                {"error": "Invalid end_date format. Use YYYY-MM-DD."},
-                                status=status.HTTP_400_BAD_REQUEST,
-                            )
-                except ValueError:
-                    return Response(
-                        {"error": "Invalid start_date format. Use YYYY-MM-DD."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
+            try:
+                summaries = queries.user_hos_summaries(user.user_id, request.query_params)
+            except queries.InvalidQuery as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             serializer = DailyHOSSummarySerializer(summaries, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import CachedJWTAuthentication, get_cached_user
+from .realtime import fleet_channel, get_broker, user_channel
+
+_USER_PATH = re.compile(r"^/ws/user/(?P<user_id>\d+)/?$")
+_FLEET_PATH = re.compile(r"^/ws/fleet/?$")
+
+# Close codes sent instead of accepting the handshake
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+def _authenticate(scope):
+    """
+    The user whose access token came with the handshake, or None.
+
+    Browsers can't set headers on a WebSocket, so the token may come as
+    ``?token=<access token>`` as well as in an ``Authorization: Bearer`` header.
+    """
+    auth = CachedJWTAuthentication()
+    raw_token = None
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            raw_token = auth.get_raw_token(value)
+    if raw_token is None:
+        tokens = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token")
+        if tokens:
+            raw_token = tokens[0].encode("latin-1")
+    if raw_token is None:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+def _channels_for(path, user):
+    """
+    (channels, close code): a driver may watch themselves, and anyone in a
+    fleet may watch that fleet and its drivers.
+    """
+    match = _USER_PATH.match(path)
+    if match:
+        user_id = int(match.group("user_id"))
+        if user_id == user.user_id:
+            return [user_channel(user_id)], None
+        watched = get_cached_user(user_id)
+        if watched is None:
+            return None, CLOSE_NOT_FOUND
+        if user.fleet_id is None or watched.fleet_id != user.fleet_id:
+            return None, CLOSE_FORBIDDEN
+        return [user_channel(user_id)], None
+    if _FLEET_PATH.match(path):
+        if user.fleet_id is None:
+            return None, CLOSE_FORBIDDEN
+        return [fleet_channel(user.fleet_id)], None
+    return None, CLOSE_NOT_FOUND
+
+
+def _subscription_for(scope):
+    user = _authenticate(scope)
+    if user is None:
+        return None, CLOSE_UNAUTHENTICATED
+    return _channels_for(scope["path"], user)
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI app for live trip progress.
+
+    ``/ws/user/<user_id>/`` streams one driver's new logs, HOS summary
+    updates and positions; ``/ws/fleet/`` streams them for every driver in
+    the caller's fleet. The handshake carries a JWT access token, as for
+    the HTTP API. Messages are JSON objects with a ``type`` of ``log``,
+    ``hos`` or ``position``.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    channels, close_code = await sync_to_async(_subscription_for)(scope)
+    if channels is None:
+        await send({"type": "websocket.close", "code": close_code})
+        return
+
+    await send({"type": "websocket.accept"})
+
+    broker = get_broker()
+    subscription = broker.subscribe(channels)
+    _, queue = subscription
+
+    async def forward():
+        while True:
+            payload = await queue.get()
+            await send({"type": "websocket.send", "text": json.dumps(payload)})
+
+    async def wait_for_disconnect():
+        while True:
+            incoming = await receive()
+            if incoming["type"] == "websocket.disconnect":
+                return
+
+    tasks = [asyncio.ensure_future(forward()), asyncio.ensure_future(wait_for_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        broker.unsubscribe(channels, subscription)
@@ -2,6 +2,8 @@
 ASGI config for spotter project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections go to the live trip
+progress feed in ``api.websocket``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'spotter.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.websocket import websocket_application  # noqa: E402  (needs apps loaded)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
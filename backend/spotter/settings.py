@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "api.compression.CompressionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -39,14 +40,26 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.ReplicaRoutingMiddleware",
+    "api.middleware.ShardRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "spotter.urls"
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
 }
+
+# Login/auth hot path (see api/authentication.py):
+# - authenticated users are cached per process for AUTH_USER_CACHE_SECONDS
+# - login "last seen" writes are batched every LAST_SEEN_FLUSH_SECONDS
+# - at most LOGIN_MAX_CONCURRENT_HASHES password checks run at once (default:
+#   one per CPU); others wait up to LOGIN_HASH_WAIT_SECONDS, then get a 503
+AUTH_USER_CACHE_SECONDS = 30
+LAST_SEEN_FLUSH_SECONDS = 5
+LOGIN_MAX_CONCURRENT_HASHES = int(os.getenv("LOGIN_MAX_CONCURRENT_HASHES", "0"))
+LOGIN_HASH_WAIT_SECONDS = 5
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=14),
@@ -92,15 +105,185 @@ WSGI_APPLICATION = "spotter.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.mysql",
-        "NAME": os.getenv("DATABASE"),
-        "USER": "admin",
-        "PASSWORD": os.getenv("PASSWORD"),
-        "HOST": os.getenv("HOST"),
-        "PORT": "3306",
+# Connections are kept open between requests (CONN_MAX_AGE) so a request
+# does not pay connection setup to the remote host. Reads for replica-safe
+# views go to the "replica" alias when it is configured; see api/routers.py.
+CONN_MAX_AGE = int(os.getenv("CONN_MAX_AGE", "60"))
+
+if os.getenv("SQLITE_DIR"):
+    # Local stand-in: two files, with the replica only as fresh as the last
+    # `manage.py sync_sqlite_replica`, so it lags like a real one and
+    # read-your-writes pinning can be seen working
+    SQLITE_DIR = Path(os.getenv("SQLITE_DIR"))
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": SQLITE_DIR / "primary.sqlite3",
+        },
+        "replica": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": SQLITE_DIR / "replica.sqlite3",
+        },
+    }
+    # SQLITE_SHARDS=N adds N more files as shards shard1..shardN
+    for n in range(1, int(os.getenv("SQLITE_SHARDS", "0")) + 1):
+        DATABASES[f"shard{n}"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": SQLITE_DIR / f"shard{n}.sqlite3",
+        }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.mysql",
+            "NAME": os.getenv("DATABASE"),
+            "USER": "admin",
+            "PASSWORD": os.getenv("PASSWORD"),
+            "HOST": os.getenv("HOST"),
+            "PORT": "3306",
+            "CONN_MAX_AGE": CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+    if os.getenv("REPLICA_HOST"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": os.getenv("REPLICA_HOST"),
+            "TEST": {"MIRROR": "default"},
+        }
+    # SHARD_HOSTS=host1,host2 adds MySQL shards shard1, shard2, ...
+    for n, host in enumerate(filter(None, os.getenv("SHARD_HOSTS", "").split(",")), start=1):
+        DATABASES[f"shard{n}"] = {**DATABASES["default"], "HOST": host.strip()}
+
+DATABASE_ROUTERS = ["api.routers.ShardRouter", "api.routers.PrimaryReplicaRouter"]
+
+# Trips, logs, stops, waypoints, breadcrumbs and HOS summaries are spread over
+# SHARDS, one fleet (or fleetless driver) per shard, by consistent hashing
+# with SHARD_RING_POINTS points per shard; see api/sharding.py. After adding
+# a shard run `manage.py migrate --database <alias>` and then
+# `manage.py rebalance_shards`.
+SHARDS = ["default", *(alias for alias in DATABASES if alias.startswith("shard"))]
+SHARD_RING_POINTS = 128
+
+# Seconds reads for a user/trip stay on the primary after a write to it. Pins
+# are kept in the cache, so with the default local-memory cache they only hold
+# in the worker that took the write; set REDIS_URL to share them.
+REPLICA_STICKY_SECONDS = 5
+
+
+# Cache
+# Local memory by default; point REDIS_URL at a Redis instance to share the
+# response cache between workers.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "spotter",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
     }
+
+# Seconds a cached trips/logs/HOS read response is kept
+API_RESPONSE_CACHE_TIMEOUT = 300
+
+
+# Response compression (api.compression.CompressionMiddleware): JSON bodies of
+# COMPRESS_MIN_BYTES or more are sent brotli (when the brotli package is
+# installed) or gzip encoded, per Accept-Encoding. Payloads of finished trips
+# are serialized and compressed once at PRECOMPRESS_LEVELS and kept for
+# PRECOMPRESSED_RESPONSE_TIMEOUT seconds.
+COMPRESS_MIN_BYTES = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+PRECOMPRESS_LEVELS = {"gzip": 9, "br": 11}
+PRECOMPRESSED_RESPONSE_TIMEOUT = 24 * 60 * 60
+
+
+# Route sequencing plans (api.plan_cache): the stop order found for a route,
+# cycle-used value and (for stops with time windows) start-time bucket of
+# PLAN_START_BUCKET_MINUTES is kept in an LRU of PLAN_CACHE_SIZE plans per
+# process and in the shared cache for PLAN_CACHE_TIMEOUT seconds.
+PLAN_CACHE_SIZE = 1024
+PLAN_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+PLAN_START_BUCKET_MINUTES = 15
+
+
+# GPS breadcrumbs are simplified before storage: points closer than
+# BREADCRUMB_MIN_DISTANCE_M to the previous one are dropped, then the track
+# is reduced with Douglas-Peucker at BREADCRUMB_STORE_TOLERANCE_M (meters).
+BREADCRUMB_MIN_DISTANCE_M = 10
+BREADCRUMB_STORE_TOLERANCE_M = 5
+
+
+# Admission control for bulk endpoints (log upload, breadcrumbs, assignments):
+# bodies over BULK_MAX_BYTES or arrays over BULK_MAX_ITEMS are rejected with
+# 413 before being read in full, and at most HEAVY_MAX_CONCURRENT such
+# requests (HEAVY_MAX_CONCURRENT_PER_USER per driver) run at once per worker
+# process; the rest get 429 with Retry-After.
+BULK_MAX_ITEMS = 1000
+BULK_MAX_BYTES = 2 * 1024 * 1024
+HEAVY_MAX_CONCURRENT = 8
+HEAVY_MAX_CONCURRENT_PER_USER = 2
+HEAVY_RETRY_AFTER_SECONDS = 2
+
+
+# Driver logs and stops older than ARCHIVE_AFTER_MONTHS whole months are moved
+# to compressed columnar files under ARCHIVE_DIR by `manage.py
+# archive_old_records` (see api/archive.py); log reads merge both tiers.
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", str(BASE_DIR / "archive"))
+ARCHIVE_AFTER_MONTHS = 6
+
+
+# Pub/sub behind the /ws/ live trip progress feed (see api/realtime.py)
+REALTIME_BROKER = "api.realtime.InMemoryBroker"
+
+
+# Logging
+# Application logs go through a queue to a background thread, so request
+# threads never format messages or wait on handler I/O. Raw payload logging
+# is sampled per endpoint (URL name) on the "api.payload" logger.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "api.logutils.JsonFormatter"},
+    },
+    "filters": {
+        "payload_sampling": {
+            "()": "api.logutils.SamplingFilter",
+            "rates": {
+                "trip-logs-create": float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01")),
+            },
+            "default_rate": 0.0,
+        },
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "formatter": "json",
+        },
+        "queue": {
+            "()": "api.logutils.QueueLogHandler",
+            "handlers": ["console"],
+            "queue_size": 10000,
+        },
+    },
+    "loggers": {
+        "api": {
+            "handlers": ["queue"],
+            "level": os.getenv("LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        "api.payload": {
+            "filters": ["payload_sampling"],
+        },
+    },
 }
 
 
@@ -117,6 +117,35 @@ const Dashboard: React.FC = () => {
     fetchData();
   }, [userData]);
 
+  // Live updates: new logs and HOS summaries are pushed over a WebSocket
+  // instead of re-fetching everything
+  useEffect(() => {
+    if (userData === null) return;
+    const apiBaseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/';
+    // Browsers can't set headers on a WebSocket, so the token goes in the query string
+    const accessToken = localStorage.getItem('accessToken');
+    if (!accessToken) return;
+    const wsUrl = apiBaseUrl.replace(/^http/, 'ws').replace(/api\/?$/, '') +
+      `ws/user/${userData.user_id}/?token=${encodeURIComponent(accessToken)}`;
+    const socket = new WebSocket(wsUrl);
+
+    socket.onmessage = (event: MessageEvent) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'log') {
+        setLogs((current) => [message.log as Log, ...current]);
+      } else if (message.type === 'hos') {
+        const summary = message.summary as HOSSummary;
+        setHosSummaries((current) => {
+          const others = current.filter((s) => s.summary_id !== summary.summary_id);
+          return [summary, ...others].sort((a, b) => b.log_date.localeCompare(a.log_date));
+        });
+      }
+    };
+    socket.onerror = (err) => console.error('Live updates unavailable:', err);
+
+    return () => socket.close();
+  }, [userData]);
+
   // Group logs by trip
   const tripLogs: TripLogs = logs.reduce((acc: TripLogs, log: Log) => {
     if (!acc[log.trip]) {